@@ -5,6 +5,7 @@
 """
 RFID Asset Tracking System - Application Entry Point
 """
+import logging
 import os
 from app import create_app
 
@@ -13,10 +14,11 @@ env = os.getenv('FLASK_ENV', 'production')
 
 # Create Flask app
 app = create_app(env)
+logger = logging.getLogger('app')
 
 if __name__ == '__main__':
     try:
-        print(f"Starting RFID Tracking Server ({env} mode)...")
+        logger.info("Starting RFID Tracking Server (%s mode)...", env)
         
         app.run(
             host='0.0.0.0',
@@ -26,12 +28,16 @@ if __name__ == '__main__':
         )
         
     except KeyboardInterrupt:
-        print("\nShutting down gracefully...")
-        from app.services.rfid_service import rfid_reader
-        from app.services.sensor_service import sensor_manager
+        logger.info("Shutting down gracefully...")
+        from app.services.portal_service import portal_registry
+        from app.services.tracking_service import tracking_service
+        from app.services.sync_service import sync_service
+        from app.services.acquisition import acquisition
         
-        rfid_reader.stop()
-        sensor_manager.shutdown()
+        portal_registry.shutdown()
+        acquisition.stop()
+        sync_service.stop()
+        tracking_service.stop_flusher()
         
     except Exception as e:
-        print(f"Fatal error: {e}")
\ No newline at end of file
+        logger.critical("Fatal error: %s", e)
\ No newline at end of file
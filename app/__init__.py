@@ -1,36 +1,49 @@
 from flask import Flask
 from flask_cors import CORS
 from config import config
+from app.utils.log import init_logging
 
 def create_app(config_name='production'):
     """Application factory"""
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    logger = init_logging(app.config)
     
     # Enable CORS
     CORS(app)
     
+    # Per-request Server-Timing (registered first so its after_request runs last)
+    if app.config['PROFILING_ENABLED']:
+        from app.utils.profiling import init_profiling
+        init_profiling(app)
+    
+    # Compress large responses (gzip, or brotli when installed)
+    from app.utils.compression import init_compression
+    init_compression(app)
+    
     # Initialize services
     with app.app_context():
         from app.services.tracking_service import tracking_service
+        from app.services.portal_service import portal_registry
+        from app.services.sync_service import sync_service
+        from app.services.session_service import session_service
+        from app.services.presence_service import presence_history
+        from app.services.asset_registry import asset_registry
         
         # Use mock services if MOCK_MODE is enabled
         if app.config['MOCK_MODE']:
-            print("=" * 50)
-            print("RUNNING IN MOCK MODE (No hardware required)")
-            print("=" * 50)
-            from app.services.sensor_service_mock import sensor_manager
-            from app.services.rfid_service_mock import rfid_reader
-        else:
-            from app.services.sensor_service import sensor_manager
-            from app.services.rfid_service import rfid_reader
+            logger.warning("RUNNING IN MOCK MODE (No hardware required)")
         
         tracking_service.initialize()
-        sensor_manager.initialize()
-        
-        if rfid_reader.connect():
-            import threading
-            threading.Thread(target=rfid_reader.monitor_loop, daemon=True).start()
+        session_service.initialize()
+        presence_history.initialize()
+        asset_registry.initialize()
+        if app.config['ACQUISITION_MODE'] == 'process':
+            from app.services.acquisition import acquisition
+            acquisition.start(app.config)
+        else:
+            portal_registry.initialize(mock=app.config['MOCK_MODE'])
+        sync_service.initialize()
     
     # Register blueprints
     from app.routes.api import api_bp
@@ -41,6 +54,14 @@ def create_app(config_name='production'):
     app.register_blueprint(config_bp)
     app.register_blueprint(system_bp)
     
+    if app.config['METRICS_ENABLED']:
+        from app.routes.metrics import metrics_bp
+        app.register_blueprint(metrics_bp)
+    
+    if app.config['PROFILING_ENABLED']:
+        from app.routes.profiling import profiling_bp
+        app.register_blueprint(profiling_bp)
+    
     # Register test blueprint if in mock mode
     if app.config['MOCK_MODE']:
         from app.routes.test import test_bp
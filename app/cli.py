@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Offline maintenance commands (no devices are opened)
+
+    python -m app.cli export --format csv --output audit.csv --start-date 2025-01-01-00-00-00-000
+    python -m app.cli convert audit.rfcol --format csv --output audit.csv
+    python -m app.cli migrate data/tag_tracking.json data/tag_tracking.ndjson
+    python -m app.cli import-assets assets.csv
+"""
+import argparse
+import json
+import os
+import sys
+from config import Config
+from app.services.asset_registry import AssetRegistry
+from app.services.export_service import FORMATS, export, filter_records, read_columnar
+from app.services.migration_service import migrate
+from app.utils.helpers import get_default_portal_id, iter_records_file, parse_date_filter, validate_direction
+
+
+def write_chunks(chunks, output):
+    """Write str/bytes chunks to a file, or stdout when output is None or '-'"""
+    if output in (None, '-'):
+        stream = sys.stdout.buffer
+        for chunk in chunks:
+            stream.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        stream.flush()
+        return
+    with open(output, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+
+
+def read_records(data_file: str):
+    """Records streamed from the records file, so memory stays flat however long the history is"""
+    default_portal_id = get_default_portal_id(vars(Config))
+    for record in iter_records_file(data_file):
+        record.setdefault('portal_id', default_portal_id)  # legacy records, as when the store loads
+        yield record
+
+
+def cmd_export(args) -> int:
+    """Export the records file"""
+    for name in ('start_date', 'end_date'):
+        value = getattr(args, name)
+        if value and parse_date_filter(value) is None:
+            print(f"--{name.replace('_', '-')} must be YYYY-MM-DD-HH-MM-SS-mmm", file=sys.stderr)
+            return 2
+    if args.direction and not validate_direction(args.direction):
+        print("--direction must be IN or OUT", file=sys.stderr)
+        return 2
+    
+    records = filter_records(read_records(args.data_file), start_date=args.start_date, end_date=args.end_date,
+                             tag=args.tag, portal_id=args.portal, direction=args.direction)
+    try:
+        write_chunks(export(records, args.format), args.output)
+    except ValueError as e:
+        print(f"Cannot read {args.data_file}: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_convert(args) -> int:
+    """Turn a columnar export into CSV or NDJSON"""
+    with open(args.input, 'rb') as f:
+        write_chunks(export(read_columnar(f), args.format), args.output)
+    return 0
+
+
+def print_progress(state: dict):
+    """One updating progress line on stderr"""
+    percent = state['source_offset'] / state['size'] * 100 if state['size'] else 100.0
+    rate = (state['records'] + state['rejected'] - state['resumed_from']) / max(state['elapsed'], 1e-9)
+    print(f"\r{percent:5.1f}%  {state['records']:,} records  {state['rejected']:,} rejected  {rate:,.0f}/s",
+          end='\n' if state.get('done') else '', file=sys.stderr, flush=True)
+
+
+def cmd_migrate(args) -> int:
+    """Convert a legacy JSON array records file to an NDJSON journal"""
+    destination = args.destination or os.path.splitext(args.source)[0] + '.ndjson'
+    try:
+        # Same default as the store gives legacy records: the first of PORTALS, else DEFAULT_PORTAL_ID
+        default_portal = args.default_portal or get_default_portal_id(vars(Config))
+        summary = migrate(args.source, destination, default_portal, restart=args.restart,
+                          progress=None if args.quiet else print_progress)
+    except (ValueError, FileExistsError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    
+    if summary['resumed_from']:
+        print(f"Resumed after {summary['resumed_from']:,} records", file=sys.stderr)
+    print(f"Wrote {summary['records']:,} records to {destination}", file=sys.stderr)
+    if summary['rejected']:
+        print(f"{summary['rejected']:,} invalid records written to {summary['rejects_file']}", file=sys.stderr)
+    print(f"Set DATA_FILE={destination} to use it", file=sys.stderr)
+    return 0
+
+
+def cmd_import_assets(args) -> int:
+    """Add assets from a CSV or JSON file to the registry file"""
+    registry = AssetRegistry()
+    registry.assets_file = args.assets_file
+    registry.load()
+    with open(args.source, encoding='utf-8') as f:
+        if args.source.endswith('.json'):
+            rows = json.load(f)
+            summary = registry.import_assets(rows if isinstance(rows, list) else [rows], args.replace)
+        else:
+            summary = registry.import_csv(f.read(), args.replace)
+    
+    for rejected in summary['rejected']:
+        print(f"Row {rejected['row']}: {rejected['message']}", file=sys.stderr)
+    if not summary['applied']:
+        print(f"Nothing imported: --replace needs every row to be valid; {args.assets_file} is unchanged",
+              file=sys.stderr)
+        return 1
+    print(f"{summary['added']:,} added, {summary['updated']:,} updated, {summary['removed']:,} removed, "
+          f"{len(summary['rejected']):,} rejected; {summary['total']:,} assets in {args.assets_file}", file=sys.stderr)
+    print("Restart the service (or POST the file to /api/assets) to use them", file=sys.stderr)
+    return 1 if summary['rejected'] else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    export_parser = commands.add_parser('export', help='Export tracking records')
+    export_parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    export_parser.add_argument('--output', '-o', help='Output file (default stdout)')
+    export_parser.add_argument('--data-file', default=Config.DATA_FILE, help='Records file (default DATA_FILE)')
+    export_parser.add_argument('--start-date', help='YYYY-MM-DD-HH-MM-SS-mmm')
+    export_parser.add_argument('--end-date', help='YYYY-MM-DD-HH-MM-SS-mmm')
+    export_parser.add_argument('--tag', help='Only this RFID tag')
+    export_parser.add_argument('--portal', help='Only this portal')
+    export_parser.add_argument('--direction', help='IN or OUT')
+    export_parser.set_defaults(handler=cmd_export)
+    
+    convert_parser = commands.add_parser('convert', help='Convert a columnar export to CSV/NDJSON')
+    convert_parser.add_argument('input')
+    convert_parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    convert_parser.add_argument('--output', '-o', help='Output file (default stdout)')
+    convert_parser.set_defaults(handler=cmd_convert)
+    
+    migrate_parser = commands.add_parser('migrate', help='Convert a legacy JSON records file to NDJSON (resumable)')
+    migrate_parser.add_argument('source', help='Legacy JSON array file')
+    migrate_parser.add_argument('destination', nargs='?', help='NDJSON output (default SOURCE with .ndjson)')
+    migrate_parser.add_argument('--default-portal',
+                                help='portal_id for records from before portals (default: the service default portal)')
+    migrate_parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and start over')
+    migrate_parser.add_argument('--quiet', action='store_true', help='No progress output')
+    migrate_parser.set_defaults(handler=cmd_migrate)
+    
+    assets_parser = commands.add_parser('import-assets', help='Add assets to the registry from CSV or JSON')
+    assets_parser.add_argument('source', help='CSV with an epc column (name, category, owner optional) or JSON list')
+    assets_parser.add_argument('--assets-file', default=Config.ASSETS_FILE, help='Registry file (default ASSETS_FILE)')
+    assets_parser.add_argument('--replace', action='store_true', help='Drop assets not in SOURCE')
+    assets_parser.set_defaults(handler=cmd_import_assets)
+    
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
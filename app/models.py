@@ -8,12 +8,19 @@ class TrackingRecord:
     rfid_tag: str
     direction: str  # 'IN' or 'OUT'
     read_date: str
+    portal_id: str = 'main'
+    confidence: Optional[float] = None  # Direction confidence, None for manual records
     
     @classmethod
-    def create(cls, rfid_tag: str, direction: str):
-        """Create new tracking record with timestamp"""
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S-%f")[:-3]
-        return cls(rfid_tag=rfid_tag, direction=direction, read_date=timestamp)
+    def create(cls, rfid_tag: str, direction: str, portal_id: str = 'main',
+               read_time: Optional[float] = None, confidence: Optional[float] = None):
+        """Create new tracking record with timestamp (read_time defaults to now)"""
+        moment = datetime.fromtimestamp(read_time) if read_time is not None else datetime.now()
+        timestamp = moment.strftime("%Y-%m-%d-%H-%M-%S-%f")[:-3]
+        if confidence is not None:
+            confidence = round(confidence, 3)
+        return cls(rfid_tag=rfid_tag, direction=direction, read_date=timestamp,
+                   portal_id=portal_id, confidence=confidence)
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -1,6 +1,18 @@
-from flask import Blueprint, jsonify, request
+import json
+import logging
+import time
+from flask import Blueprint, Response, jsonify, request, current_app
 from app.services.tracking_service import tracking_service
-from app.utils.helpers import validate_direction
+from app.services.analytics_service import AnalyticsError, analytics_service
+from app.services.asset_registry import asset_registry
+from app.services.export_service import FORMATS, export, iter_records
+from app.services.presence_service import presence_history
+from app.services.session_service import SORT_KEYS, session_service
+from app.utils.compression import cached_compressed
+from app.utils.helpers import validate_direction, parse_date_filter
+from app.utils.profiling import phase
+
+logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -9,18 +21,40 @@ def get_status():
     """Get system status"""
     from app.services.rfid_service import rfid_reader
     from app.services.sensor_service import sensor_manager
+    from app.services.acquisition import acquisition, portal_statuses, AcquisitionError
+    
+    devices = {
+        'rfid_power': rfid_reader.read_power,
+        'sensor_range': sensor_manager.sensor_inside.detection_range
+    }
+    if acquisition.running:
+        # Devices live in the acquisition process
+        try:
+            default_portal, portals = portal_statuses()
+            primary = next(p for p in portals if p['portal_id'] == default_portal)
+            devices = {'rfid_power': primary['rfid_power'], 'sensor_range': primary['sensor_range']}
+        except (AcquisitionError, StopIteration):
+            devices = {'rfid_power': None, 'sensor_range': None}
     
     return jsonify({
         'status': 'success',
         'data': tracking_service.get_status(),
-        'config': {
-            'rfid_power': rfid_reader.read_power,
-            'sensor_range': sensor_manager.sensor_inside.detection_range
-        }
+        'config': devices
     })
 
 
+def stream_records_json(records, chunk_size=500):
+    """Stream a records payload as JSON in chunks (same shape as jsonify)"""
+    yield '{"count":%d,"data":[' % len(records)
+    for start in range(0, len(records), chunk_size):
+        chunk = records[start:start + chunk_size]
+        body = ','.join(json.dumps(r, separators=(',', ':'), sort_keys=True) for r in chunk)
+        yield body if start == 0 else ',' + body
+    yield '],"status":"success"}'
+
+
 @api_bp.route('/records', methods=['GET'])
+@cached_compressed(lambda: (tracking_service.version, asset_registry.version))
 def get_records():
     """Get tracking records with filters"""
     filters = {}
@@ -37,26 +71,120 @@ def get_records():
     if request.args.get('end_date'):
         filters['end_date'] = request.args.get('end_date')
     
-    records = tracking_service.get_all_records(filters)
+    if request.args.get('portal'):
+        filters['portal_id'] = request.args.get('portal')
     
-    return jsonify({
-        'status': 'success',
-        'count': len(records),
-        'data': records
-    })
+    if request.args.get('prefix'):
+        filters['tag_prefix'] = request.args.get('prefix')
+    
+    with phase('query'):
+        records = tracking_service.get_all_records(filters)
+        if request.args.get('enrich') == 'true':
+            records = asset_registry.enrich(records)
+    
+    # Large dumps are streamed so they can be compressed chunk by chunk
+    if len(records) > current_app.config['RECORDS_STREAM_THRESHOLD']:
+        return Response(stream_records_json(records), mimetype='application/json')
+    
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'count': len(records),
+            'data': records
+        })
+
+
+@api_bp.route('/export', methods=['GET'])
+def export_records():
+    """Stream the full (filtered) history as CSV, NDJSON or columnar binary"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({
+            'status': 'error',
+            'message': f"format must be one of: {', '.join(FORMATS)}"
+        }), 400
+    
+    for name in ('start_date', 'end_date'):
+        if request.args.get(name) and parse_date_filter(request.args[name]) is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'{name} must be YYYY-MM-DD-HH-MM-SS-mmm'
+            }), 400
+    
+    direction = request.args.get('direction')
+    if direction and not validate_direction(direction):
+        return jsonify({
+            'status': 'error',
+            'message': 'Direction must be IN or OUT'
+        }), 400
+    
+    records = iter_records(
+        tracking_service.log,
+        start_date=request.args.get('start_date'),
+        end_date=request.args.get('end_date'),
+        tag=request.args.get('tag'),
+        portal_id=request.args.get('portal'),
+        direction=direction
+    )
+    mimetype, extension = FORMATS[fmt]
+    filename = time.strftime(f'records-%Y%m%d-%H%M%S.{extension}')
+    return Response(export(records, fmt), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 
 @api_bp.route('/records/<tag_id>', methods=['GET'])
 def get_tag_records(tag_id):
     """Get records for specific RFID tag"""
-    records = tracking_service.get_tag_records(tag_id)
+    with phase('query'):
+        records = tracking_service.get_tag_records(tag_id)
+        if request.args.get('enrich') == 'true':
+            records = asset_registry.enrich(records)
     
-    return jsonify({
-        'status': 'success',
-        'tag_id': tag_id,
-        'count': len(records),
-        'data': records
-    })
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'tag_id': tag_id,
+            'count': len(records),
+            'data': records
+        })
+
+
+@api_bp.route('/tags/state', methods=['GET', 'POST'])
+def get_tag_states():
+    """Latest movement and counts for many tags in one request (?tags=a,b or JSON {"tags": [...]})"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        tag_ids = data.get('tags') if isinstance(data, dict) else None
+    else:
+        tag_ids = [tag for tag in request.args.get('tags', '').split(',') if tag]
+    
+    if not isinstance(tag_ids, list) or not tag_ids or not all(isinstance(tag, str) for tag in tag_ids):
+        return jsonify({
+            'status': 'error',
+            'message': 'Send tags as ?tags=a,b or a JSON body {"tags": [...]}'
+        }), 400
+    
+    batch_max = current_app.config['TAG_BATCH_MAX']
+    if len(tag_ids) > batch_max:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {batch_max} tags per request'
+        }), 400
+    
+    with phase('query'):
+        states = tracking_service.get_tag_states(tag_ids)
+        if request.args.get('enrich') == 'true':
+            assets = asset_registry.lookup(tag_ids)
+            for tag_id, state in states.items():
+                if state is not None:
+                    state['asset'] = assets[tag_id]
+    
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'count': sum(1 for state in states.values() if state is not None),
+            'data': states
+        })
 
 
 @api_bp.route('/records', methods=['POST'])
@@ -105,11 +233,254 @@ def clear_records():
 @api_bp.route('/statistics', methods=['GET'])
 def get_statistics():
     """Get tracking statistics"""
-    stats = tracking_service.get_statistics()
+    with phase('query'):
+        stats = tracking_service.get_statistics(request.args.get('portal'), request.args.get('prefix'))
+        if request.args.get('enrich') == 'true':
+            stats['top_tags'] = asset_registry.enrich_top_tags(stats['top_tags'])
+    
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'data': stats
+        })
+
+
+@api_bp.route('/presence', methods=['GET'])
+def get_presence():
+    """Tags inside and outside at a past instant (?at=YYYY-MM-DD-HH-MM-SS-mmm, default now)"""
+    at = request.args.get('at')
+    if at and parse_date_filter(at) is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'at must be YYYY-MM-DD-HH-MM-SS-mmm'
+        }), 400
+    
+    with phase('query'):
+        inventory = presence_history.inventory(at, request.args.get('portal'))
+    
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'data': inventory
+        })
+
+
+def int_arg(name: str, default=None):
+    """Whole-number query parameter, or default when absent; ValueError names the parameter"""
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a whole number') from None
+
+
+@api_bp.route('/analytics', methods=['GET'])
+def get_analytics():
+    """Group the history by tag, portal, direction or time bucket and count"""
+    for name in ('start_date', 'end_date'):
+        if request.args.get(name) and parse_date_filter(request.args[name]) is None:
+            return jsonify({
+                'status': 'error',
+                'message': f'{name} must be YYYY-MM-DD-HH-MM-SS-mmm'
+            }), 400
+    
+    direction = request.args.get('direction')
+    if direction and not validate_direction(direction):
+        return jsonify({
+            'status': 'error',
+            'message': 'Direction must be IN or OUT'
+        }), 400
+    
+    try:
+        with phase('query'):
+            groups = analytics_service.aggregate(
+                [key for key in request.args.get('group_by', 'tag').split(',') if key],
+                start_date=request.args.get('start_date'),
+                end_date=request.args.get('end_date'),
+                portal_id=request.args.get('portal'),
+                tag=request.args.get('tag'),
+                direction=direction,
+                window=int_arg('window', 3600),
+                sort=request.args.get('sort', 'count'),
+                limit=int_arg('limit')
+            )
+    except ValueError as e:  # AnalyticsError or a malformed window/limit
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'backend': analytics_service.backend,
+            'count': len(groups),
+            'data': groups
+        })
+
+
+@api_bp.route('/dwell', methods=['GET'])
+def get_dwell():
+    """Get per-tag dwell times (time out between OUT and the next IN)"""
+    sort = request.args.get('sort', 'total_seconds')
+    if sort not in SORT_KEYS:
+        return jsonify({
+            'status': 'error',
+            'message': f"sort must be one of: {', '.join(SORT_KEYS)}"
+        }), 400
+    
+    try:
+        limit = int_arg('limit')
+        if limit is not None and limit < 0:
+            raise ValueError('limit must not be negative')
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    with phase('query'):
+        tags = session_service.get_all(
+            sort=sort,
+            out_only=request.args.get('out_only') == 'true',
+            limit=limit
+        )
+    
+    with phase('serialize'):
+        return jsonify({
+            'status': 'success',
+            'count': len(tags),
+            'data': tags
+        })
+
+
+@api_bp.route('/dwell/<tag_id>', methods=['GET'])
+def get_tag_dwell(tag_id):
+    """Get dwell times and recent sessions for specific RFID tag"""
+    dwell = session_service.get_tag(tag_id)
+    if dwell is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'No records for tag {tag_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': dwell
+    })
+
+
+@api_bp.route('/assets', methods=['GET'])
+def get_assets():
+    """Get registered assets"""
+    assets = asset_registry.all()
+    return jsonify({
+        'status': 'success',
+        'count': len(assets),
+        'data': assets
+    })
+
+
+@api_bp.route('/assets/<epc>', methods=['GET'])
+def get_asset(epc):
+    """Get a registered asset"""
+    asset = asset_registry.get(epc)
+    if asset is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown asset {epc}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': asset
+    })
+
+
+@api_bp.route('/assets', methods=['POST'])
+def import_assets():
+    """Add or update assets from a JSON object/list or CSV (epc,name,category,owner)"""
+    replace = request.args.get('replace') == 'true'
+    if request.mimetype == 'text/csv':
+        summary = asset_registry.import_csv(request.get_data(as_text=True), replace)
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, (dict, list)):
+            return jsonify({
+                'status': 'error',
+                'message': 'Send a JSON asset, a JSON list of assets or text/csv'
+            }), 400
+        summary = asset_registry.import_assets([data] if isinstance(data, dict) else data, replace)
+    
+    if not summary['applied']:
+        return jsonify({
+            'status': 'error',
+            'message': 'Registry not replaced: every row must be valid',
+            'data': summary
+        }), 400
+    
+    reload_acquisition_assets()
+    return jsonify({
+        'status': 'success',
+        'data': summary
+    })
+
+
+@api_bp.route('/assets/<epc>', methods=['DELETE'])
+def delete_asset(epc):
+    """Unregister an asset"""
+    if not asset_registry.remove(epc):
+        return jsonify({
+            'status': 'error',
+            'message': f'Unknown asset {epc}'
+        }), 404
+    
+    reload_acquisition_assets()
+    return jsonify({
+        'status': 'success',
+        'message': f'Asset {epc} removed'
+    })
+
+
+def reload_acquisition_assets():
+    """Have the acquisition process re-read the registry file for its allowlist"""
+    from app.services.acquisition import acquisition, AcquisitionError
+    
+    if acquisition.running:
+        try:
+            acquisition.request('reload_assets')
+        except AcquisitionError as e:
+            logger.warning("Asset allowlist not reloaded: %s", e)
+
+
+@api_bp.route('/portals', methods=['GET'])
+def get_portals():
+    """Get configured portals and their device status"""
+    from app.services.acquisition import portal_statuses, AcquisitionError
+    
+    try:
+        default_portal, portals = portal_statuses()
+    except AcquisitionError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    
+    return jsonify({
+        'status': 'success',
+        'default_portal': default_portal,
+        'count': len(portals),
+        'data': portals
+    })
+
+
+@api_bp.route('/sync', methods=['GET'])
+def get_sync_status():
+    """Get upstream sync progress"""
+    from app.services.sync_service import sync_service
     
     return jsonify({
         'status': 'success',
-        'data': stats
+        'data': sync_service.get_status()
     })
 
 
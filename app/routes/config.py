@@ -1,7 +1,8 @@
 
 from flask import Blueprint, jsonify, request, current_app
-from app.services.rfid_service import rfid_reader
-from app.services.sensor_service import sensor_manager
+from app.services.acquisition import acquisition, AcquisitionError, UnknownPortalError
+from app.services.device_commands import DeviceCommandError, DeviceCommandTimeout, wait_for
+from app.services.portal_service import portal_registry
 
 config_bp = Blueprint('config', __name__, url_prefix='/api/config')
 
@@ -26,6 +27,63 @@ def get_sensor_range():
     })
 
 
+def apply_setting(command: str, value, portal_id=None):
+    """Queue a setting on a portal's devices and wait until they apply it; returns an error response or None"""
+    try:
+        if acquisition.running:
+            acquisition.request(command, value, portal_id)
+            return None
+        portal = portal_registry.get(portal_id)
+        if portal is None:
+            return jsonify({'status': 'error', 'message': f'Unknown portal: {portal_id}'}), 404
+        if command == 'configure_power':
+            futures = [portal.rfid_reader.configure_power(value)]
+        else:
+            futures = portal.sensor_manager.configure_range(value)
+        wait_for(futures, current_app.config['DEVICE_COMMAND_TIMEOUT'])
+    except UnknownPortalError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 404
+    except AcquisitionError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    except DeviceCommandTimeout as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 504
+    except DeviceCommandError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 502
+    return None
+
+
+@config_bp.route('/rfid-power', methods=['POST'])
+def set_rfid_power():
+    """Configure RFID reader read power"""
+    data = request.get_json()
+    
+    if not data or 'power' not in data:
+        return jsonify({
+            'status': 'error',
+            'message': 'Missing required field: power (dBm)'
+        }), 400
+    
+    power = data['power']
+    min_power = current_app.config['RFID_POWER_MIN']
+    max_power = current_app.config['RFID_POWER_MAX']
+    
+    if not isinstance(power, int) or not (min_power <= power <= max_power):
+        return jsonify({
+            'status': 'error',
+            'message': f'Power must be between {min_power}-{max_power} dBm'
+        }), 400
+    
+    error = apply_setting('configure_power', power, data.get('portal'))
+    if error:
+        return error
+    
+    return jsonify({
+        'status': 'success',
+        'message': f'RFID power set to {power} dBm',
+        'power': power
+    })
+
+
 @config_bp.route('/sensor-range', methods=['POST'])
 def set_sensor_range():
     """Configure mmWave sensor detection range"""
@@ -47,7 +105,9 @@ def set_sensor_range():
             'message': f'Range must be between {min_range}-{max_range} meters'
         }), 400
     
-    sensor_manager.configure_range(distance)
+    error = apply_setting('configure_range', distance, data.get('portal'))
+    if error:
+        return error
     
     return jsonify({
         'status': 'success',
@@ -0,0 +1,10 @@
+from flask import Blueprint, Response
+from app.utils.metrics import registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of all metrics"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
\ No newline at end of file
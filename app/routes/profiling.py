@@ -0,0 +1,51 @@
+import hmac
+import time
+from flask import Blueprint, Response, jsonify, request, current_app
+from app.utils.profiling import sample_stacks, collapsed, profile_lock
+
+profiling_bp = Blueprint('profiling', __name__, url_prefix='/api/debug')
+
+@profiling_bp.before_request
+def check_token():
+    """Require PROFILING_TOKEN as a bearer token"""
+    token = current_app.config.get('PROFILING_TOKEN', '')
+    supplied = request.headers.get('Authorization', '').replace('Bearer ', '', 1)
+    if not token or not hmac.compare_digest(supplied.encode(), token.encode()):
+        return jsonify({
+            'status': 'error',
+            'message': 'Profiling requires Authorization: Bearer <PROFILING_TOKEN>'
+        }), 403
+
+
+@profiling_bp.route('/profile', methods=['GET'])
+def get_profile():
+    """Sample all threads for ?seconds=N and return collapsed stacks"""
+    try:
+        seconds = float(request.args.get('seconds', 5))
+        interval = float(request.args.get('interval_ms', 10)) / 1000
+    except ValueError:
+        return jsonify({
+            'status': 'error',
+            'message': 'seconds and interval_ms must be numbers'
+        }), 400
+    
+    max_seconds = current_app.config['PROFILE_MAX_SECONDS']
+    if not 0 < seconds <= max_seconds or not 0.001 <= interval <= 1:
+        return jsonify({
+            'status': 'error',
+            'message': f'seconds must be 0-{max_seconds}, interval_ms 1-1000'
+        }), 400
+    
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({
+            'status': 'error',
+            'message': 'A profile is already running'
+        }), 409
+    try:
+        stacks = sample_stacks(seconds, interval)
+    finally:
+        profile_lock.release()
+    
+    filename = time.strftime('profile-%Y%m%d-%H%M%S.folded')
+    return Response(collapsed(stacks), mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
@@ -1,7 +1,12 @@
 """
 Test endpoints for simulating hardware events (MOCK MODE ONLY)
 """
+import logging
+import time
 from flask import Blueprint, jsonify, request, current_app
+from app.services.scenario_service import scenario_jobs, generate_movements, portal_settings, MAX_MOVEMENTS
+
+logger = logging.getLogger(__name__)
 
 test_bp = Blueprint('test', __name__, url_prefix='/api/test')
 
@@ -41,26 +46,21 @@ def simulate_movement():
                 'message': 'Direction must be IN or OUT'
             }), 400
         
-        # Simulate sensor detection based on direction
+        # Simulate sensor detection based on direction, timestamped just before the
+        # read instead of sleeping, so the request returns immediately
+        detected_at = time.time() - 0.2
         if direction == 'IN':
             # Person detected outside, moving in
-            sensor_manager.trigger_outside_detection()
-            print(f"[TEST] Triggered OUTSIDE sensor (person moving IN)")
+            sensor_manager.trigger_outside_detection(detected_at)
+            logger.info("[TEST] Triggered OUTSIDE sensor (person moving IN)")
         else:
             # Person detected inside, moving out
-            sensor_manager.trigger_inside_detection()
-            print(f"[TEST] Triggered INSIDE sensor (person moving OUT)")
-        
-        # Small delay for sensor detection to register
-        import time
-        time.sleep(0.2)
+            sensor_manager.trigger_inside_detection(detected_at)
+            logger.info("[TEST] Triggered INSIDE sensor (person moving OUT)")
         
-        # Simulate RFID tag read
+        # Simulate RFID tag read (queued, picked up on the reader's next poll)
         rfid_reader.trigger_tag_read(tag_id)
         
-        # Wait for processing
-        time.sleep(0.3)
-        
         return jsonify({
             'status': 'success',
             'message': f'Simulated movement {direction}',
@@ -193,10 +193,114 @@ def get_test_scenarios():
             'name': 'Multiple Movements',
             'description': 'Call simulate-movement multiple times with different tags',
             'note': 'Execute multiple requests sequentially'
+        },
+        {
+            'name': 'Load Scenario',
+            'description': 'Replay 1000 movements, some side by side or crossing, on a virtual clock',
+            'endpoint': '/api/test/scenarios/run',
+            'method': 'POST',
+            'body': {'generate': {'count': 1000, 'simultaneous_prob': 0.1, 'crossing_prob': 0.1}},
+            'note': 'Returns a job; poll /api/test/jobs/<job_id> for results'
         }
     ]
     
     return jsonify({
         'status': 'success',
         'scenarios': scenarios
+    })
+
+
+@test_bp.route('/scenarios/run', methods=['POST'])
+def run_scenario_job():
+    """
+    Run a scripted movement scenario in the background
+    
+    Body:
+    {
+        "movements": [{"t": 0.0, "tag_id": "E200...", "direction": "IN", "read_offset": 0.0}],
+        "generate": {"count": 1000, "gap": 2.0, "simultaneous_prob": 0.1,
+                     "crossing_prob": 0.1, "early_read_prob": 0.0, "seed": 1},  // instead of movements
+        "persist": false,  // write recorded movements to the tracking store
+        "portal": "main"  // correlation settings and portal_id for persisted records
+    }
+    """
+    try:
+        from app.services.portal_service import portal_registry
+        
+        data = request.get_json() or {}
+        portal = portal_registry.get(data.get('portal'))
+        if portal is None:
+            return jsonify({
+                'status': 'error',
+                'message': f"Unknown portal: {data.get('portal')}"
+            }), 404
+        
+        if 'movements' in data:
+            movements = data['movements']
+            if not isinstance(movements, list) or not all(
+                    isinstance(m, dict) and 'tag_id' in m and 't' in m
+                    and str(m.get('direction', '')).upper() in ('IN', 'OUT') for m in movements):
+                return jsonify({
+                    'status': 'error',
+                    'message': 'Each movement needs t, tag_id and direction (IN or OUT)'
+                }), 400
+        else:
+            options = data.get('generate', {})
+            if not 0 < int(options.get('count', 100)) <= MAX_MOVEMENTS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Scenario must have 1-{MAX_MOVEMENTS} movements'
+                }), 400
+            movements = generate_movements(**options)
+        
+        if not movements or len(movements) > MAX_MOVEMENTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'Scenario must have 1-{MAX_MOVEMENTS} movements'
+            }), 400
+        
+        job = scenario_jobs.submit(movements, portal_settings(portal),
+                                   bool(data.get('persist', False)), portal.portal_id)
+        
+        return jsonify({
+            'status': 'success',
+            'job_id': job['job_id'],
+            'movements': job['movements'],
+            'href': f"/api/test/jobs/{job['job_id']}"
+        }), 202
+    
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'message': f'Invalid generate options: {e}'
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+
+@test_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """Get recent scenario jobs (without results)"""
+    return jsonify({
+        'status': 'success',
+        'data': scenario_jobs.all()
+    })
+
+
+@test_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get a scenario job and, once done, its results"""
+    job = scenario_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': 'Job not found'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': job
     })
\ No newline at end of file
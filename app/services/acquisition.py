@@ -0,0 +1,363 @@
+"""
+Device acquisition in its own process, publishing into a shared-memory event ring
+
+The web process creates the ring and starts a fresh interpreter that owns the serial
+ports, portal workers and correlation (ACQUISITION_MODE=process). Recorded movements
+and device state changes are written into fixed-size slots; the web process drains them
+into the tracking store. Commands (status, power, range) go over a socket pair.
+
+Ring layout (little-endian):
+    0    magic b'RFRING1\\0', <I slots>, <I slot size>
+    64   <Q write sequence>   (producer)
+    128  <Q read sequence>    (consumer)
+    192  <Q dropped events>
+    256  slots: <Q seq> <B kind> <B direction> <B subject length> <B portal length> 4x
+                <d read time> <d confidence, NaN = none> 64s subject 32s portal
+"""
+import argparse
+import atexit
+import logging
+import math
+import os
+import socket
+import struct
+import subprocess
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional, Tuple
+from app.services.tracking_service import tracking_service
+from app.utils.metrics import Gauge, Counter, registry
+
+logger = logging.getLogger(__name__)
+
+RING_MAGIC = b'RFRING1\0'
+HEADER_SIZE = 256
+WRITE_OFFSET, READ_OFFSET, DROPPED_OFFSET = 64, 128, 192
+SLOT = struct.Struct('<QBBBB4xdd64s32s')  # sequence number, then the payload
+SEQUENCE = struct.Struct('<Q')
+PAYLOAD = struct.Struct('<BBBB4xdd64s32s')  # SLOT after its sequence number, written separately
+KIND_RECORD, KIND_STATUS = 1, 2
+DIRECTIONS = {'IN': 1, 'OUT': 2}
+DIRECTION_NAMES = {code: name for name, code in DIRECTIONS.items()}
+STATUS_FIELDS = ('rfid_reader', 'sensor_inside', 'sensor_outside')
+
+# Reported from the ring header at scrape time
+ring_depth = Gauge('acquisition_ring_depth', 'Events published but not yet consumed')
+ring_dropped = Counter('acquisition_ring_dropped', 'Events dropped because the ring was full')
+ring_consumed = registry.counter('acquisition_events_consumed', 'Events consumed from the acquisition ring')
+
+
+class AcquisitionError(Exception):
+    """Acquisition process not running or not answering"""
+
+
+class UnknownPortalError(AcquisitionError):
+    """Command for a portal the acquisition process does not run"""
+
+
+class EventRing:
+    """Fixed-size event slots in shared memory: one producer process, one consumer
+
+    Safe without locks between the processes only because of the write order: the payload,
+    then the slot's sequence number, then the write index, each a separate store. The
+    consumer trusts a slot when its sequence number is right both before and after it
+    copies the payload (a seqlock), so a payload not fully visible yet is read next time.
+    """
+    
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        self.memory = memory
+        self.buf = memory.buf
+        self.owner = owner  # the creator unlinks the segment
+        magic, self.slots, slot_size = struct.unpack_from('<8sII', self.buf)
+        if magic != RING_MAGIC or slot_size != SLOT.size:
+            raise ValueError(f"{memory.name} is not an event ring")
+        self.lock = threading.Lock()  # portal workers publish from several threads
+        self.read = SEQUENCE.unpack_from(self.buf, READ_OFFSET)[0]  # consumer side cursor
+    
+    @property
+    def name(self) -> str:
+        return self.memory.name
+    
+    @classmethod
+    def create(cls, slots: int) -> 'EventRing':
+        """New zeroed ring"""
+        memory = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + slots * SLOT.size)
+        memory.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        struct.pack_into('<8sII', memory.buf, 0, RING_MAGIC, slots, SLOT.size)
+        return cls(memory, owner=True)
+    
+    @classmethod
+    def attach(cls, name: str) -> 'EventRing':
+        """Open a ring created by another process"""
+        memory = shared_memory.SharedMemory(name=name)
+        # This process's resource tracker would unlink the segment when it exits
+        resource_tracker.unregister(memory._name, 'shared_memory')
+        return cls(memory, owner=False)
+    
+    def publish(self, kind: int, subject: str, portal_id: str = '', read_time: float = 0.0,
+                confidence: Optional[float] = None, direction: int = 0) -> bool:
+        """Write one event; never blocks, drops (and counts) when the ring is full"""
+        subject_bytes = subject.encode('utf-8')
+        portal_bytes = (portal_id or '').encode('utf-8')
+        if len(subject_bytes) > 64 or len(portal_bytes) > 32:
+            logger.warning("Event too large for the acquisition ring: %s", subject)
+            return False
+        with self.lock:
+            write = SEQUENCE.unpack_from(self.buf, WRITE_OFFSET)[0]
+            if write - SEQUENCE.unpack_from(self.buf, READ_OFFSET)[0] >= self.slots:
+                dropped = SEQUENCE.unpack_from(self.buf, DROPPED_OFFSET)[0]
+                SEQUENCE.pack_into(self.buf, DROPPED_OFFSET, dropped + 1)
+                return False
+            slot = HEADER_SIZE + (write % self.slots) * SLOT.size
+            SEQUENCE.pack_into(self.buf, slot, 0)  # invalid while the payload changes
+            PAYLOAD.pack_into(self.buf, slot + SEQUENCE.size, kind, direction, len(subject_bytes), len(portal_bytes),
+                              read_time, math.nan if confidence is None else confidence, subject_bytes, portal_bytes)
+            SEQUENCE.pack_into(self.buf, slot, write + 1)  # the slot is valid only after its payload
+            SEQUENCE.pack_into(self.buf, WRITE_OFFSET, write + 1)  # publish after the slot is complete
+        return True
+    
+    def publish_record(self, tag_id: str, direction: str, portal_id: str, read_time: float,
+                       confidence: Optional[float]):
+        """Portal record sink"""
+        self.publish(KIND_RECORD, tag_id, portal_id, read_time, confidence, DIRECTIONS.get(direction.upper(), 0))
+    
+    def consume(self, limit: int = 512) -> List[Tuple[int, str, str, float, Optional[float], Optional[str]]]:
+        """Events after the read cursor: (kind, subject, portal_id, read_time, confidence, direction)"""
+        write = SEQUENCE.unpack_from(self.buf, WRITE_OFFSET)[0]
+        events = []
+        read = self.read
+        while read < write and len(events) < limit:
+            slot = HEADER_SIZE + (read % self.slots) * SLOT.size
+            if SEQUENCE.unpack_from(self.buf, slot)[0] != read + 1:
+                break  # slot not visible yet, pick it up next time
+            kind, direction, subject_len, portal_len, read_time, confidence, subject, portal = \
+                PAYLOAD.unpack_from(self.buf, slot + SEQUENCE.size)
+            if SEQUENCE.unpack_from(self.buf, slot)[0] != read + 1:
+                break  # changed while copying: retry next time
+            events.append((kind, subject[:subject_len].decode('utf-8'), portal[:portal_len].decode('utf-8'),
+                           read_time, None if confidence != confidence else confidence,
+                           DIRECTION_NAMES.get(direction)))
+            read += 1
+        if read != self.read:
+            self.read = read
+            SEQUENCE.pack_into(self.buf, READ_OFFSET, read)
+        return events
+    
+    def depth(self) -> int:
+        """Events waiting to be consumed"""
+        return SEQUENCE.unpack_from(self.buf, WRITE_OFFSET)[0] - SEQUENCE.unpack_from(self.buf, READ_OFFSET)[0]
+    
+    def dropped(self) -> int:
+        """Events dropped because the ring was full"""
+        return SEQUENCE.unpack_from(self.buf, DROPPED_OFFSET)[0]
+    
+    def close(self):
+        """Detach (and unlink, for the creator)"""
+        self.buf = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class AcquisitionProcess:
+    """Web-process side: starts the acquisition process and drains its ring"""
+    
+    def __init__(self):
+        self.ring: Optional[EventRing] = None
+        self.process: Optional[subprocess.Popen] = None
+        self.control: Optional[Connection] = None
+        self.control_lock = threading.Lock()
+        self.consumer = None
+        self.running = False
+        self.poll_interval = 0.02
+        self.request_timeout = 5.0
+        self._stop = threading.Event()
+    
+    def start(self, config):
+        """Create the ring, start the acquisition process and the consumer thread"""
+        if self.running:
+            return
+        self.poll_interval = config['ACQUISITION_POLL_INTERVAL']
+        self.ring = EventRing.create(config['ACQUISITION_RING_SLOTS'])
+        parent_end, child_end = socket.socketpair()
+        settings = {key: value for key, value in config.items()
+                    if key.isupper() and isinstance(value, (str, int, float, bool, type(None)))}
+        
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')])))
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', 'import sys; from app.services.acquisition import main; sys.exit(main())',
+             '--ring', self.ring.name, '--control-fd', str(child_end.fileno())],
+            pass_fds=(child_end.fileno(),), env=env
+        )
+        child_end.close()
+        self.control = Connection(parent_end.detach())
+        self.control.send(settings)
+        
+        self.running = True
+        self._stop.clear()
+        self.consumer = threading.Thread(target=self.consume_loop, name='acquisition-consumer', daemon=True)
+        self.consumer.start()
+        atexit.register(self.stop)
+        logger.info("Acquisition process started (pid %d, %d ring slots)", self.process.pid, self.ring.slots)
+    
+    def consume_loop(self):
+        """Move events from the ring into the tracking store"""
+        while not self._stop.is_set():
+            events = self.ring.consume()
+            for kind, subject, portal_id, read_time, confidence, direction in events:
+                try:
+                    if kind == KIND_RECORD:
+                        tracking_service.add_record(subject, direction, portal_id, read_time, confidence)
+                    elif kind == KIND_STATUS:
+                        field, _, state = subject.partition('=')
+                        tracking_service.update_status(**{field: state})
+                except Exception as e:
+                    logger.error("Acquisition event error: %s", e)
+            ring_consumed.inc(len(events))
+            if not events:
+                if self.process.poll() is not None and not self._stop.is_set():
+                    logger.error("Acquisition process exited with code %s", self.process.returncode)
+                    tracking_service.update_status(**{field: 'error' for field in STATUS_FIELDS})
+                    return
+                self._stop.wait(self.poll_interval)
+    
+    def request(self, command: str, *args):
+        """Run a command in the acquisition process and return its result"""
+        if not self.running:
+            raise AcquisitionError("Acquisition process is not running")
+        with self.control_lock:
+            try:
+                self.control.send((command, args))
+                if not self.control.poll(self.request_timeout):
+                    raise AcquisitionError(f"Acquisition process did not answer {command}")
+                ok, result = self.control.recv()
+            except (OSError, EOFError) as e:
+                raise AcquisitionError(f"Acquisition process unavailable: {e}")
+        if not ok:
+            raise result if isinstance(result, Exception) else AcquisitionError(result)
+        return result
+    
+    def stop(self):
+        """Stop the acquisition process, drain what it published and remove the ring"""
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()  # the consumer stops here; what is left is drained below
+        try:
+            with self.control_lock:
+                self.control.send(('stop', ()))
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.consumer.join(timeout=5)
+        for kind, subject, portal_id, read_time, confidence, direction in self.ring.consume(self.ring.slots):
+            if kind == KIND_RECORD:
+                tracking_service.add_record(subject, direction, portal_id, read_time, confidence)
+        self.control.close()
+        self.ring.close()
+        logger.info("Acquisition process stopped")
+    
+    def collect_metrics(self):
+        """Ring depth and drops for /metrics"""
+        if self.ring is None or not self.running:
+            return
+        yield ring_depth, [('', {}, self.ring.depth())]
+        yield ring_dropped, [('', {}, self.ring.dropped())]
+
+
+def portal_statuses() -> Tuple[Optional[str], List[dict]]:
+    """Default portal ID and the status of every portal, wherever the devices run"""
+    if acquisition.running:
+        result = acquisition.request('status')
+        return result['default_portal'], result['portals']
+    from app.services.portal_service import portal_registry
+    return portal_registry.default_portal_id, [portal.get_status() for portal in portal_registry.all()]
+
+
+def serve(settings: dict, ring: EventRing, control: Connection):
+    """Acquisition process body: run the portals and answer commands until told to stop"""
+    from flask import Flask
+    from app.services.asset_registry import asset_registry
+    from app.services.device_commands import DeviceCommandError, wait_for
+    from app.services.portal_service import portal_registry
+    
+    app = Flask(__name__)
+    app.config.update(settings)
+    cpus = settings.get('ACQUISITION_CPUS')
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {int(cpu) for cpu in cpus.split(',')})
+    with app.app_context():
+        asset_registry.initialize()
+        portal_registry.initialize(mock=settings['MOCK_MODE'], record_sink=ring.publish_record)
+    
+    def portal(portal_id):
+        found = portal_registry.get(portal_id)
+        if found is None:
+            raise UnknownPortalError(f"Unknown portal: {portal_id}")
+        return found
+    
+    timeout = settings['DEVICE_COMMAND_TIMEOUT']  # devices apply settings on their own threads
+    handlers = {
+        'status': lambda: {'default_portal': portal_registry.default_portal_id,
+                           'portals': [portal.get_status() for portal in portal_registry.all()]},
+        'configure_power': lambda dbm, portal_id=None:
+            wait_for([portal(portal_id).rfid_reader.configure_power(dbm)], timeout)[0],
+        'configure_range': lambda distance, portal_id=None:
+            wait_for(portal(portal_id).sensor_manager.configure_range(distance), timeout)[0],
+        'reload_assets': asset_registry.load  # the web process changed the registry file
+    }
+    published: Dict[str, str] = {}
+    while True:
+        # Primary device states are mirrored into this process's status; forward changes
+        status = tracking_service.status
+        for field in STATUS_FIELDS:
+            state = getattr(status, field)
+            if published.get(field) != state and ring.publish(KIND_STATUS, f'{field}={state}'):
+                published[field] = state
+        
+        try:
+            if not control.poll(0.5):
+                continue
+            command, args = control.recv()
+        except (EOFError, OSError):
+            break  # web process gone
+        if command == 'stop':
+            break
+        try:
+            control.send((True, handlers[command](*args)))
+        except (UnknownPortalError, DeviceCommandError) as e:
+            control.send((False, e))  # raised as is in the web process, which maps it like thread mode
+        except Exception as e:
+            control.send((False, f"{command} failed: {e}"))
+    
+    portal_registry.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='RFID acquisition process (started by the web process)')
+    parser.add_argument('--ring', required=True, help='Shared memory name of the event ring')
+    parser.add_argument('--control-fd', type=int, required=True, help='Socket for commands from the web process')
+    args = parser.parse_args(argv)
+    
+    from app.utils.log import init_logging
+    control = Connection(args.control_fd)
+    settings = control.recv()
+    init_logging(settings)
+    ring = EventRing.attach(args.ring)
+    try:
+        serve(settings, ring, control)
+    finally:
+        ring.close()
+    return 0
+
+
+# Global acquisition process (used when ACQUISITION_MODE=process)
+acquisition = AcquisitionProcess()
+registry.add_collector(acquisition.collect_metrics)
@@ -0,0 +1,273 @@
+"""
+Group-by aggregates over the record history, vectorized with NumPy when it is installed
+"""
+import math
+import threading
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+from app.services.tracking_service import tracking_service
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python path gives the same results
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+KEYS = ('tag', 'portal', 'direction', 'hour', 'day', 'hour_of_day', 'weekday', 'window')
+SORT_KEYS = ('count', 'in', 'out', 'key')
+
+
+class AnalyticsError(ValueError):
+    """Invalid group-by query"""
+
+
+class RecordColumns:
+    """Records as parallel typed columns; tags and portals as codes into their name lists"""
+    
+    def __init__(self):
+        self.tag = array('i')
+        self.portal = array('i')
+        self.inbound = array('b')  # 1 = IN, 0 = OUT
+        self.ms = array('q')  # read_date as wall-clock ms since 1970-01-01 (no time zone, like read_date)
+        self.tags: List[str] = []
+        self.portals: List[str] = []
+        self.tag_codes: Dict[str, int] = {}
+        self.portal_codes: Dict[str, int] = {}
+        self._hours: Dict[tuple, int] = {}  # (YYYY, MM, DD, HH) -> ms at the start of the hour
+    
+    def __len__(self):
+        return len(self.ms)
+    
+    def code(self, names: List[str], codes: Dict[str, int], name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+    
+    def to_ms(self, read_date: str) -> int:
+        """YYYY-MM-DD-HH-MM-SS-mmm as wall-clock ms since 1970-01-01 (fields need not be zero-padded)"""
+        y, mo, d, h, mi, sec, fraction = read_date.split('-')
+        hour = self._hours.get((y, mo, d, h))
+        if hour is None:
+            day = datetime(int(y), int(mo), int(d)).toordinal() - EPOCH_ORDINAL
+            hour = self._hours[y, mo, d, h] = day * DAY_MS + int(h) * HOUR_MS
+        # The last field is a fraction of a second, as parse_date_filter reads it ('5' = 500 ms)
+        return hour + int(mi) * 60000 + int(sec) * 1000 + int(fraction[:3].ljust(3, '0'))
+    
+    def append(self, record: dict):
+        self.tag.append(self.code(self.tags, self.tag_codes, record['rfid_tag']))
+        self.portal.append(self.code(self.portals, self.portal_codes, record.get('portal_id') or ''))
+        self.inbound.append(record['direction'] == 'IN')
+        self.ms.append(self.to_ms(record['read_date']))
+
+
+def ms_label(ms: int, fmt: str) -> str:
+    return (EPOCH + timedelta(milliseconds=ms)).strftime(fmt)
+
+
+class AnalyticsService:
+    """Keeps columns in step with the tracking store and answers group-by queries from them"""
+    
+    def __init__(self, store=None):
+        self.store = store if store is not None else tracking_service
+        self.columns = RecordColumns()
+        self.log = None  # the RecordLog the columns were built from
+        self.lock = threading.Lock()
+    
+    @property
+    def backend(self) -> str:
+        return 'numpy' if np is not None else 'python'
+    
+    def catch_up(self) -> RecordColumns:
+        """Append records added since the last query, starting over if the store was cleared or replaced"""
+        with self.lock:
+            log = self.store.log
+            if log is not self.log:
+                self.columns, self.log = RecordColumns(), log
+            columns, records = self.columns, log.records
+            for position in range(len(columns), len(records)):
+                columns.append(records[position])
+            return columns
+    
+    def aggregate(self, group_by: Sequence[str], start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  portal_id: Optional[str] = None, tag: Optional[str] = None, direction: Optional[str] = None,
+                  window: int = 3600, sort: str = 'count', limit: Optional[int] = None) -> List[dict]:
+        """Count, IN, OUT and IN share per group, largest first by `sort`"""
+        unknown = [key for key in group_by if key not in KEYS]
+        if not group_by or unknown:
+            raise AnalyticsError(f"group_by must be a comma-separated list of: {', '.join(KEYS)}")
+        if len(set(group_by)) != len(group_by):
+            raise AnalyticsError('group_by keys must not repeat')
+        if sort not in SORT_KEYS:
+            raise AnalyticsError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+        if window <= 0:
+            raise AnalyticsError('window must be a positive number of seconds')
+        if limit is not None and limit < 0:
+            raise AnalyticsError('limit must not be negative')
+        
+        columns = self.catch_up()
+        with self.lock:
+            end = len(columns)
+            bounds = (columns.to_ms(start_date) if start_date else None,
+                      columns.to_ms(end_date) if end_date else None)
+            portal = columns.portal_codes.get(portal_id, -1) if portal_id else None
+            tag_code = columns.tag_codes.get(tag, -1) if tag else None
+            inbound = None if not direction else int(direction.upper() == 'IN')
+            if np is not None:
+                # Copy out so the columns can keep growing (an array cannot resize while viewed)
+                data = {name: np.frombuffer(getattr(columns, name), dtype=dtype)[:end].copy()
+                        for name, dtype in (('tag', np.int32), ('portal', np.int32),
+                                            ('inbound', np.int8), ('ms', np.int64))}
+        
+        filters = (bounds, portal, tag_code, inbound)
+        # Ranked and cut on the raw codes, so only the groups returned get labels
+        top = None if sort == 'key' else (sort, limit)
+        if np is not None:
+            groups = self._aggregate_numpy(data, group_by, filters, window * 1000, top)
+        else:
+            groups = self._aggregate_python(columns, end, group_by, filters, window * 1000, top)
+        
+        results = [self._row(columns, group_by, key, count, ins, window * 1000) for key, count, ins in groups]
+        if sort == 'key':
+            results.sort(key=lambda row: tuple(row[k] for k in group_by))
+            return results[:limit] if limit else results
+        return results
+    
+    def _aggregate_numpy(self, data: dict, group_by: Sequence[str], filters: tuple, window_ms: int,
+                         top: Optional[tuple]) -> list:
+        """(key tuple, count, IN count) per group, vectorized"""
+        (start_ms, end_ms), portal, tag_code, inbound = filters
+        mask = np.ones(len(data['ms']), dtype=bool)
+        if start_ms is not None:
+            mask &= data['ms'] >= start_ms
+        if end_ms is not None:
+            mask &= data['ms'] <= end_ms
+        if portal is not None:
+            mask &= data['portal'] == portal
+        if tag_code is not None:
+            mask &= data['tag'] == tag_code
+        if inbound is not None:
+            mask &= data['inbound'] == inbound
+        if not mask.all():
+            data = {name: column[mask] for name, column in data.items()}
+        if not len(data['ms']):
+            return []
+        
+        values = [self._key_values_numpy(data, key, window_ms) for key in group_by]
+        radices = [(int(column.min()), int(column.max()) - int(column.min()) + 1) for column in values]
+        if math.prod(radix for _, radix in radices) < 2 ** 63:
+            # One int64 per row from the key columns, so a single unique/bincount does the grouping
+            composite = np.zeros(len(data['ms']), dtype=np.int64)
+            for column, (low, radix) in zip(values, radices):
+                composite = composite * radix + (column - low)
+            unique, inverse = np.unique(composite, return_inverse=True)
+            keys = []
+            remaining = unique
+            for low, radix in reversed(radices):
+                keys.append(remaining % radix + low)
+                remaining = remaining // radix
+            keys.reverse()
+        else:
+            # Too many combinations for one int64: unique rows of the stacked key columns
+            unique, inverse = np.unique(np.stack(values), axis=1, return_inverse=True)
+            keys = list(unique)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse)
+        ins = np.bincount(inverse, weights=data['inbound']).astype(np.int64)
+        if top is not None:
+            sort, limit = top
+            metric = {'count': counts, 'in': ins, 'out': counts - ins}[sort]
+            # Groups come out of unique in key order, so ties stay in key order as in the Python path
+            order = np.lexsort((np.arange(len(counts)), -metric))
+            if limit:
+                order = order[:limit]
+            keys = [column[order] for column in keys]
+            counts, ins = counts[order], ins[order]
+        return [(tuple(int(column[i]) for column in keys), int(counts[i]), int(ins[i])) for i in range(len(counts))]
+    
+    @staticmethod
+    def _key_values_numpy(data: dict, key: str, window_ms: int):
+        ms = data['ms']
+        if key == 'tag':
+            return data['tag'].astype(np.int64)
+        if key == 'portal':
+            return data['portal'].astype(np.int64)
+        if key == 'direction':
+            return data['inbound'].astype(np.int64)
+        if key == 'hour':
+            return ms // HOUR_MS
+        if key == 'day':
+            return ms // DAY_MS
+        if key == 'hour_of_day':
+            return ms // HOUR_MS % 24
+        if key == 'weekday':
+            return (ms // DAY_MS + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+        return ms // window_ms
+    
+    def _aggregate_python(self, columns: RecordColumns, end: int, group_by: Sequence[str], filters: tuple,
+                          window_ms: int, top: Optional[tuple]) -> list:
+        """(key tuple, count, IN count) per group, one pass over the columns"""
+        (start_ms, end_ms), portal, tag_code, inbound = filters
+        extract = {
+            'tag': lambda i, ms: columns.tag[i],
+            'portal': lambda i, ms: columns.portal[i],
+            'direction': lambda i, ms: columns.inbound[i],
+            'hour': lambda i, ms: ms // HOUR_MS,
+            'day': lambda i, ms: ms // DAY_MS,
+            'hour_of_day': lambda i, ms: ms // HOUR_MS % 24,
+            'weekday': lambda i, ms: (ms // DAY_MS + 3) % 7,
+            'window': lambda i, ms: ms // window_ms
+        }
+        getters = [extract[key] for key in group_by]
+        groups: Dict[tuple, list] = {}
+        for i in range(end):
+            ms = columns.ms[i]
+            if ((start_ms is not None and ms < start_ms) or (end_ms is not None and ms > end_ms)
+                    or (portal is not None and columns.portal[i] != portal)
+                    or (tag_code is not None and columns.tag[i] != tag_code)
+                    or (inbound is not None and columns.inbound[i] != inbound)):
+                continue
+            key = tuple(get(i, ms) for get in getters)
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = [0, 0]
+            group[0] += 1
+            group[1] += columns.inbound[i]
+        results = [(key, count, ins) for key, (count, ins) in groups.items()]
+        if top is not None:
+            sort, limit = top
+            metric = {'count': lambda g: g[1], 'in': lambda g: g[2], 'out': lambda g: g[1] - g[2]}[sort]
+            results.sort(key=lambda g: (-metric(g), g[0]))
+            results = results[:limit] if limit else results
+        return results
+    
+    @staticmethod
+    def _row(columns: RecordColumns, group_by: Sequence[str], key: tuple, count: int, ins: int,
+             window_ms: int) -> dict:
+        row = {}
+        for name, value in zip(group_by, key):
+            if name == 'tag':
+                row[name] = columns.tags[value]
+            elif name == 'portal':
+                row[name] = columns.portals[value]
+            elif name == 'direction':
+                row[name] = 'IN' if value else 'OUT'
+            elif name == 'hour':
+                row[name] = ms_label(value * HOUR_MS, '%Y-%m-%d-%H')
+            elif name == 'day':
+                row[name] = ms_label(value * DAY_MS, '%Y-%m-%d')
+            elif name == 'window':
+                row[name] = ms_label(value * window_ms, '%Y-%m-%d-%H-%M-%S')
+            else:
+                row[name] = value
+        row.update({'count': count, 'in': ins, 'out': count - ins, 'in_ratio': round(ins / count, 4)})
+        return row
+
+
+# Global analytics service instance
+analytics_service = AnalyticsService()
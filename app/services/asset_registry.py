@@ -0,0 +1,153 @@
+"""
+Asset registry: EPC -> name, category, owner, used to filter reads and enrich responses
+"""
+import csv
+import io
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+from flask import current_app
+from app.utils.helpers import load_json_file, save_json_file
+
+logger = logging.getLogger(__name__)
+
+ASSET_FIELDS = ('name', 'category', 'owner')
+MIN_EPC_LENGTH = 4  # same as the reader's minimum tag line
+
+
+def normalize_epc(epc) -> str:
+    """EPCs are matched case-insensitively, without surrounding whitespace"""
+    return str(epc).strip().upper()
+
+
+class AssetRegistry:
+    """Known tags in a dict that is replaced on every change, so lookups never lock"""
+    
+    def __init__(self):
+        self.assets: Dict[str, dict] = {}  # EPC -> {'epc', 'name', 'category', 'owner'}
+        self.version = 0  # bumped on every change (cache key for enriched responses)
+        self.assets_file: Optional[str] = None
+        self._lock = threading.Lock()  # writers only
+    
+    def initialize(self, assets_file: Optional[str] = None):
+        """Load the registry file (ASSETS_FILE by default)"""
+        self.assets_file = assets_file or current_app.config['ASSETS_FILE']
+        self.load()
+    
+    def load(self):
+        """Replace the registry with the contents of the registry file"""
+        assets = {}
+        for row in load_json_file(self.assets_file, []):
+            asset = self._validate(row)
+            if isinstance(asset, dict):
+                assets[asset['epc']] = asset
+        with self._lock:
+            self.assets = assets
+            self.version += 1
+        logger.info("Asset registry: %d assets", len(assets))
+    
+    def __len__(self):
+        return len(self.assets)
+    
+    def get(self, epc: str) -> Optional[dict]:
+        """Asset for a tag, or None"""
+        return self.assets.get(normalize_epc(epc))
+    
+    def is_known(self, epc: str) -> bool:
+        """Whether a tag is registered (allowlist check in the read path)"""
+        return epc.upper() in self.assets
+    
+    def all(self) -> List[dict]:
+        """Every asset, by EPC"""
+        assets = self.assets
+        return [assets[epc] for epc in sorted(assets)]
+    
+    def import_assets(self, rows: Iterable, replace: bool = False) -> dict:
+        """Add or update assets in one swap (replace=True drops assets not in rows, all or nothing)"""
+        valid, rejected = {}, []
+        for index, row in enumerate(rows):
+            asset = self._validate(row)
+            if isinstance(asset, dict):
+                valid[asset['epc']] = asset
+            else:
+                rejected.append({'row': index, 'message': asset})
+        
+        if replace and (rejected or not valid):
+            # A bad file must not empty the registry (with the allowlist on, every read would be dropped)
+            return {'applied': False, 'added': 0, 'updated': 0, 'removed': 0, 'rejected': rejected,
+                    'total': len(self.assets)}
+        
+        with self._lock:
+            current = self.assets
+            assets = dict(valid) if replace else dict(current, **valid)
+            added = sum(1 for epc in valid if epc not in current)
+            self.assets = assets
+            self.version += 1
+            self.save()
+        
+        return {
+            'applied': True,
+            'added': added,
+            'updated': len(valid) - added,
+            'removed': len(current) - (len(valid) - added) if replace else 0,
+            'rejected': rejected,
+            'total': len(assets)
+        }
+    
+    def import_csv(self, text: str, replace: bool = False) -> dict:
+        """Import CSV with an epc column and optional name, category, owner columns (any case)"""
+        rows = csv.DictReader(io.StringIO(text))
+        return self.import_assets(({(key or '').strip().lower(): value for key, value in row.items()} for row in rows),
+                                  replace)
+    
+    def remove(self, epc: str) -> bool:
+        """Unregister a tag"""
+        epc = normalize_epc(epc)
+        with self._lock:
+            if epc not in self.assets:
+                return False
+            assets = dict(self.assets)
+            del assets[epc]
+            self.assets = assets
+            self.version += 1
+            self.save()
+        return True
+    
+    def save(self):
+        """Write the registry file (callers hold the lock)"""
+        if self.assets_file:
+            assets = self.assets
+            save_json_file(self.assets_file, [assets[epc] for epc in sorted(assets)])
+    
+    def lookup(self, epcs: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Assets for many tags from one registry snapshot"""
+        assets = self.assets
+        return {epc: assets.get(epc.upper()) for epc in epcs}
+    
+    def enrich(self, records: List[dict]) -> List[dict]:
+        """Copies of records with their asset (or None) under 'asset'; one registry snapshot for all"""
+        assets = self.assets
+        return [dict(record, asset=assets.get(record['rfid_tag'].upper())) for record in records]
+    
+    def enrich_top_tags(self, top_tags: List[dict]) -> List[dict]:
+        """Statistics top_tags entries with their asset"""
+        assets = self.assets
+        return [dict(entry, asset=assets.get(entry['tag'].upper())) for entry in top_tags]
+    
+    @staticmethod
+    def _validate(row):
+        """Asset dict from an import row, or an error message"""
+        if not isinstance(row, dict):
+            return 'not an object'
+        epc = normalize_epc(row.get('epc') or '')
+        if len(epc) < MIN_EPC_LENGTH:
+            return f'epc must be at least {MIN_EPC_LENGTH} characters'
+        asset = {'epc': epc}
+        for field in ASSET_FIELDS:
+            value = row.get(field)
+            asset[field] = str(value).strip() if value not in (None, '') else None
+        return asset
+
+
+# Global asset registry instance
+asset_registry = AssetRegistry()
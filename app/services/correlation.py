@@ -0,0 +1,137 @@
+"""
+Tag read / sensor detection correlation pipeline (one per portal)
+"""
+import heapq
+import itertools
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+from app.services.direction_engine import DirectionEngine
+
+class PendingReadBuffer:
+    """Tag reads waiting for a sensor detection, kept in read-time order"""
+    
+    def __init__(self, expiry: float = 2.0):
+        self.expiry = expiry  # seconds a read may wait for a detection
+        self.reads = deque()  # (read_time, tag_id), oldest first
+    
+    def add(self, tag_id: str, read_time: float):
+        """Buffer a read that arrived before any detection"""
+        self.reads.append((read_time, tag_id))
+    
+    def expire(self, now: float) -> List[Tuple[float, str]]:
+        """Drop and return reads older than the expiry window"""
+        expired = []
+        cutoff = now - self.expiry
+        while self.reads and self.reads[0][0] < cutoff:
+            expired.append(self.reads.popleft())
+        return expired
+    
+    def match(self, detection_time: float) -> Tuple[List[Tuple[float, str]], List[Tuple[float, str]]]:
+        """Claim reads a detection can explain: (matched, expired)"""
+        # Everything older than the window is popped as expired, everything left is recent
+        # enough to match, so each read is touched once no matter how large the buffer
+        expired = self.expire(detection_time)
+        matched = list(self.reads)
+        self.reads.clear()
+        return matched, expired
+    
+    def __len__(self):
+        return len(self.reads)
+
+
+class TagCorrelator:
+    """Decide direction for tag reads, deferring reads that arrive before the sensors fire"""
+    
+    def __init__(self, engine: DirectionEngine, on_record: Callable[[str, str, float, float], None],
+                 detection_timeout: float = 5.0, settle_time: float = 1.0,
+                 pending_expiry: float = 2.0, dedup_window: float = 3.0,
+                 on_ignored: Optional[Callable[[str, float, str], None]] = None):
+        self.engine = engine
+        self.on_record = on_record  # (tag_id, direction, read_time, confidence)
+        self.on_ignored = on_ignored  # (tag_id, read_time, reason)
+        self.detection_timeout = detection_timeout
+        self.settle_time = settle_time  # wait after a read so both sensors can be observed
+        self.pending = PendingReadBuffer(pending_expiry)
+        self.dedup_window = dedup_window
+        self.decisions = []  # heap of (due_time, seq, tag_id, read_time)
+        self.sequence = itertools.count()
+        self.last_recorded: Dict[str, float] = {}  # tag_id -> read_time of last record
+        self.stats = {'reads': 0, 'recorded': 0, 'deferred': 0, 'matched_late': 0,
+                      'ignored': 0, 'undecided': 0, 'deduplicated': 0}
+    
+    def on_tag(self, tag_id: str, read_time: float):
+        """Handle a tag read"""
+        self.stats['reads'] += 1
+        inside_detected, outside_detected = self.engine.has_activity(read_time, self.detection_timeout)
+        
+        if inside_detected or outside_detected:
+            self._schedule(tag_id, read_time, read_time + self.settle_time)
+        else:
+            self.stats['deferred'] += 1
+            self.pending.add(tag_id, read_time)
+    
+    def on_detection(self, location: str, detection_time: float):
+        """Handle a sensor detection (already fed to the engine by the sensor manager)"""
+        if not self.pending:
+            return
+        
+        matched, expired = self.pending.match(detection_time)
+        self._ignore(expired)
+        for read_time, tag_id in matched:
+            self.stats['matched_late'] += 1
+            self._schedule(tag_id, read_time, detection_time + self.settle_time)
+    
+    def poll(self, now: float):
+        """Resolve decisions that are due and expire stale pending reads"""
+        self._ignore(self.pending.expire(now))
+        
+        while self.decisions and self.decisions[0][0] <= now:
+            _, _, tag_id, read_time = heapq.heappop(self.decisions)
+            self._decide(tag_id, read_time)
+    
+    def flush(self):
+        """Resolve every scheduled decision now (shutdown / end of replay)"""
+        while self.decisions:
+            _, _, tag_id, read_time = heapq.heappop(self.decisions)
+            self._decide(tag_id, read_time)
+        self._ignore(list(self.pending.reads))
+        self.pending.reads.clear()
+    
+    def next_due(self, now: float, default: float = 1.0) -> float:
+        """Seconds until the next scheduled decision or pending expiry"""
+        due = now + default
+        if self.decisions:
+            due = min(due, self.decisions[0][0])
+        if self.pending:
+            due = min(due, self.pending.reads[0][0] + self.pending.expiry)
+        return max(due - now, 0.0)
+    
+    def _schedule(self, tag_id: str, read_time: float, due_time: float):
+        """Queue a direction decision for due_time"""
+        heapq.heappush(self.decisions, (due_time, next(self.sequence), tag_id, read_time))
+    
+    def _decide(self, tag_id: str, read_time: float):
+        """Infer direction for a read and record it unless it repeats a recent one"""
+        last = self.last_recorded.get(tag_id)
+        if last is not None and abs(read_time - last) < self.dedup_window:
+            # Same tag seen again during the same crossing
+            self.stats['deduplicated'] += 1
+            return
+        
+        direction, confidence = self.engine.infer(read_time)
+        if direction is None or confidence < self.engine.min_confidence:
+            self.stats['undecided'] += 1
+            if self.on_ignored:
+                self.on_ignored(tag_id, read_time, 'undecided')
+            return
+        
+        self.last_recorded[tag_id] = read_time
+        self.stats['recorded'] += 1
+        self.on_record(tag_id, direction, read_time, confidence)
+    
+    def _ignore(self, reads: List[Tuple[float, str]]):
+        """Report reads no detection could explain"""
+        for read_time, tag_id in reads:
+            self.stats['ignored'] += 1
+            if self.on_ignored:
+                self.on_ignored(tag_id, read_time, 'no human detection')
@@ -0,0 +1,163 @@
+"""
+Per-device command queue: settings changes are written by the device's own I/O loop, one at a time
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, wait
+from typing import Callable, Iterable, List, Optional
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+device_commands = registry.counter(
+    'device_commands', 'Device setting commands by outcome', ['port', 'outcome'])
+
+ACK_OK = 'OK'
+ACK_ERROR = 'ERROR'
+
+
+class DeviceCommandError(Exception):
+    """Command rejected by the device, not written, or the device is not connected"""
+
+
+class DeviceCommandTimeout(DeviceCommandError):
+    """No acknowledgement in time"""
+
+
+def resolved_future(result=None) -> Future:
+    """A future that is already done (mocks and no-op settings)"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def failed_future(error: Exception) -> Future:
+    """A future that already failed (device not connected)"""
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def wait_for(futures: Iterable[Future], timeout: float) -> List:
+    """Results of command futures, raising DeviceCommandError on a failure or DeviceCommandTimeout"""
+    futures = list(futures)
+    _, pending = wait(futures, timeout)
+    if pending:
+        raise DeviceCommandTimeout(f"device did not apply the setting within {timeout}s")
+    return [future.result() for future in futures]
+
+
+class _Command:
+    __slots__ = ('key', 'value', 'futures', 'deadline')
+    
+    def __init__(self, key: str, value, future: Future):
+        self.key = key
+        self.value = value
+        self.futures = [future]
+        self.deadline = 0.0
+    
+    def resolve(self, error: Optional[Exception] = None):
+        for future in self.futures:
+            if future.done():
+                continue  # failed by close() while the I/O loop finished it
+            if error is None:
+                future.set_result(self.value)
+            else:
+                future.set_exception(error)
+
+
+class DeviceCommandQueue:
+    """Pending settings by key (latest value wins); `process` and `handle_reply` run on the I/O loop only"""
+    
+    def __init__(self, label: str = 'unassigned', ack_timeout: float = 0.0):
+        self.label = label  # port, labels the command metrics
+        self.ack_timeout = ack_timeout  # seconds to wait for OK/ERROR after a write, 0 = device does not answer
+        self.pending: 'OrderedDict[str, _Command]' = OrderedDict()
+        self.inflight: Optional[_Command] = None  # written, waiting for the acknowledgement
+        self.wake: Optional[Callable[[], None]] = None  # cuts the I/O loop's sleep short
+        self.lock = threading.Lock()
+    
+    def submit(self, key: str, value) -> Future:
+        """Queue a setting; a value still waiting for its turn is replaced and its callers get the final result"""
+        future = Future()
+        with self.lock:
+            command = self.pending.get(key)
+            inflight = self.inflight
+            if command is not None:
+                command.value = value
+                command.futures.append(future)
+                device_commands.labels(self.label, 'coalesced').inc()
+            elif inflight is not None and inflight.key == key and inflight.value == value:
+                inflight.futures.append(future)  # already on its way to the device
+                device_commands.labels(self.label, 'coalesced').inc()
+            else:
+                self.pending[key] = _Command(key, value, future)
+        if self.wake:
+            self.wake()
+        return future
+    
+    def busy(self) -> bool:
+        """Whether a command is waiting for its acknowledgement"""
+        return self.inflight is not None
+    
+    def process(self, write: Callable[[str, object], None], now: Optional[float] = None):
+        """Expire an unanswered command and write the next pending one (write raises on failure)"""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            inflight = self.inflight
+            if inflight is not None and now < inflight.deadline:
+                return
+            self.inflight = None
+        if inflight is not None:
+            device_commands.labels(self.label, 'timeout').inc()
+            logger.warning("No acknowledgement from %s for %s=%s", self.label, inflight.key, inflight.value)
+            inflight.resolve(DeviceCommandTimeout(f"{self.label} did not acknowledge {inflight.key}={inflight.value}"))
+        
+        with self.lock:
+            if not self.pending:
+                return
+            _, command = self.pending.popitem(last=False)
+            if self.ack_timeout > 0:
+                command.deadline = now + self.ack_timeout
+                self.inflight = command  # later submits for the same value join it
+        try:
+            write(command.key, command.value)
+        except Exception as e:
+            with self.lock:
+                self.inflight = None
+            device_commands.labels(self.label, 'error').inc()
+            command.resolve(DeviceCommandError(f"{command.key}={command.value} not written to {self.label}: {e}"))
+            return
+        device_commands.labels(self.label, 'written').inc()
+        if self.ack_timeout <= 0:
+            command.resolve()
+    
+    def handle_reply(self, line: str) -> bool:
+        """Consume an OK/ERROR line (True) so it never reaches the data path; anything else is data"""
+        if line != ACK_OK and not line.startswith(ACK_ERROR):
+            return False
+        with self.lock:
+            command, self.inflight = self.inflight, None
+        if command is None:
+            logger.debug("Unexpected reply from %s: %s", self.label, line)
+        elif line == ACK_OK:
+            device_commands.labels(self.label, 'acknowledged').inc()
+            command.resolve()
+        else:
+            device_commands.labels(self.label, 'rejected').inc()
+            command.resolve(DeviceCommandError(f"{self.label} rejected {command.key}={command.value}: {line}"))
+        return True
+    
+    def close(self, reason: str = 'device stopped'):
+        """Fail everything queued or in flight"""
+        with self.lock:
+            commands = list(self.pending.values())
+            self.pending.clear()
+            if self.inflight is not None:
+                commands.append(self.inflight)
+                self.inflight = None
+        for command in commands:
+            command.resolve(DeviceCommandError(f"{command.key}={command.value} not applied: {reason}"))
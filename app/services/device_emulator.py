@@ -0,0 +1,262 @@
+"""
+Pseudo-TTY device emulators for running the real serial services without hardware
+
+Each emulated device is a pty pair: the real RFIDReader / MMWaveSensor opens the
+slave path through RFID_PORT / SENSOR_*_PORT and the emulator writes recorded or
+synthetic bytes to the master side on schedule.
+
+A byte trace is NDJSON, one chunk per line, ordered by time:
+    {"t": 0.512, "device": "rfid", "hex": "453230303030..."}
+
+    python -m app.services.device_emulator replay --trace captures/door1.bytes.ndjson
+    python -m app.services.device_emulator replay --generate 500 --rate 200
+    python -m app.services.device_emulator record --rfid /dev/ttyUSB0 --output door1.bytes.ndjson
+"""
+import argparse
+import json
+import os
+import pty
+import select
+import threading
+import time
+import tty
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.services.mmwave_protocol import GATE_COUNT, encode_report_frame
+from app.services.traces import load_trace
+
+DEVICES = ('rfid', 'inside', 'outside')
+PORT_SETTINGS = {'rfid': 'RFID_PORT', 'inside': 'SENSOR_INSIDE_PORT', 'outside': 'SENSOR_OUTSIDE_PORT'}
+
+
+class EmulatedDevice:
+    """One pseudo-terminal standing in for a USB serial device"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # no echo or newline translation, like a real UART
+        self.port = os.ttyname(self.slave)
+        self.commands: List[bytes] = []  # bytes written by the service (power/range commands)
+        self.bytes_written = 0
+        self.bytes_dropped = 0  # overflow while nobody reads the port, as on a real UART
+        self.lock = threading.Lock()
+    
+    def write(self, data: bytes, timeout: float = 0.5) -> bool:
+        """Send bytes to the service side, dropping the rest if the port stays full"""
+        with self.lock:
+            view = memoryview(data)
+            while view:
+                if not select.select([], [self.master], [], timeout)[1]:
+                    self.bytes_dropped += len(view)
+                    return False
+                sent = os.write(self.master, view)
+                self.bytes_written += sent
+                view = view[sent:]
+            return True
+    
+    def drain(self):
+        """Collect anything the service wrote to the port"""
+        while select.select([self.master], [], [], 0)[0]:
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            self.commands.append(data)
+    
+    def close(self):
+        """Close both ends of the pty"""
+        for fd in (self.master, self.slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class PortalEmulator:
+    """Emulated RFID reader and inside/outside sensors for one portal"""
+    
+    def __init__(self, devices: Iterable[str] = DEVICES):
+        self.devices: Dict[str, EmulatedDevice] = {name: EmulatedDevice(name) for name in devices}
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        self.chunks_sent = 0
+    
+    def ports(self) -> Dict[str, str]:
+        """Config settings that point the real services at the emulated devices"""
+        return {PORT_SETTINGS[name]: device.port for name, device in self.devices.items()}
+    
+    def play(self, chunks: List[Tuple[float, str, bytes]], speed: float = 1.0, loop: bool = False,
+             wait: bool = False):
+        """Replay (t, device, data) chunks; speed > 1 compresses time"""
+        self.stop()
+        self.running = True
+        self.thread = threading.Thread(target=self._play_loop, args=(chunks, speed, loop), daemon=True)
+        self.thread.start()
+        if wait:
+            self.thread.join()
+    
+    def _play_loop(self, chunks: List[Tuple[float, str, bytes]], speed: float, loop: bool):
+        """Write each chunk at its scheduled time"""
+        if not chunks:
+            self.running = False
+            return
+        origin = chunks[0][0]
+        
+        while self.running:
+            start = time.monotonic()
+            for t, name, data in chunks:
+                if not self.running:
+                    return
+                delay = start + (t - origin) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                device = self.devices.get(name)
+                if device:
+                    device.write(data)
+                    device.drain()
+                    self.chunks_sent += 1
+            if not loop:
+                break
+        self.running = False
+    
+    def stop(self):
+        """Stop a running replay"""
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
+    
+    def close(self):
+        """Stop and release the ptys"""
+        self.stop()
+        for device in self.devices.values():
+            device.close()
+
+
+def load_byte_trace(path: str) -> List[Tuple[float, str, bytes]]:
+    """Load a byte trace as (t, device, data), sorted by time"""
+    with open(path, 'r') as f:
+        chunks = [json.loads(line) for line in f if line.strip()]
+    chunks.sort(key=lambda c: c['t'])
+    return [(c['t'], c['device'], bytes.fromhex(c['hex'])) for c in chunks]
+
+
+def save_byte_trace(path: str, chunks: Iterable[Tuple[float, str, bytes]]):
+    """Write a byte trace file"""
+    with open(path, 'w') as f:
+        for t, name, data in chunks:
+            f.write(json.dumps({'t': round(t, 6), 'device': name, 'hex': data.hex()}) + '\n')
+
+
+def events_to_bytes(events: Iterable[dict], protocol: str = 'text') -> List[Tuple[float, str, bytes]]:
+    """Render doorway trace events (app.services.traces format) as device output"""
+    present = encode_report_frame(True, 150, [80] * GATE_COUNT)
+    chunks = []
+    for event in events:
+        if event['type'] == 'tag':
+            chunks.append((event['t'], 'rfid', f"{event['tag']}\r\n".encode()))
+        elif protocol == 'binary':
+            chunks.append((event['t'], event['type'], present))
+        else:
+            chunks.append((event['t'], event['type'], b'presence detected\r\n'))
+    chunks.sort(key=lambda c: c[0])
+    return chunks
+
+
+def tag_burst(count: int, rate: float, tags: int = 50, start: float = 0.0,
+              prefix: str = 'E200001234567890') -> List[Tuple[float, str, bytes]]:
+    """Steady stream of tag reads at rate per second (load testing)"""
+    return [(start + i / rate, 'rfid', f"{prefix}{i % tags:08X}\r\n".encode())
+            for i in range(count)]
+
+
+def record(ports: Dict[str, str], output: str, baud_rate: int = 115200, duration: Optional[float] = None):
+    """Capture raw bytes from live devices into a byte trace (Ctrl-C to stop)"""
+    import serial
+    
+    streams = {name: serial.Serial(port, baudrate=baud_rate, timeout=0) for name, port in ports.items()}
+    chunks = []
+    start = time.monotonic()
+    print(f"Recording {', '.join(ports)} to {output}")
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            ready = select.select(list(streams.values()), [], [], 0.1)[0]
+            now = time.monotonic() - start
+            for name, stream in streams.items():
+                if stream in ready:
+                    data = stream.read(stream.in_waiting or 1)
+                    if data:
+                        chunks.append((now, name, data))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for stream in streams.values():
+            stream.close()
+    
+    save_byte_trace(output, chunks)
+    print(f"Recorded {len(chunks)} chunks ({sum(len(c[2]) for c in chunks)} bytes)")
+    return chunks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    replay = commands.add_parser('replay', help='Serve a trace on pseudo-terminals')
+    replay.add_argument('--trace', help='Byte trace (NDJSON with hex chunks)')
+    replay.add_argument('--events', help='Doorway event trace (app.services.traces format)')
+    replay.add_argument('--generate', type=int, help='Synthetic tag reads to send')
+    replay.add_argument('--rate', type=float, default=100.0, help='Synthetic tag reads per second')
+    replay.add_argument('--protocol', choices=['text', 'binary'], default='text', help='Sensor output format')
+    replay.add_argument('--speed', type=float, default=1.0, help='Time compression factor')
+    replay.add_argument('--loop', action='store_true', help='Repeat the trace until interrupted')
+    
+    rec = commands.add_parser('record', help='Capture bytes from live devices')
+    rec.add_argument('--rfid', help='RFID reader port')
+    rec.add_argument('--inside', help='Inside sensor port')
+    rec.add_argument('--outside', help='Outside sensor port')
+    rec.add_argument('--baud', type=int, default=115200)
+    rec.add_argument('--duration', type=float, help='Seconds to record (default until Ctrl-C)')
+    rec.add_argument('--output', required=True)
+    
+    args = parser.parse_args(argv)
+    
+    if args.command == 'record':
+        ports = {name: getattr(args, name) for name in DEVICES if getattr(args, name)}
+        if not ports:
+            parser.error('record needs at least one of --rfid/--inside/--outside')
+        record(ports, args.output, args.baud, args.duration)
+        return 0
+    
+    if args.trace:
+        chunks = load_byte_trace(args.trace)
+    elif args.events:
+        chunks = events_to_bytes(load_trace(args.events), args.protocol)
+    else:
+        chunks = tag_burst(args.generate or 1000, args.rate)
+    
+    emulator = PortalEmulator()
+    for setting, port in emulator.ports().items():
+        print(f"export {setting}={port}")
+    print(f"Replaying {len(chunks)} chunks at {args.speed}x (Ctrl-C to stop)")
+    
+    try:
+        emulator.play(chunks, speed=args.speed, loop=args.loop)
+        while emulator.running:
+            time.sleep(0.5)
+        # Keep the ports open so the service can finish reading
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dropped = sum(device.bytes_dropped for device in emulator.devices.values())
+        print(f"Sent {emulator.chunks_sent} chunks ({dropped} bytes dropped)")
+        emulator.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
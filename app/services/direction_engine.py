@@ -0,0 +1,130 @@
+"""
+Probabilistic direction inference from inside/outside sensor time-series
+"""
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional, Tuple
+
+class DetectionSeries:
+    """Compact time-series of one sensor's detections (timestamps + strength)"""
+    
+    def __init__(self, horizon: float = 30.0):
+        self.horizon = horizon  # seconds of history kept
+        self.times = array('d')
+        self.strengths = array('d')
+        self.start = 0  # first live sample, older ones are compacted away lazily
+    
+    def add(self, timestamp: float, strength: float = 1.0):
+        """Add a detection, normally at the end (a late, backdated one is inserted in order)"""
+        if len(self.times) > self.start and timestamp < self.times[-1]:
+            # The window lookups bisect, so the series must stay sorted
+            position = bisect_right(self.times, timestamp, self.start)
+            self.times.insert(position, timestamp)
+            self.strengths.insert(position, strength)
+            return
+        self.times.append(timestamp)
+        self.strengths.append(strength)
+        
+        cutoff = timestamp - self.horizon
+        self.start = bisect_left(self.times, cutoff, self.start)
+        if self.start > 512 and self.start * 2 > len(self.times):
+            del self.times[:self.start]
+            del self.strengths[:self.start]
+            self.start = 0
+    
+    def window(self, t0: float, t1: float) -> Tuple[int, int]:
+        """Index range of detections with t0 <= t <= t1"""
+        lo = bisect_left(self.times, t0, self.start)
+        return lo, bisect_right(self.times, t1, lo)
+    
+    def latest(self) -> float:
+        """Timestamp of the latest detection (0 if none)"""
+        return self.times[-1] if len(self.times) > self.start else 0
+    
+    def __len__(self):
+        return len(self.times) - self.start
+
+
+class DirectionEngine:
+    """Score inside->outside vs outside->inside ordering of detections around a tag read"""
+    
+    def __init__(self, window: float = 5.0, sigma: float = 1.0, origin_weight: float = 1.0,
+                 horizon: float = 30.0, smoothing: float = 0.5, min_confidence: float = 0.5):
+        self.window = window
+        self.sigma = sigma
+        self.origin_weight = origin_weight  # evidence from one sensor firing on its own
+        self.smoothing = smoothing  # pseudo-evidence so weak signals give low confidence
+        self.min_confidence = min_confidence  # below this a read is left undecided
+        self.series = {
+            'inside': DetectionSeries(horizon),
+            'outside': DetectionSeries(horizon)
+        }
+        self.lock = threading.Lock()
+    
+    def add_detection(self, location: str, timestamp: float, strength: float = 1.0):
+        """Record a detection from the inside or outside sensor"""
+        with self.lock:
+            self.series[location].add(timestamp, strength)
+    
+    def has_activity(self, timestamp: float, timeout: float) -> Tuple[bool, bool]:
+        """Whether each sensor fired within timeout of timestamp"""
+        with self.lock:
+            result = []
+            for location in ('inside', 'outside'):
+                lo, hi = self.series[location].window(timestamp - timeout, timestamp + timeout)
+                result.append(hi > lo)
+        return result[0], result[1]
+    
+    def infer(self, timestamp: float) -> Tuple[Optional[str], float]:
+        """Infer direction of a tag read at timestamp: ('IN'|'OUT'|None, confidence)"""
+        inv_sigma = 1.0 / self.sigma
+        samples = []  # (offset from read, is_inside, weight)
+        
+        # Detections are weighted by a Gaussian kernel on their distance from the read
+        with self.lock:
+            for location, series in self.series.items():
+                lo, hi = series.window(timestamp - self.window, timestamp + self.window)
+                times, strengths = series.times, series.strengths
+                is_inside = location == 'inside'
+                for i in range(lo, hi):
+                    offset = times[i] - timestamp
+                    samples.append((offset, is_inside, strengths[i] * math.exp(-0.5 * (offset * inv_sigma) ** 2)))
+        
+        if not samples:
+            return None, 0.0
+        samples.sort()
+        
+        # Sweep in time order, accumulating the weight of inside-then-outside pairs and vice versa
+        inside_total = outside_total = 0.0
+        inside_first = outside_first = 0.0
+        for offset, is_inside, weight in samples:
+            if is_inside:
+                outside_first += weight * outside_total
+                inside_total += weight
+            else:
+                inside_first += weight * inside_total
+                outside_total += weight
+        
+        # A sensor firing on its own marks the side the person came from (legacy rule)
+        out_score = self.origin_weight * inside_total
+        in_score = self.origin_weight * outside_total
+        
+        # When both sensors fired, which side fired first decides: this holds whether the
+        # read happened mid-crossing or early, when the RF field reached the tag first
+        paired = inside_first + outside_first
+        if paired:
+            pair_mass = 2 * math.sqrt(paired)
+            out_score += pair_mass * inside_first / paired
+            in_score += pair_mass * outside_first / paired
+        
+        p_out = (out_score + self.smoothing) / (out_score + in_score + 2 * self.smoothing)
+        if p_out == 0.5:
+            return None, 0.5
+        return ('OUT', p_out) if p_out > 0.5 else ('IN', 1.0 - p_out)
+    
+    def latest_detection(self, location: str) -> float:
+        """Timestamp of the latest detection for a sensor"""
+        with self.lock:
+            return self.series[location].latest()
@@ -0,0 +1,230 @@
+"""
+Bulk export of tracking records as CSV, NDJSON or a compact columnar binary format (streamed)
+"""
+import calendar
+import csv
+import io
+import json
+import struct
+import sys
+import time
+import zlib
+from array import array
+from itertools import takewhile
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional
+
+EXPORT_FIELDS = ['rfid_tag', 'direction', 'read_date', 'portal_id', 'confidence']
+CHUNK_ROWS = 1000  # records per yielded chunk (CSV/NDJSON)
+ROW_GROUP = 8192  # records per columnar row group
+
+COLUMNAR_MAGIC = b'RFCOL1\n'
+COLUMNAR_MIMETYPE = 'application/vnd.rfid-columnar'
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': (COLUMNAR_MIMETYPE, 'rfcol')
+}
+
+
+def iter_records(log, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 tag: Optional[str] = None, portal_id: Optional[str] = None,
+                 direction: Optional[str] = None) -> Iterator[dict]:
+    """Matching records in recording order, read in place from a RecordLog (no copy)"""
+    records = log.records
+    end = len(records)  # records appended during the export are not included
+    if portal_id is not None:
+        positions = takewhile(lambda i: i < end, log.portal_index.get(portal_id, []))
+    else:
+        positions = range(end)
+    return filter_records((records[i] for i in positions), start_date, end_date, tag, direction=direction)
+
+
+def filter_records(records: Iterable[dict], start_date: Optional[str] = None, end_date: Optional[str] = None,
+                   tag: Optional[str] = None, portal_id: Optional[str] = None,
+                   direction: Optional[str] = None) -> Iterator[dict]:
+    """Matching records from any record stream (e.g. one read straight from the records file)"""
+    direction = direction.upper() if direction else None
+    
+    for record in records:
+        if start_date and record['read_date'] < start_date:
+            continue
+        if end_date and record['read_date'] > end_date:
+            continue
+        if tag and record['rfid_tag'] != tag:
+            continue
+        if direction and record['direction'] != direction:
+            continue
+        if portal_id and record['portal_id'] != portal_id:
+            continue
+        yield record
+
+
+def _chunks(records: Iterator[dict], size: int = CHUNK_ROWS) -> Iterator[List[dict]]:
+    """Group records into lists of `size`"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_csv(records: Iterator[dict]) -> Iterator[str]:
+    """CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for chunk in _chunks(records):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def to_ndjson(records: Iterator[dict]) -> Iterator[str]:
+    """One JSON object per line"""
+    encode = json.JSONEncoder(separators=(',', ':')).encode  # json.dumps builds an encoder per call
+    for chunk in _chunks(records):
+        yield ''.join(encode({k: r.get(k) for k in EXPORT_FIELDS}) + '\n' for r in chunk)
+
+
+# Columnar layout: magic, then row groups of
+#   <I rows> and one block per column: <I compressed length> zlib(payload)
+# and a final <I 0>. Payloads (little-endian):
+#   rfid_tag, portal_id: <I dictionary json length> dictionary json, uint32 indices
+#   direction: one byte per row (b'I' / b'O')
+#   read_date: int64 milliseconds, first value then deltas
+#   confidence: float32, NaN for manual records
+COLUMNS = ('rfid_tag', 'direction', 'read_date', 'portal_id', 'confidence')
+
+
+def _date_to_ms(read_date: str, minutes: Dict[str, int]) -> int:
+    """YYYY-MM-DD-HH-MM-SS-mmm as milliseconds (the wall-clock time is kept, no timezone)"""
+    minute = read_date[:16]
+    base = minutes.get(minute)
+    if base is None:
+        y, mo, d, h, mi = map(int, minute.split('-'))
+        base = minutes[minute] = calendar.timegm((y, mo, d, h, mi, 0)) * 1000
+    return base + int(read_date[17:19]) * 1000 + int(read_date[20:23])
+
+
+def _ms_to_date(value: int) -> str:
+    """Inverse of _date_to_ms"""
+    seconds, ms = divmod(value, 1000)
+    parts = time.gmtime(seconds)
+    return f"{parts.tm_year:04d}-{parts.tm_mon:02d}-{parts.tm_mday:02d}-" \
+           f"{parts.tm_hour:02d}-{parts.tm_min:02d}-{parts.tm_sec:02d}-{ms:03d}"
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _dictionary_column(values: List[str]) -> bytes:
+    """Distinct values once, then an index per row"""
+    dictionary: Dict[str, int] = {}
+    indices = array('I', (dictionary.setdefault(v, len(dictionary)) for v in values))
+    encoded = json.dumps(list(dictionary), separators=(',', ':')).encode('utf-8')
+    return struct.pack('<I', len(encoded)) + encoded + _little_endian(indices)
+
+
+def _encode_group(chunk: List[dict]) -> bytes:
+    """One row group"""
+    minutes = {}  # records in a group share few distinct minutes
+    dates = [_date_to_ms(r['read_date'], minutes) for r in chunk]
+    deltas = array('q', [dates[0]] + [b - a for a, b in zip(dates, dates[1:])])
+    confidence = array('f', (r['confidence'] if r.get('confidence') is not None else float('nan')
+                             for r in chunk))
+    payloads = [
+        _dictionary_column([r['rfid_tag'] for r in chunk]),
+        bytes(ord(r['direction'][0]) for r in chunk),
+        _little_endian(deltas),
+        _dictionary_column([r.get('portal_id') or '' for r in chunk]),
+        _little_endian(confidence)
+    ]
+    parts = [struct.pack('<I', len(chunk))]
+    for payload in payloads:
+        block = zlib.compress(payload, 6)
+        parts.append(struct.pack('<I', len(block)))
+        parts.append(block)
+    return b''.join(parts)
+
+
+def to_columnar(records: Iterator[dict]) -> Iterator[bytes]:
+    """Compact columnar binary, one row group at a time"""
+    yield COLUMNAR_MAGIC
+    for chunk in _chunks(records, ROW_GROUP):
+        yield _encode_group(chunk)
+    yield struct.pack('<I', 0)
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar export")
+    return data
+
+
+def _decode_dictionary(payload: bytes) -> List[str]:
+    (length,) = struct.unpack_from('<I', payload)
+    dictionary = json.loads(payload[4:4 + length])
+    return [dictionary[i] for i in _from_little_endian('I', payload[4 + length:])]
+
+
+def read_columnar(stream: BinaryIO) -> Iterator[dict]:
+    """Records back from a columnar export"""
+    if stream.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar export")
+    while True:
+        (rows,) = struct.unpack('<I', _read_exact(stream, 4))
+        if rows == 0:
+            return
+        payloads = []
+        for _ in COLUMNS:
+            (length,) = struct.unpack('<I', _read_exact(stream, 4))
+            payloads.append(zlib.decompress(_read_exact(stream, length)))
+        
+        tags = _decode_dictionary(payloads[0])
+        directions = payloads[1]
+        dates = []
+        value = 0
+        for delta in _from_little_endian('q', payloads[2]):
+            value += delta
+            dates.append(value)
+        portals = _decode_dictionary(payloads[3])
+        confidence = _from_little_endian('f', payloads[4])
+        
+        for i in range(rows):
+            yield {
+                'rfid_tag': tags[i],
+                'direction': 'IN' if directions[i] == ord('I') else 'OUT',
+                'read_date': _ms_to_date(dates[i]),
+                'portal_id': portals[i],
+                'confidence': None if confidence[i] != confidence[i] else round(confidence[i], 3)
+            }
+
+
+def export(records: Iterator[dict], fmt: str):
+    """Chunk generator for a format name"""
+    if fmt == 'csv':
+        return to_csv(records)
+    if fmt == 'ndjson':
+        return to_ndjson(records)
+    if fmt == 'columnar':
+        return to_columnar(records)
+    raise ValueError(f"Unknown export format: {fmt}")
@@ -0,0 +1,76 @@
+"""
+Sensor-gated RFID inventory: slow, low-power polling until a sensor fires, then high-rate reads
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class InventoryScheduler:
+    """Paces one reader's poll loop from its portal's sensor activity"""
+    
+    def __init__(self, reader, active_window: float = 3.0, active_interval: float = 0.02,
+                 idle_interval: float = 0.5, idle_power: Optional[int] = None):
+        self.reader = reader
+        self.active_window = active_window  # seconds of high-rate inventory after the last detection
+        self.active_interval = active_interval  # seconds between polls while active
+        self.idle_interval = idle_interval  # seconds between polls while idle
+        self.idle_power = idle_power  # dBm while idle, None = keep the read power
+        self.active_until = 0.0
+        self.active = False
+        self.activations = 0
+        self._wake = threading.Event()
+    
+    def configure(self, config):
+        """Apply INVENTORY_* settings"""
+        self.active_window = config['INVENTORY_ACTIVE_WINDOW']
+        self.active_interval = config['INVENTORY_ACTIVE_INTERVAL']
+        self.idle_interval = config['INVENTORY_IDLE_INTERVAL']
+        self.idle_power = config['INVENTORY_IDLE_POWER'] or None
+    
+    def on_detection(self, location: str, timestamp: float):
+        """Start or extend high-rate inventory (called from the sensor threads)"""
+        self.active_until = max(self.active_until, timestamp + self.active_window)
+        self._wake.set()
+    
+    def wake(self):
+        """Cut the current sleep short (a device command was queued)"""
+        self._wake.set()
+    
+    def is_active(self, now: float) -> bool:
+        """Whether a detection is recent enough for high-rate inventory"""
+        return now < self.active_until
+    
+    def target_power(self) -> int:
+        """Power the radio should use in the current mode"""
+        if self.active or self.idle_power is None:
+            return self.reader.read_power
+        return min(self.idle_power, self.reader.read_power)
+    
+    def update(self, now: float):
+        """Switch mode if needed and keep the radio power in line with it"""
+        active = self.is_active(now)
+        if active != self.active:
+            self.active = active
+            if active:
+                self.activations += 1
+            logger.debug("Inventory %s (%s)", 'active' if active else 'idle', self.reader.portal_id)
+        power = self.target_power()
+        if self.reader.output_power != power:
+            self.reader.send_power(power)
+    
+    def wait(self):
+        """Sleep until the next poll, returning early when a sensor fires"""
+        self._wake.clear()  # a detection after this point cuts the sleep short
+        self.update(time.time())
+        self._wake.wait(self.active_interval if self.active else self.idle_interval)
+    
+    def get_status(self) -> dict:
+        """Current mode for the status routes"""
+        return {
+            'mode': 'active' if self.active else 'idle',
+            'activations': self.activations,
+            'output_power': self.reader.output_power
+        }
@@ -0,0 +1,127 @@
+"""
+Resumable, bounded-memory migration of legacy JSON array records files to NDJSON journals
+"""
+import json
+import os
+import time
+from numbers import Number
+from typing import Callable, Optional, Tuple
+from app.utils.helpers import iter_json_array, parse_date_filter, validate_direction
+
+CHECKPOINT_EVERY = 5000  # records between durable checkpoints
+
+
+def normalize_record(value, default_portal_id: str) -> Tuple[Optional[dict], Optional[str]]:
+    """Record in storage shape, or None and the reason it was rejected"""
+    if not isinstance(value, dict):
+        return None, 'not an object'
+    tag = value.get('rfid_tag')
+    if not isinstance(tag, str) or not tag:
+        return None, 'missing rfid_tag'
+    direction = value.get('direction')
+    if not isinstance(direction, str) or not validate_direction(direction):
+        return None, 'direction must be IN or OUT'
+    read_date = value.get('read_date')
+    if not isinstance(read_date, str) or parse_date_filter(read_date) is None:
+        return None, 'read_date must be YYYY-MM-DD-HH-MM-SS-mmm'
+    confidence = value.get('confidence')
+    if confidence is not None and (not isinstance(confidence, Number) or isinstance(confidence, bool)):
+        return None, 'confidence must be a number'
+    
+    return {
+        'rfid_tag': tag,
+        'direction': direction.upper(),
+        'read_date': read_date,
+        'portal_id': value.get('portal_id') or default_portal_id,
+        'confidence': confidence
+    }, None
+
+
+def _source_identity(source: str) -> dict:
+    stat = os.stat(source)
+    return {'source': os.path.abspath(source), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _write_checkpoint(path: str, state: dict):
+    """Replace the checkpoint atomically"""
+    temp = path + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+def _sync(*files):
+    for f in files:
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def migrate(source: str, destination: str, default_portal_id: str = 'main', restart: bool = False,
+            checkpoint_every: int = CHECKPOINT_EVERY,
+            progress: Optional[Callable[[dict], None]] = None) -> dict:
+    """Convert a JSON array file to NDJSON, resuming from the last checkpoint unless `restart`"""
+    checkpoint_path = destination + '.checkpoint'
+    rejects_path = destination + '.rejects.ndjson'
+    identity = _source_identity(source)
+    
+    state = None
+    if os.path.exists(checkpoint_path) and not restart:
+        with open(checkpoint_path) as f:
+            state = json.load(f)
+        if {k: state.get(k) for k in identity} != identity:
+            raise ValueError(f"{source} changed since the checkpoint; migrate again with restart")
+    elif os.path.exists(destination) and not restart:
+        raise FileExistsError(f"{destination} exists; migrate with restart to overwrite it")
+    if state is None:
+        state = dict(identity, source_offset=0, records=0, rejected=0, output_bytes=0, rejects_bytes=0)
+    
+    started = time.perf_counter()
+    resumed_from = state['records']
+    with open(source, 'rb') as src, open(destination, 'ab') as out, open(rejects_path, 'ab') as rejects:
+        # Drop anything written after the last checkpoint
+        out.truncate(state['output_bytes'])
+        rejects.truncate(state['rejects_bytes'])
+        out.seek(0, os.SEEK_END)
+        rejects.seek(0, os.SEEK_END)
+        
+        since_checkpoint = 0
+        for value, offset in iter_json_array(src, start=state['source_offset']):
+            record, reason = normalize_record(value, default_portal_id)
+            if record is not None:
+                out.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+                state['records'] += 1
+            else:
+                rejects.write(json.dumps({'byte_offset': offset, 'reason': reason, 'value': value},
+                                         separators=(',', ':'), default=str).encode('utf-8') + b'\n')
+                state['rejected'] += 1
+            state['source_offset'] = offset
+            
+            since_checkpoint += 1
+            if since_checkpoint >= checkpoint_every:
+                since_checkpoint = 0
+                _sync(out, rejects)
+                state['output_bytes'], state['rejects_bytes'] = out.tell(), rejects.tell()
+                _write_checkpoint(checkpoint_path, state)
+                if progress:
+                    progress(dict(state, elapsed=time.perf_counter() - started, resumed_from=resumed_from))
+        
+        _sync(out, rejects)
+    
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    if not state['rejected']:
+        os.remove(rejects_path)
+    summary = {
+        'source': source,
+        'destination': destination,
+        'records': state['records'],
+        'rejected': state['rejected'],
+        'rejects_file': rejects_path if state['rejected'] else None,
+        'resumed_from': resumed_from,
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+    if progress:
+        progress(dict(state, elapsed=time.perf_counter() - started, resumed_from=resumed_from, done=True))
+    return summary
@@ -0,0 +1,96 @@
+"""
+S3KM1110 mmWave report-mode frame decoder
+"""
+import struct
+from typing import List, NamedTuple, Tuple
+
+FRAME_HEADER = b'\xf4\xf3\xf2\xf1'
+FRAME_FOOTER = b'\xf8\xf7\xf6\xf5'
+GATE_COUNT = 16
+
+# Payload: detection result (u8), target distance in cm (u16), energy per distance gate (16 x u16)
+REPORT_PAYLOAD = struct.Struct('<BH16H')
+LENGTH_FIELD = struct.Struct('<H')
+MAX_PAYLOAD = 256  # anything longer is a corrupted length field
+# Whole report frame, unpacked in one call on the fast path
+REPORT_FRAME = struct.Struct('<4sHBH16H4s')
+
+
+class SensorFrame(NamedTuple):
+    """One decoded report frame"""
+    target: bool  # sensor's own presence flag
+    distance_cm: int
+    gate_energy: Tuple[int, ...]
+    
+    @property
+    def max_energy(self) -> int:
+        return max(self.gate_energy)
+    
+    def is_presence(self, threshold: int = 0) -> bool:
+        """Presence if the sensor reports a target and the strongest gate reaches threshold"""
+        return self.target and (threshold <= 0 or max(self.gate_energy) >= threshold)
+
+
+def encode_report_frame(target: bool, distance_cm: int, gate_energy) -> bytes:
+    """Build a report frame (emulators, tests and benchmarks)"""
+    payload = REPORT_PAYLOAD.pack(1 if target else 0, distance_cm, *gate_energy)
+    return FRAME_HEADER + LENGTH_FIELD.pack(len(payload)) + payload + FRAME_FOOTER
+
+
+class S3KM1110Decoder:
+    """Incremental decoder: feed raw serial chunks, get whole frames back"""
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+        self.errors = 0  # frames dropped for bad length/footer
+    
+    def feed(self, data: bytes) -> List[SensorFrame]:
+        """Append a chunk and decode every complete frame in the buffer"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        pos = 0
+        end = len(buffer)
+        
+        while True:
+            # Fast path: back-to-back report frames need no search
+            if end - pos >= REPORT_FRAME.size:
+                values = REPORT_FRAME.unpack_from(buffer, pos)
+                if (values[0] == FRAME_HEADER and values[1] == REPORT_PAYLOAD.size
+                        and values[-1] == FRAME_FOOTER):
+                    frames.append(SensorFrame(values[2] != 0, values[3], values[4:-1]))
+                    pos += REPORT_FRAME.size
+                    continue
+            
+            start = buffer.find(FRAME_HEADER, pos)
+            if start < 0:
+                # Keep a possible partial header at the end
+                pos = max(pos, end - len(FRAME_HEADER) + 1)
+                break
+            if start + 6 > end:
+                pos = start
+                break
+            
+            length = LENGTH_FIELD.unpack_from(buffer, start + 4)[0]
+            frame_end = start + 6 + length + 4
+            if length > MAX_PAYLOAD:
+                self.errors += 1
+                pos = start + 1
+                continue
+            if frame_end > end:
+                pos = start
+                break
+            if buffer[frame_end - 4:frame_end] != FRAME_FOOTER or length < REPORT_PAYLOAD.size:
+                self.errors += 1
+                pos = start + 1
+                continue
+            
+            values = REPORT_PAYLOAD.unpack_from(buffer, start + 6)
+            frames.append(SensorFrame(values[0] != 0, values[1], values[2:]))
+            pos = frame_end
+        
+        if pos:
+            del buffer[:pos]
+        self.frames += len(frames)
+        return frames
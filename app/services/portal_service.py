@@ -0,0 +1,225 @@
+"""
+Portal registry: one RFID reader + inside/outside sensor pair per door
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from flask import current_app
+from app.services.tracking_service import tracking_service
+from app.services.asset_registry import asset_registry
+from app.services.correlation import TagCorrelator
+from app.services.inventory_scheduler import InventoryScheduler
+from app.services.power_tuner import PowerTuner
+from app.utils.helpers import parse_portal_spec, get_default_portal_id
+from app.utils.metrics import Counter, Gauge, registry, tag_record_latency, loop_duration
+
+logger = logging.getLogger(__name__)
+
+# Reported from portal state at scrape time
+correlation_events = Counter('rfid_correlation_events', 'Tag reads by correlation outcome', ['portal', 'outcome'])
+queued_events = Gauge('portal_queued_events', 'Events waiting for the portal worker', ['portal'])
+pending_reads = Gauge('portal_pending_reads', 'Tag reads waiting for a sensor detection', ['portal'])
+unknown_reads = Counter('rfid_unknown_tag_reads', 'Tag reads dropped by the asset allowlist', ['portal'])
+inventory_active = Gauge('rfid_inventory_active', 'High-rate inventory running after a sensor detection', ['portal'])
+
+class Portal:
+    """A door with its own devices, event queue and correlation worker"""
+    
+    def __init__(self, portal_id: str, rfid_reader, sensor_manager, record_sink: Optional[Callable] = None):
+        self.portal_id = portal_id
+        self.record_sink = record_sink or tracking_service.add_record  # (tag, direction, portal, time, confidence)
+        self.rfid_reader = rfid_reader
+        self.sensor_manager = sensor_manager
+        self.events = queue.Queue()  # ('tag'|'detection', tag_id|location, timestamp)
+        self.running = False
+        self.worker = None
+        self.allowlist = False  # drop reads of tags not in the asset registry
+        self.unknown_reads = 0
+        self.correlator = TagCorrelator(
+            sensor_manager.engine, self.record_movement, on_ignored=self.ignore_read
+        )
+        self.latency_metric = tag_record_latency.labels(portal_id)
+        self.scheduler = InventoryScheduler(rfid_reader)
+        self.tuner = PowerTuner(rfid_reader, self.scheduler)
+        self.rfid_reader.on_tag = self.submit_tag
+        self.sensor_manager.add_listener(self.submit_detection)
+        self.sensor_manager.add_listener(self.scheduler.on_detection)
+    
+    def start(self):
+        """Connect devices and start the portal's threads"""
+        self.sensor_manager.initialize()
+        
+        config = current_app.config
+        self.correlator.detection_timeout = config['HUMAN_DETECTION_TIMEOUT']
+        self.correlator.settle_time = config['DIRECTION_SETTLE_TIME']
+        self.correlator.pending.expiry = config['PENDING_READ_EXPIRY']
+        self.correlator.dedup_window = config['TAG_DEDUP_WINDOW']
+        self.allowlist = config['ASSET_ALLOWLIST']
+        if config['INVENTORY_SCHEDULING']:
+            self.scheduler.configure(config)
+            self.rfid_reader.scheduler = self.scheduler
+        if config['POWER_TUNING']:
+            self.tuner.configure(config)
+        
+        self.running = True
+        self.worker = threading.Thread(
+            target=self.worker_loop, name=f'portal-{self.portal_id}', daemon=True
+        )
+        self.worker.start()
+        
+        if self.rfid_reader.connect():
+            threading.Thread(
+                target=self.rfid_reader.monitor_loop, name=f'rfid-{self.portal_id}', daemon=True
+            ).start()
+    
+    def submit_tag(self, tag_id: str, read_time: float):
+        """Queue a tag read for correlation (called from the reader thread)"""
+        if self.allowlist and not asset_registry.is_known(tag_id):
+            self.unknown_reads += 1
+            logger.debug("Unknown tag %s dropped at %s", tag_id, self.portal_id)
+            return
+        self.events.put(('tag', tag_id, read_time))
+    
+    def submit_detection(self, location: str, timestamp: float):
+        """Queue a sensor detection (called from the sensor threads)"""
+        self.events.put(('detection', location, timestamp))
+    
+    def worker_loop(self):
+        """Correlate tag reads with sensor detections for this portal only"""
+        loop_timer = loop_duration.labels(threading.current_thread().name)
+        while self.running:
+            try:
+                kind, subject, timestamp = self.events.get(
+                    timeout=self.correlator.next_due(time.time())
+                )
+            except queue.Empty:
+                kind = None
+            
+            try:
+                started = time.perf_counter()
+                if kind == 'tag':
+                    self.correlator.on_tag(subject, timestamp)
+                elif kind == 'detection':
+                    self.correlator.on_detection(subject, timestamp)
+                self.correlator.poll(time.time())
+                if self.tuner.enabled:
+                    self.tuner.observe(self.correlator.stats, time.time())
+                loop_timer.observe(time.perf_counter() - started)
+            except Exception as e:
+                logger.error("Portal (%s) worker error: %s", self.portal_id, e)
+    
+    def record_movement(self, tag_id: str, direction: str, read_time: float, confidence: float):
+        """Persist a correlated movement"""
+        self.record_sink(tag_id, direction, self.portal_id, read_time, confidence)
+        self.latency_metric.observe(time.time() - read_time)
+    
+    def ignore_read(self, tag_id: str, read_time: float, reason: str):
+        """Report a read that could not be correlated"""
+        logger.info("Tag %s ignored at %s - %s", tag_id, self.portal_id, reason)
+    
+    def stop(self):
+        """Stop devices and worker"""
+        self.running = False
+        self.rfid_reader.stop()
+        self.sensor_manager.shutdown()
+    
+    def get_status(self) -> dict:
+        """Get portal device status"""
+        return {
+            'portal_id': self.portal_id,
+            'rfid_reader': self.rfid_reader.state,
+            'sensor_inside': self.sensor_manager.sensor_inside.state,
+            'sensor_outside': self.sensor_manager.sensor_outside.state,
+            'rfid_power': self.rfid_reader.read_power,
+            'sensor_range': self.sensor_manager.sensor_inside.detection_range,
+            'queued_events': self.events.qsize(),
+            'pending_reads': len(self.correlator.pending),
+            'correlation': dict(self.correlator.stats),
+            'unknown_reads': self.unknown_reads if self.allowlist else None,
+            'inventory': self.scheduler.get_status() if self.rfid_reader.scheduler else None,
+            'power_tuning': self.tuner.get_status() if self.tuner.enabled else None
+        }
+
+
+class PortalRegistry:
+    """Registry of all portals driven by this unit"""
+    
+    def __init__(self):
+        self.portals: Dict[str, Portal] = {}
+        self.default_portal_id: Optional[str] = None
+        self.lock = threading.Lock()
+    
+    def initialize(self, mock: bool = False, record_sink: Optional[Callable] = None):
+        """Create and start all configured portals (once per process)"""
+        with self.lock:
+            if self.portals:
+                return
+            
+            config = current_app.config
+            specs = parse_portal_spec(config['PORTALS'])
+            if not specs:
+                specs = [{
+                    'portal_id': get_default_portal_id(config),
+                    'rfid_port': None,
+                    'inside_port': None,
+                    'outside_port': None
+                }]
+            
+            if mock:
+                from app.services.sensor_service_mock import sensor_manager, SensorManagerMock as manager_cls
+                from app.services.rfid_service_mock import rfid_reader, RFIDReaderMock as reader_cls
+            else:
+                from app.services.sensor_service import sensor_manager, SensorManager as manager_cls
+                from app.services.rfid_service import rfid_reader, RFIDReader as reader_cls
+            
+            for i, spec in enumerate(specs):
+                portal_id = spec['portal_id']
+                if i == 0:
+                    # First portal drives the global devices used by the status/config routes
+                    reader, manager = rfid_reader, sensor_manager
+                    reader.port = spec['rfid_port']
+                    manager.sensor_inside.port = spec['inside_port']
+                    manager.sensor_outside.port = spec['outside_port']
+                else:
+                    reader = reader_cls(spec['rfid_port'], portal_id)
+                    manager = manager_cls(spec['inside_port'], spec['outside_port'], portal_id)
+                
+                self.portals[portal_id] = Portal(portal_id, reader, manager, record_sink)
+            
+            self.default_portal_id = specs[0]['portal_id']
+        
+        for portal in self.portals.values():
+            portal.start()
+    
+    def get(self, portal_id: Optional[str] = None) -> Optional[Portal]:
+        """Get a portal by ID (default portal if None)"""
+        return self.portals.get(portal_id or self.default_portal_id)
+    
+    def all(self) -> List[Portal]:
+        """Get all portals"""
+        return list(self.portals.values())
+    
+    def shutdown(self):
+        """Stop all portals"""
+        for portal in self.portals.values():
+            portal.stop()
+    
+    def collect_metrics(self):
+        """Correlation counters and queue depths for /metrics"""
+        portals = self.all()
+        yield correlation_events, [
+            ('', {'portal': p.portal_id, 'outcome': outcome}, count)
+            for p in portals for outcome, count in list(p.correlator.stats.items())
+        ]
+        yield unknown_reads, [('', {'portal': p.portal_id}, p.unknown_reads) for p in portals if p.allowlist]
+        yield queued_events, [('', {'portal': p.portal_id}, p.events.qsize()) for p in portals]
+        yield pending_reads, [('', {'portal': p.portal_id}, len(p.correlator.pending)) for p in portals]
+        yield inventory_active, [('', {'portal': p.portal_id}, int(p.scheduler.active))
+                                 for p in portals if p.rfid_reader.scheduler]
+
+
+# Global portal registry instance
+portal_registry = PortalRegistry()
+registry.add_collector(portal_registry.collect_metrics)
@@ -0,0 +1,99 @@
+"""
+Closed-loop RFID power and poll-rate tuning from per-crossing read counts
+"""
+import logging
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class PowerTuner:
+    """Steers read power toward a target number of reads per crossing"""
+    
+    def __init__(self, reader, scheduler=None, power_min: int = 10, power_max: int = 30, step: int = 2,
+                 reads_min: float = 3.0, reads_max: float = 6.0, max_stray: float = 0.2,
+                 sample_size: int = 10):
+        self.reader = reader
+        self.scheduler = scheduler  # InventoryScheduler whose active poll interval is relaxed at minimum power
+        self.power_min = power_min
+        self.power_max = power_max
+        self.step = step  # dBm per adjustment
+        self.reads_min = reads_min  # fewer reads per crossing risks missing fast tags entirely
+        self.reads_max = reads_max  # more is wasted RF and CPU
+        self.max_stray = max_stray  # share of reads with no person at the door
+        self.sample_size = sample_size  # crossings (or stray reads) per evaluation
+        self.base_interval = scheduler.active_interval if scheduler else None
+        self.max_interval = 0.1  # slowest active polling, the old fixed 10Hz
+        self.enabled = False
+        self.baseline = {}
+        self.decisions = deque(maxlen=20)
+    
+    def configure(self, config):
+        """Apply RFID_POWER_* limits and POWER_TUNING_* settings"""
+        self.power_min = config['RFID_POWER_MIN']
+        self.power_max = config['RFID_POWER_MAX']
+        self.step = config['POWER_TUNING_STEP']
+        self.reads_min = config['POWER_TUNING_READS_MIN']
+        self.reads_max = config['POWER_TUNING_READS_MAX']
+        self.max_stray = config['POWER_TUNING_MAX_STRAY']
+        self.sample_size = config['POWER_TUNING_CROSSINGS']
+        if self.scheduler:
+            self.base_interval = self.scheduler.active_interval
+        self.enabled = True
+    
+    def observe(self, stats: dict, now: float) -> Optional[dict]:
+        """Evaluate correlator counters since the last evaluation; returns the decision, if any"""
+        delta = {k: stats[k] - self.baseline.get(k, 0) for k in ('reads', 'recorded', 'deduplicated', 'ignored')}
+        if max(delta['recorded'], delta['ignored']) < self.sample_size:
+            return None
+        self.baseline = dict(stats)
+        
+        reads_per_crossing = (delta['recorded'] + delta['deduplicated']) / delta['recorded'] if delta['recorded'] else None
+        stray = delta['ignored'] / delta['reads'] if delta['reads'] else 0.0
+        power, interval = self.reader.read_power, self.active_interval()
+        
+        if stray > self.max_stray and power > self.power_min:
+            power, reason = max(power - self.step, self.power_min), 'stray reads'
+        elif reads_per_crossing is not None and reads_per_crossing < self.reads_min and power < self.power_max:
+            power, interval, reason = min(power + self.step, self.power_max), self.base_interval, 'too few reads'
+        elif reads_per_crossing is not None and reads_per_crossing > self.reads_max:
+            if power > self.power_min:
+                power, reason = max(power - self.step, self.power_min), 'too many reads'
+            elif interval is not None and interval < self.max_interval:
+                interval, reason = min(interval * 2, self.max_interval), 'too many reads at minimum power'
+            else:
+                reason = None
+        else:
+            reason = None
+        
+        decision = {
+            'time': now,
+            'reads_per_crossing': round(reads_per_crossing, 2) if reads_per_crossing is not None else None,
+            'stray_rate': round(stray, 3),
+            'power': power,
+            'previous_power': self.reader.read_power,
+            'active_interval': interval,
+            'reason': reason
+        }
+        self.decisions.append(decision)
+        if reason:
+            logger.info("Power tuner (%s): %s, %s -> %s dBm, poll %s s (%s reads/crossing, %.0f%% stray)",
+                        self.reader.portal_id or 'primary', reason, self.reader.read_power, power, interval,
+                        decision['reads_per_crossing'], stray * 100)
+            if power != self.reader.read_power:
+                self.reader.configure_power(power)
+            if self.scheduler and interval is not None:
+                self.scheduler.active_interval = interval
+        return decision
+    
+    def active_interval(self) -> Optional[float]:
+        """Current high-rate poll interval (None without a scheduler)"""
+        return self.scheduler.active_interval if self.scheduler else None
+    
+    def get_status(self) -> dict:
+        """Current settings and recent decisions"""
+        return {
+            'power': self.reader.read_power,
+            'active_interval': self.active_interval(),
+            'decisions': list(self.decisions)
+        }
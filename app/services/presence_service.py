@@ -0,0 +1,123 @@
+"""
+Point-in-time presence: which tags were inside or outside at a past instant
+"""
+import threading
+from bisect import bisect_right
+from typing import Dict, List, Optional
+from flask import current_app
+from app.services.tracking_service import tracking_service
+
+
+class PresenceHistory:
+    """Records in read_date order plus a checkpoint of every tag's last record each `interval` records
+
+    The index is brought up to date by queries, never by the thread adding records: the listener only
+    marks it stale, and `lock` is held by readers only.
+    """
+    
+    def __init__(self, store=None, interval: int = 20000):
+        self.store = store if store is not None else tracking_service
+        self.interval = interval
+        self.lock = threading.Lock()  # guards the index, never taken on the write path
+        self.stale = threading.Event()  # records were added since the last catch_up
+        self._reset(None)
+    
+    def _reset(self, log):
+        self.log = log  # the RecordLog this was built from
+        self.applied = 0  # records of that log already indexed
+        self.dates: List[str] = []  # read_date of each entry, ascending
+        self.entries: List[dict] = []  # records in read_date order
+        # checkpoints[k] = tag -> last record among entries[:k * interval]
+        self.checkpoints: List[Dict[str, dict]] = [{}]
+    
+    def initialize(self):
+        """Index the loaded records and follow new ones"""
+        self.interval = current_app.config['PRESENCE_CHECKPOINT_RECORDS']
+        with self.lock:
+            self._reset(None)
+        self.store.add_listener(self.on_record)
+        self.catch_up()
+    
+    def on_record(self, record: dict):
+        """Tracking store listener: runs on the writer's thread, so it only marks the index stale"""
+        self.stale.set()
+    
+    def catch_up(self):
+        """Index records added since the last call, starting over if the store was cleared or replaced"""
+        with self.lock:
+            self.stale.clear()  # before reading the length, so a record added meanwhile marks it again
+            log = self.store.log
+            if log is not self.log:
+                self._reset(log)
+            records = log.records
+            end = len(records)
+            if end - self.applied > self.interval:
+                self._insert_batch(records[self.applied:end])
+            else:
+                for position in range(self.applied, end):
+                    self._insert(records[position])
+            self.applied = end
+            self._extend_checkpoints()
+    
+    def _insert(self, record: dict):
+        date = record['read_date']
+        if not self.dates or date >= self.dates[-1]:
+            self.dates.append(date)
+            self.entries.append(record)
+            return
+        # Late record (another portal's settle delay, or an unsorted file): checkpoints after it are stale
+        position = bisect_right(self.dates, date)
+        self.dates.insert(position, date)
+        self.entries.insert(position, record)
+        del self.checkpoints[position // self.interval + 1:]
+    
+    def _insert_batch(self, batch: List[dict]):
+        # Startup or reload: one stable sort of the affected tail instead of many inserts
+        position = bisect_right(self.dates, min(record['read_date'] for record in batch))
+        tail = self.entries[position:] + batch
+        tail.sort(key=lambda record: record['read_date'])
+        self.entries[position:] = tail
+        self.dates[position:] = [record['read_date'] for record in tail]
+        del self.checkpoints[position // self.interval + 1:]
+    
+    def _extend_checkpoints(self):
+        while len(self.checkpoints) * self.interval <= len(self.entries):
+            k = len(self.checkpoints)
+            state = dict(self.checkpoints[-1])
+            for record in self.entries[(k - 1) * self.interval:k * self.interval]:
+                state[record['rfid_tag']] = record
+            self.checkpoints.append(state)
+    
+    def at(self, read_date: Optional[str] = None) -> Dict[str, dict]:
+        """Each tag's last record at or before read_date (now if None), replaying from the nearest checkpoint"""
+        if self.stale.is_set() or self.store.log is not self.log:
+            self.catch_up()
+        with self.lock:
+            end = len(self.entries) if read_date is None else bisect_right(self.dates, read_date)
+            k = min(end // self.interval, len(self.checkpoints) - 1)
+            checkpoint, tail = self.checkpoints[k], self.entries[k * self.interval:end]
+        # Checkpoints are never modified once built, so the copy and replay need no lock
+        state = dict(checkpoint)
+        for record in tail:
+            state[record['rfid_tag']] = record
+        return state
+    
+    def inventory(self, read_date: Optional[str] = None, portal_id: Optional[str] = None) -> dict:
+        """Tags inside and outside at read_date, with the movement that put them there"""
+        inside, outside = [], []
+        for tag, record in sorted(self.at(read_date).items()):
+            if portal_id and record['portal_id'] != portal_id:
+                continue
+            entry = {'rfid_tag': tag, 'since': record['read_date'], 'portal_id': record['portal_id']}
+            (inside if record['direction'] == 'IN' else outside).append(entry)
+        return {
+            'at': read_date,
+            'inside_count': len(inside),
+            'outside_count': len(outside),
+            'inside': inside,
+            'outside': outside
+        }
+
+
+# Global presence history instance
+presence_history = PresenceHistory()
@@ -1,90 +1,159 @@
+import logging
 import serial
-import time
 import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
 from flask import current_app
+from app.services.device_commands import DeviceCommandError, DeviceCommandQueue, failed_future
 from app.services.tracking_service import tracking_service
-from app.services.sensor_service import sensor_manager
+from app.utils.metrics import serial_bytes, serial_errors, loop_duration
+
+logger = logging.getLogger(__name__)
 
 class RFIDReader:
     """Service for M5Stack UHF RFID Reader"""
     
-    def __init__(self):
+    def __init__(self, port: Optional[str] = None, portal_id: Optional[str] = None):
+        self.port = port  # None: use RFID_PORT
+        self.portal_id = portal_id  # None: primary reader, mirrored into system status
         self.serial = None
         self.running = False
         self.read_power = 26
+        self.output_power: Optional[int] = None  # last power sent to the radio, lower than read_power while idle
+        self.state = 'disconnected'
+        self.on_tag: Optional[Callable[[str, float], None]] = None  # Set by the owning portal
+        self.scheduler = None  # InventoryScheduler set by the owning portal, None = fixed 10Hz polling
+        self.port_label = port or 'unassigned'  # resolved on connect, labels serial metrics
+        self.commands = DeviceCommandQueue(self.port_label)  # power changes, written by monitor_loop
     
     def connect(self) -> bool:
         """Connect to RFID reader"""
         try:
-            port = current_app.config['RFID_PORT']
+            port = self.port or current_app.config['RFID_PORT']
+            self.port_label = port
             baud_rate = current_app.config['BAUD_RATE']
             
-            self.serial = serial.Serial(port, baudrate=baud_rate, timeout=1)
+            self.serial = serial.Serial(port, baudrate=baud_rate, timeout=1, write_timeout=1)
             time.sleep(2)
             
+            self.commands.label = port
+            self.commands.ack_timeout = current_app.config['DEVICE_ACK_TIMEOUT']
             self.read_power = current_app.config['RFID_READ_POWER']
             self.configure_power(self.read_power)
             
-            tracking_service.update_status(rfid_reader='connected')
-            print(f"RFID reader connected on {port}")
+            self._set_state('connected')
+            logger.info("RFID reader connected on %s", port)
             return True
             
         except Exception as e:
-            print(f"Error connecting RFID reader: {e}")
-            tracking_service.update_status(rfid_reader='error')
+            logger.error("Error connecting RFID reader: %s", e)
+            serial_errors.labels(self.port_label).inc()
+            self._set_state('error')
             return False
     
-    def configure_power(self, power_dbm: int):
-        """Configure read power (controls distance)"""
+    def _set_state(self, state: str):
+        """Track connection state"""
+        self.state = state
+        if self.portal_id is None:
+            tracking_service.update_status(rfid_reader=state)
+    
+    def configure_power(self, power_dbm: int) -> Future:
+        """Configure read power (controls distance); the future resolves once the radio has it"""
+        if not self.serial:
+            return failed_future(DeviceCommandError("RFID reader not connected"))
+        future = self._submit_power(power_dbm)
+        future.add_done_callback(lambda f: self._power_configured(power_dbm, f))
+        return future
+    
+    def _power_configured(self, power_dbm: int, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self.read_power = power_dbm
+            logger.info("RFID power set to %s dBm", power_dbm)
+    
+    def send_power(self, power_dbm: int) -> Future:
+        """Set the radio's power without changing the configured read power (monitor thread only: the scheduler)"""
+        future = self._submit_power(power_dbm)
+        self.process_commands()
+        return future
+    
+    def _submit_power(self, power_dbm: int) -> Future:
+        future = self.commands.submit('power', power_dbm)
+        future.add_done_callback(self._power_failed)
+        return future
+    
+    def _power_failed(self, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            self.output_power = None  # unknown: the scheduler sends its power again
+    
+    def process_commands(self):
+        """Write the next queued setting unless one is waiting for its acknowledgement (monitor thread only)"""
+        self.commands.process(self._write_command)
+    
+    def _write_command(self, key: str, value: int):
         try:
-            if self.serial:
-                cmd = f"AT+POWER={power_dbm}\r\n"
-                self.serial.write(cmd.encode())
-                self.read_power = power_dbm
-                print(f"RFID power set to {power_dbm} dBm")
+            self.serial.write(f"AT+POWER={value}\r\n".encode())
         except Exception as e:
-            print(f"Error configuring RFID power: {e}")
+            logger.error("Error configuring RFID power: %s", e)
+            serial_errors.labels(self.port_label).inc()
+            raise
+        self.output_power = value
     
     def read_tag(self) -> str:
         """Read RFID tag"""
         try:
             if self.serial and self.serial.in_waiting:
-                line = self.serial.readline().decode('utf-8', errors='ignore').strip()
+                raw = self.serial.readline()
+                serial_bytes.labels(self.port_label).inc(len(raw))
+                line = raw.decode('utf-8', errors='ignore').strip()
+                if self.commands.handle_reply(line):
+                    return None  # OK/ERROR for a power command, not a tag
                 if line and len(line) >= 4:
                     return line
         except Exception as e:
-            print(f"Error reading RFID tag: {e}")
+            logger.warning("Error reading RFID tag: %s", e)
+            serial_errors.labels(self.port_label).inc()
         return None
     
+    def read_tags(self, max_tags: int = 256) -> List[str]:
+        """Read every tag line already buffered (bursts of reads between polls)"""
+        tags = []
+        while len(tags) < max_tags and self.serial and self.serial.in_waiting:
+            tag_id = self.read_tag()
+            if tag_id:
+                tags.append(tag_id)
+        return tags
+    
     def monitor_loop(self):
-        """Continuous RFID reading loop"""
+        """Continuous RFID reading loop (correlation runs on the portal worker)"""
         self.running = True
+        loop_timer = loop_duration.labels(threading.current_thread().name)
+        self.commands.wake = self.scheduler.wake if self.scheduler else None
         
         while self.running:
             try:
-                tag_id = self.read_tag()
-                
-                if tag_id:
-                    # Check if human was detected
-                    inside_detected, outside_detected = sensor_manager.check_human_detection()
-                    
-                    if inside_detected or outside_detected:
-                        direction = sensor_manager.determine_direction()
-                        
-                        if direction:
-                            tracking_service.add_record(tag_id, direction)
-                    else:
-                        print(f"Tag {tag_id} ignored - no human detection")
+                started = time.perf_counter()
+                for tag_id in self.read_tags():
+                    if self.on_tag:
+                        self.on_tag(tag_id, time.time())
+                self.process_commands()  # only this thread touches the port
+                loop_timer.observe(time.perf_counter() - started)
                 
-                time.sleep(0.1)  # 10Hz polling
+                if self.commands.busy():
+                    time.sleep(0.01)  # poll for the acknowledgement
+                elif self.scheduler:
+                    self.scheduler.wait()
+                else:
+                    time.sleep(0.1)  # 10Hz polling
                 
             except Exception as e:
-                print(f"RFID monitor error: {e}")
+                logger.error("RFID monitor error: %s", e)
                 time.sleep(1)
     
     def stop(self):
         """Stop monitoring"""
         self.running = False
+        self.commands.close()
         if self.serial:
             self.serial.close()
 
@@ -1,20 +1,33 @@
 """
 Mock RFID Reader Service for Testing Without Hardware
 """
-import time
+import logging
 import threading
+import time
 import random
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional
 from flask import current_app
+from app.services.device_commands import resolved_future
 from app.services.tracking_service import tracking_service
-from app.services.sensor_service_mock import sensor_manager
+from app.utils.metrics import loop_duration
+
+logger = logging.getLogger(__name__)
 
 class RFIDReaderMock:
     """Mock service for M5Stack UHF RFID Reader"""
     
-    def __init__(self):
+    def __init__(self, port: Optional[str] = None, portal_id: Optional[str] = None):
+        self.port = port
+        self.portal_id = portal_id
         self.running = False
         self.read_power = 26
-        self.simulate_tag_id = None  # Manual tag trigger
+        self.output_power: Optional[int] = None
+        self.state = 'disconnected'
+        self.simulated_tags = deque()  # Manual tag triggers, read in order
+        self.on_tag: Optional[Callable[[str, float], None]] = None  # Set by the owning portal
+        self.scheduler = None  # InventoryScheduler set by the owning portal
         
         # Sample RFID tags for simulation
         self.sample_tags = [
@@ -32,27 +45,38 @@ class RFIDReaderMock:
             
             self.read_power = current_app.config['RFID_READ_POWER']
             
-            tracking_service.update_status(rfid_reader='connected (mock)')
-            print(f"[MOCK] RFID reader connected (simulated)")
+            self._set_state('connected (mock)')
+            logger.info("[MOCK] RFID reader connected (simulated)")
             return True
             
         except Exception as e:
-            print(f"[MOCK] Error connecting RFID reader: {e}")
-            tracking_service.update_status(rfid_reader='error')
+            logger.error("[MOCK] Error connecting RFID reader: %s", e)
+            self._set_state('error')
             return False
     
-    def configure_power(self, power_dbm: int):
+    def _set_state(self, state: str):
+        """Track connection state"""
+        self.state = state
+        if self.portal_id is None:
+            tracking_service.update_status(rfid_reader=state)
+    
+    def configure_power(self, power_dbm: int) -> Future:
         """Configure read power (controls distance)"""
+        self.send_power(power_dbm)
         self.read_power = power_dbm
-        print(f"[MOCK] RFID power set to {power_dbm} dBm")
+        logger.info("[MOCK] RFID power set to %s dBm", power_dbm)
+        return resolved_future(power_dbm)
+    
+    def send_power(self, power_dbm: int) -> Future:
+        """Simulate writing a power setting to the radio"""
+        self.output_power = power_dbm
+        return resolved_future(power_dbm)
     
     def read_tag(self) -> str:
         """Simulate reading RFID tag"""
         # Check for manual trigger first
-        if self.simulate_tag_id:
-            tag = self.simulate_tag_id
-            self.simulate_tag_id = None
-            return tag
+        if self.simulated_tags:
+            return self.simulated_tags.popleft()
         
         # Randomly simulate tag reads for testing (very low probability)
         if random.random() < 0.02:  # 2% chance
@@ -64,39 +88,45 @@ class RFIDReaderMock:
         """Manually trigger a tag read (for testing)"""
         if tag_id is None:
             tag_id = random.choice(self.sample_tags)
-        self.simulate_tag_id = tag_id
-        print(f"[MOCK] Tag read triggered: {tag_id}")
+        self.simulated_tags.append(tag_id)
+        logger.info("[MOCK] Tag read triggered: %s", tag_id)
+    
+    def read_tags(self, max_tags: int = 256) -> List[str]:
+        """Read every queued tag (bursts of triggers between polls)"""
+        tags = []
+        while len(tags) < max_tags:
+            tag_id = self.read_tag()
+            if not tag_id:
+                break
+            tags.append(tag_id)
+        return tags
     
     def monitor_loop(self):
         """Continuous RFID reading loop"""
         self.running = True
+        loop_timer = loop_duration.labels(threading.current_thread().name)
         
         while self.running:
             try:
-                tag_id = self.read_tag()
-                
-                if tag_id:
-                    # Check if human was detected
-                    inside_detected, outside_detected = sensor_manager.check_human_detection()
-                    
-                    if inside_detected or outside_detected:
-                        direction = sensor_manager.determine_direction()
-                        
-                        if direction:
-                            tracking_service.add_record(tag_id, direction)
-                    else:
-                        print(f"[MOCK] Tag {tag_id} ignored - no human detection")
+                started = time.perf_counter()
+                for tag_id in self.read_tags():
+                    if self.on_tag:
+                        self.on_tag(tag_id, time.time())
+                loop_timer.observe(time.perf_counter() - started)
                 
-                time.sleep(0.1)  # 10Hz polling
+                if self.scheduler:
+                    self.scheduler.wait()
+                else:
+                    time.sleep(0.1)  # 10Hz polling
                 
             except Exception as e:
-                print(f"[MOCK] RFID monitor error: {e}")
+                logger.error("[MOCK] RFID monitor error: %s", e)
                 time.sleep(1)
     
     def stop(self):
         """Stop monitoring"""
         self.running = False
-        print("[MOCK] RFID reader stopped")
+        logger.info("[MOCK] RFID reader stopped")
 
 
 # Global RFID reader instance
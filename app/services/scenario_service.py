@@ -0,0 +1,216 @@
+"""
+Scripted load scenarios: timestamped movements replayed on a virtual clock
+"""
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.services.tracking_service import tracking_service
+from app.services.correlation import TagCorrelator
+from app.services.direction_engine import DirectionEngine
+
+logger = logging.getLogger(__name__)
+
+ZONE_DETECTIONS = 5  # detections per sensor while a person walks through its zone
+ZONE_SPACING = 0.2  # seconds between detections (sensor poll rate)
+MAX_MOVEMENTS = 100000
+MAX_MISMATCHES = 100  # wrong/missed movements listed in a job result
+
+
+def generate_movements(count: int = 100, gap: float = 2.0, simultaneous_prob: float = 0.0,
+                       crossing_prob: float = 0.0, early_read_prob: float = 0.0,
+                       seed: int = 1) -> List[dict]:
+    """Synthetic movements: people one after another, some side by side or crossing"""
+    rng = random.Random(seed)
+    movements = []
+    t = 0.0
+    while len(movements) < count:
+        direction = rng.choice(['IN', 'OUT'])
+        group = [(direction, 0.0)]
+        if rng.random() < simultaneous_prob:
+            group.append((direction, rng.uniform(0.0, 0.3)))  # walking together
+        if rng.random() < crossing_prob:
+            other = 'IN' if direction == 'OUT' else 'OUT'
+            group.append((other, rng.uniform(-0.5, 0.5)))  # passing in the doorway
+        
+        for direction, offset in group[:count - len(movements)]:
+            read_offset = -rng.uniform(0.5, 1.5) if rng.random() < early_read_prob else 0.0
+            movements.append({
+                't': round(t + offset, 3),
+                'tag_id': f"E200000000005C3E{len(movements):08X}",
+                'direction': direction,
+                'read_offset': round(read_offset, 3)
+            })
+        t += gap
+    return movements
+
+
+def movement_events(movement: dict) -> List[tuple]:
+    """Sensor detections and tag read for one movement: (t, kind, subject)"""
+    t = float(movement['t'])
+    direction = movement['direction'].upper()
+    origin = 'inside' if direction == 'OUT' else 'outside'
+    destination = 'outside' if direction == 'OUT' else 'inside'
+    
+    events = [(t - ZONE_SPACING * (i + 1), 'detection', origin) for i in range(ZONE_DETECTIONS)]
+    events += [(t + ZONE_SPACING * (i + 1), 'detection', destination) for i in range(ZONE_DETECTIONS)]
+    events.append((t + float(movement.get('read_offset', 0.0)), 'tag', movement['tag_id']))
+    return events
+
+
+def run_scenario(movements: List[dict], settings: Dict, persist: bool = False,
+                 portal_id: Optional[str] = None, start_time: Optional[float] = None,
+                 progress=None) -> dict:
+    """Replay movements through a fresh engine/correlator on a virtual clock"""
+    engine = DirectionEngine(window=settings.get('window', 5), sigma=settings.get('sigma', 1.0),
+                             min_confidence=settings.get('min_confidence', 0.5))
+    recorded = {}
+    
+    def on_record(tag_id, direction, read_time, confidence):
+        recorded[tag_id] = direction
+        if persist:
+            tracking_service.add_record(tag_id, direction, portal_id, start_time + read_time, confidence)
+    
+    correlator = TagCorrelator(
+        engine, on_record,
+        detection_timeout=settings.get('detection_timeout', 5),
+        settle_time=settings.get('settle_time', 1.0),
+        pending_expiry=settings.get('pending_expiry', 2.0),
+        dedup_window=settings.get('dedup_window', 3.0)
+    )
+    
+    events = [event for movement in movements for event in movement_events(movement)]
+    events.sort(key=lambda e: e[0])
+    if start_time is None:
+        # Persisted records end at the current time
+        start_time = time.time() - (events[-1][0] if events else 0.0)
+    
+    wall_start = time.perf_counter()
+    for i, (t, kind, subject) in enumerate(events):
+        correlator.poll(t)
+        if kind == 'detection':
+            engine.add_detection(subject, t)
+            correlator.on_detection(subject, t)
+        else:
+            correlator.on_tag(subject, t)
+        if progress and i % 1000 == 0:
+            progress(i / len(events))
+    correlator.flush()
+    wall = time.perf_counter() - wall_start
+    
+    correct = wrong = missed = 0
+    mismatches = []
+    for movement in movements:
+        actual = recorded.get(movement['tag_id'])
+        if actual == movement['direction'].upper():
+            correct += 1
+            continue
+        if actual is None:
+            missed += 1
+        else:
+            wrong += 1
+        if len(mismatches) < MAX_MISMATCHES:
+            mismatches.append(dict(movement, recorded=actual))
+    
+    total = len(movements)
+    return {
+        'movements': total,
+        'events': len(events),
+        'recorded': len(recorded),
+        'correct': correct,
+        'wrong': wrong,
+        'missed': missed,
+        'accuracy': round(correct / total, 4) if total else 0.0,
+        'virtual_seconds': round(events[-1][0] - events[0][0], 3) if events else 0.0,
+        'wall_seconds': round(wall, 3),
+        'movements_per_s': round(total / wall, 1) if wall > 0 else 0.0,
+        'correlation': dict(correlator.stats),
+        'mismatches': mismatches
+    }
+
+
+class ScenarioJobs:
+    """Background scenario runs, looked up by job ID"""
+    
+    def __init__(self, max_jobs: int = 20):
+        self.jobs: 'OrderedDict[str, dict]' = OrderedDict()
+        self.max_jobs = max_jobs  # finished jobs beyond this are forgotten, oldest first
+        self.lock = threading.Lock()
+    
+    def submit(self, movements: List[dict], settings: Dict, persist: bool = False,
+               portal_id: Optional[str] = None) -> dict:
+        """Start a scenario in the background and return its job"""
+        job = {
+            'job_id': uuid.uuid4().hex[:12],
+            'status': 'queued',
+            'movements': len(movements),
+            'portal_id': portal_id,
+            'persist': persist,
+            'created': time.time(),
+            'progress': 0.0,
+            'result': None,
+            'error': None
+        }
+        with self.lock:
+            self.jobs[job['job_id']] = job
+            self._trim()
+        
+        threading.Thread(target=self._run, args=(job, movements, settings), daemon=True).start()
+        return dict(job)
+    
+    def _run(self, job: dict, movements: List[dict], settings: Dict):
+        """Run one job"""
+        job['status'] = 'running'
+        try:
+            job['result'] = run_scenario(
+                movements, settings, job['persist'], job['portal_id'],
+                progress=lambda fraction: job.update(progress=round(fraction, 3))
+            )
+            job['progress'] = 1.0
+            job['status'] = 'done'
+        except Exception as e:
+            logger.exception("Scenario job %s failed", job['job_id'])
+            job['error'] = str(e)
+            job['status'] = 'error'
+        job['finished'] = time.time()
+    
+    def get(self, job_id: str) -> Optional[dict]:
+        """Get a job by ID"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def all(self) -> List[dict]:
+        """Job summaries, newest first"""
+        with self.lock:
+            return [{k: v for k, v in job.items() if k != 'result'} for job in reversed(self.jobs.values())]
+    
+    def _trim(self):
+        """Forget the oldest finished jobs"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id]['status'] in ('done', 'error'):
+                del self.jobs[job_id]
+
+
+def portal_settings(portal) -> Dict:
+    """Correlation settings of a running portal, so scenarios match the live pipeline"""
+    engine = portal.sensor_manager.engine
+    correlator = portal.correlator
+    return {
+        'window': engine.window,
+        'sigma': engine.sigma,
+        'min_confidence': engine.min_confidence,
+        'detection_timeout': correlator.detection_timeout,
+        'settle_time': correlator.settle_time,
+        'pending_expiry': correlator.pending.expiry,
+        'dedup_window': correlator.dedup_window
+    }
+
+
+# Global scenario job registry
+scenario_jobs = ScenarioJobs()
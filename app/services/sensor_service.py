@@ -1,94 +1,171 @@
+import logging
 import serial
 import time
 import threading
-from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
 from flask import current_app
+from app.services.device_commands import DeviceCommandError, DeviceCommandQueue, failed_future
 from app.services.tracking_service import tracking_service
+from app.services.direction_engine import DirectionEngine
+from app.services.mmwave_protocol import S3KM1110Decoder, SensorFrame
+from app.utils.metrics import serial_bytes, serial_errors, loop_duration
+
+logger = logging.getLogger(__name__)
 
 class MMWaveSensor:
     """Service for S3KM1110 mmWave Sensor"""
     
-    def __init__(self, location: str):
+    def __init__(self, location: str, port: Optional[str] = None, portal_id: Optional[str] = None):
         self.location = location  # 'inside' or 'outside'
+        self.port = port  # None: use SENSOR_<LOCATION>_PORT
+        self.portal_id = portal_id  # None: primary sensor, mirrored into system status
+        self.state = 'disconnected'
         self.serial = None
         self.running = False
         self.detection_range = 5
-        self.recent_detections = deque(maxlen=10)
+        self.on_detection: Optional[Callable[[str, float], None]] = None  # Set by the manager
+        self.protocol = 'text'  # 'text' lines or 'binary' report frames
+        self.presence_threshold = 0
+        self.decoder = S3KM1110Decoder()
+        self.last_frame: Optional[SensorFrame] = None
+        self.port_label = port or 'unassigned'  # resolved on connect, labels serial metrics
+        self.commands = DeviceCommandQueue(self.port_label)  # range changes, written by monitor_loop
     
     def connect(self) -> bool:
         """Connect to the sensor"""
         try:
-            port = current_app.config[f'SENSOR_{self.location.upper()}_PORT']
+            port = self.port or current_app.config[f'SENSOR_{self.location.upper()}_PORT']
+            self.port_label = port
             baud_rate = current_app.config['BAUD_RATE']
             
-            self.serial = serial.Serial(port, baudrate=baud_rate, timeout=1)
+            self.serial = serial.Serial(port, baudrate=baud_rate, timeout=1, write_timeout=1)
             time.sleep(2)  # Wait for initialization
             
+            self.protocol = current_app.config['SENSOR_PROTOCOL']
+            self.commands.label = port
+            # Replies are OK/ERROR lines; in binary mode they cannot be told apart from report bytes
+            self.commands.ack_timeout = current_app.config['DEVICE_ACK_TIMEOUT'] if self.protocol == 'text' else 0.0
+            self.presence_threshold = current_app.config['SENSOR_PRESENCE_THRESHOLD']
             self.detection_range = current_app.config['SENSOR_DETECTION_RANGE']
             self.configure_range(self.detection_range)
             
-            tracking_service.update_status(**{f'sensor_{self.location}': 'connected'})
-            print(f"mmWave sensor ({self.location}) connected on {port}")
+            self._set_state('connected')
+            logger.info("mmWave sensor (%s) connected on %s", self.location, port)
             return True
             
         except Exception as e:
-            print(f"Error connecting sensor ({self.location}): {e}")
-            tracking_service.update_status(**{f'sensor_{self.location}': 'error'})
+            logger.error("Error connecting sensor (%s): %s", self.location, e)
+            serial_errors.labels(self.port_label).inc()
+            self._set_state('error')
             return False
     
-    def configure_range(self, distance: int):
-        """Configure detection range"""
+    def _set_state(self, state: str):
+        """Track connection state"""
+        self.state = state
+        if self.portal_id is None:
+            tracking_service.update_status(**{f'sensor_{self.location}': state})
+    
+    def thread_name(self) -> str:
+        """Monitor thread name (labels loop metrics)"""
+        return f"sensor-{self.portal_id}-{self.location}" if self.portal_id else f"sensor-{self.location}"
+    
+    def configure_range(self, distance: int) -> Future:
+        """Configure detection range; the future resolves once the sensor has it"""
+        if not self.serial:
+            return failed_future(DeviceCommandError(f"Sensor ({self.location}) not connected"))
+        future = self.commands.submit('range', distance)
+        future.add_done_callback(lambda f: self._range_configured(distance, f))
+        return future
+    
+    def _range_configured(self, distance: int, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self.detection_range = distance
+            logger.info("Sensor (%s) range: %sm", self.location, distance)
+    
+    def process_commands(self):
+        """Write the next queued setting unless one is waiting for its acknowledgement (monitor thread only)"""
+        self.commands.process(self._write_command)
+    
+    def _write_command(self, key: str, value: int):
         try:
-            if self.serial:
-                cmd = f"sensorStart {distance}\n"
-                self.serial.write(cmd.encode())
-                self.detection_range = distance
-                print(f"Sensor ({self.location}) range: {distance}m")
+            self.serial.write(f"sensorStart {value}\n".encode())
         except Exception as e:
-            print(f"Error configuring sensor range: {e}")
+            logger.error("Error configuring sensor range: %s", e)
+            serial_errors.labels(self.port_label).inc()
+            raise
     
     def read_data(self) -> str:
         """Read sensor data"""
         try:
             if self.serial and self.serial.in_waiting:
-                return self.serial.readline().decode('utf-8', errors='ignore').strip()
+                raw = self.serial.readline()
+                serial_bytes.labels(self.port_label).inc(len(raw))
+                line = raw.decode('utf-8', errors='ignore').strip()
+                if self.commands.handle_reply(line):
+                    return None  # OK/ERROR for a range command, not a detection
+                return line
         except Exception as e:
-            print(f"Error reading sensor ({self.location}): {e}")
+            logger.warning("Error reading sensor (%s): %s", self.location, e)
+            serial_errors.labels(self.port_label).inc()
         return None
     
+    def read_frames(self) -> List[SensorFrame]:
+        """Read and decode all buffered report frames in one chunk"""
+        try:
+            if self.serial and self.serial.in_waiting:
+                chunk = self.serial.read(self.serial.in_waiting)
+                serial_bytes.labels(self.port_label).inc(len(chunk))
+                errors = self.decoder.errors
+                frames = self.decoder.feed(chunk)
+                if self.decoder.errors != errors:
+                    serial_errors.labels(self.port_label).inc(self.decoder.errors - errors)
+                return frames
+        except Exception as e:
+            logger.warning("Error reading sensor (%s): %s", self.location, e)
+            serial_errors.labels(self.port_label).inc()
+        return []
+    
     def detect_human(self) -> bool:
         """Check for human presence"""
-        data = self.read_data()
-        if data and ('presence' in data.lower() or 'occupied' in data.lower()):
-            self.recent_detections.append(time.time())
+        if self.protocol == 'binary':
+            frames = self.read_frames()
+            if not frames:
+                return False
+            self.last_frame = frames[-1]
+            detected = any(frame.is_presence(self.presence_threshold) for frame in frames)
+        else:
+            data = self.read_data()
+            if not data:
+                return False
+            data = data.lower()
+            detected = 'presence' in data or 'occupied' in data
+        
+        if detected:
+            if self.on_detection:
+                self.on_detection(self.location, time.time())
             return True
         return False
     
-    def is_recently_detected(self, timeout: int) -> bool:
-        """Check if human detected within timeout"""
-        if not self.recent_detections:
-            return False
-        current_time = time.time()
-        return any(current_time - t < timeout for t in self.recent_detections)
-    
-    def get_latest_detection(self) -> float:
-        """Get timestamp of latest detection"""
-        return max(self.recent_detections) if self.recent_detections else 0
-    
     def monitor_loop(self):
         """Continuous monitoring loop"""
         self.running = True
+        loop_timer = loop_duration.labels(threading.current_thread().name)
         while self.running:
             try:
+                started = time.perf_counter()
                 self.detect_human()
-                time.sleep(0.1)  # 10Hz polling
+                self.process_commands()  # only this thread touches the port
+                loop_timer.observe(time.perf_counter() - started)
+                time.sleep(0.01 if self.commands.busy() else 0.1)  # 10Hz polling, faster while awaiting a reply
             except Exception as e:
-                print(f"Sensor ({self.location}) monitor error: {e}")
+                logger.error("Sensor (%s) monitor error: %s", self.location, e)
                 time.sleep(1)
     
     def stop(self):
         """Stop monitoring"""
         self.running = False
+        self.commands.close()
         if self.serial:
             self.serial.close()
 
@@ -96,46 +173,49 @@ class MMWaveSensor:
 class SensorManager:
     """Manager for both mmWave sensors"""
     
-    def __init__(self):
-        self.sensor_inside = MMWaveSensor('inside')
-        self.sensor_outside = MMWaveSensor('outside')
+    def __init__(self, inside_port: Optional[str] = None, outside_port: Optional[str] = None,
+                 portal_id: Optional[str] = None):
+        self.sensor_inside = MMWaveSensor('inside', inside_port, portal_id)
+        self.sensor_outside = MMWaveSensor('outside', outside_port, portal_id)
+        self.engine = DirectionEngine()  # the single record of detections
+        self.listeners: List[Callable[[str, float], None]] = []
+        self.sensor_inside.on_detection = self._on_detection
+        self.sensor_outside.on_detection = self._on_detection
     
     def initialize(self):
         """Initialize both sensors"""
-        if self.sensor_inside.connect():
-            threading.Thread(target=self.sensor_inside.monitor_loop, daemon=True).start()
+        # Captured here: detection checks run on portal worker threads without an app context
+        config = current_app.config
+        self.engine.window = config['HUMAN_DETECTION_TIMEOUT']
+        self.engine.sigma = config['DIRECTION_SIGMA']
+        self.engine.min_confidence = config['DIRECTION_MIN_CONFIDENCE']
         
-        if self.sensor_outside.connect():
-            threading.Thread(target=self.sensor_outside.monitor_loop, daemon=True).start()
+        for sensor in (self.sensor_inside, self.sensor_outside):
+            if sensor.connect():
+                threading.Thread(target=sensor.monitor_loop, name=sensor.thread_name(), daemon=True).start()
     
-    def check_human_detection(self):
-        """Check both sensors for recent human detection"""
-        timeout = current_app.config['HUMAN_DETECTION_TIMEOUT']
-        
-        inside_detected = self.sensor_inside.is_recently_detected(timeout)
-        outside_detected = self.sensor_outside.is_recently_detected(timeout)
-        
-        return inside_detected, outside_detected
+    def add_listener(self, callback: Callable[[str, float], None]):
+        """Register a callback for detections from either sensor"""
+        self.listeners.append(callback)
     
-    def determine_direction(self) -> str:
-        """Determine movement direction"""
-        inside_detected, outside_detected = self.check_human_detection()
-        
-        if inside_detected and not outside_detected:
-            return "OUT"
-        elif outside_detected and not inside_detected:
-            return "IN"
-        elif inside_detected and outside_detected:
-            inside_time = self.sensor_inside.get_latest_detection()
-            outside_time = self.sensor_outside.get_latest_detection()
-            return "OUT" if inside_time > outside_time else "IN"
-        
-        return None
+    def _on_detection(self, location: str, timestamp: float):
+        """Feed a sensor detection into the direction engine and listeners"""
+        self.engine.add_detection(location, timestamp)
+        for callback in self.listeners:
+            callback(location, timestamp)
+    
+    def infer_direction(self, read_time: Optional[float] = None) -> Tuple[Optional[str], float]:
+        """Infer movement direction and confidence for a tag read"""
+        if read_time is None:
+            read_time = time.time()
+        direction, confidence = self.engine.infer(read_time)
+        if direction and confidence < self.engine.min_confidence:
+            return None, confidence
+        return direction, confidence
     
-    def configure_range(self, distance: int):
-        """Configure range for both sensors"""
-        self.sensor_inside.configure_range(distance)
-        self.sensor_outside.configure_range(distance)
+    def configure_range(self, distance: int) -> List[Future]:
+        """Configure range for both sensors (one future per sensor)"""
+        return [self.sensor_inside.configure_range(distance), self.sensor_outside.configure_range(distance)]
     
     def shutdown(self):
         """Shutdown both sensors"""
@@ -1,22 +1,31 @@
 """
 Mock mmWave Sensor Service for Testing Without Hardware
 """
+import logging
 import time
 import threading
 import random
-from collections import deque
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
 from flask import current_app
+from app.services.device_commands import resolved_future
 from app.services.tracking_service import tracking_service
+from app.services.direction_engine import DirectionEngine
+from app.utils.metrics import loop_duration
+
+logger = logging.getLogger(__name__)
 
 class MMWaveSensorMock:
     """Mock service for S3KM1110 mmWave Sensor"""
     
-    def __init__(self, location: str):
+    def __init__(self, location: str, port: Optional[str] = None, portal_id: Optional[str] = None):
         self.location = location  # 'inside' or 'outside'
+        self.port = port
+        self.portal_id = portal_id
         self.running = False
+        self.state = 'disconnected'
         self.detection_range = 5
-        self.recent_detections = deque(maxlen=10)
-        self.simulate_detection = False  # Manual trigger
+        self.on_detection: Optional[Callable[[str, float], None]] = None  # Set by the manager
     
     def connect(self) -> bool:
         """Simulate connection to sensor"""
@@ -25,24 +34,35 @@ class MMWaveSensorMock:
             
             self.detection_range = current_app.config['SENSOR_DETECTION_RANGE']
             
-            tracking_service.update_status(**{f'sensor_{self.location}': 'connected (mock)'})
-            print(f"[MOCK] mmWave sensor ({self.location}) connected (simulated)")
+            self._set_state('connected (mock)')
+            logger.info("[MOCK] mmWave sensor (%s) connected (simulated)", self.location)
             return True
             
         except Exception as e:
-            print(f"[MOCK] Error connecting sensor ({self.location}): {e}")
-            tracking_service.update_status(**{f'sensor_{self.location}': 'error'})
+            logger.error("[MOCK] Error connecting sensor (%s): %s", self.location, e)
+            self._set_state('error')
             return False
     
-    def configure_range(self, distance: int):
+    def _set_state(self, state: str):
+        """Track connection state"""
+        self.state = state
+        if self.portal_id is None:
+            tracking_service.update_status(**{f'sensor_{self.location}': state})
+    
+    def thread_name(self) -> str:
+        """Monitor thread name (labels loop metrics)"""
+        return f"sensor-{self.portal_id}-{self.location}" if self.portal_id else f"sensor-{self.location}"
+    
+    def configure_range(self, distance: int) -> Future:
         """Configure detection range"""
         self.detection_range = distance
-        print(f"[MOCK] Sensor ({self.location}) range: {distance}m")
+        logger.info("[MOCK] Sensor (%s) range: %sm", self.location, distance)
+        return resolved_future(distance)
     
     def read_data(self) -> str:
         """Simulate reading sensor data"""
         # Randomly simulate detection for testing
-        if self.simulate_detection or random.random() < 0.05:  # 5% chance
+        if random.random() < 0.05:  # 5% chance
             return "presence detected"
         return None
     
@@ -50,100 +70,96 @@ class MMWaveSensorMock:
         """Check for human presence"""
         data = self.read_data()
         if data and 'presence' in data.lower():
-            timestamp = time.time()
-            self.recent_detections.append(timestamp)
-            print(f"[MOCK] Human detected by {self.location} sensor")
+            self._record_detection(time.time())
             return True
         return False
     
-    def is_recently_detected(self, timeout: int) -> bool:
-        """Check if human detected within timeout"""
-        if not self.recent_detections:
-            return False
-        current_time = time.time()
-        return any(current_time - t < timeout for t in self.recent_detections)
+    def _record_detection(self, timestamp: float):
+        """Notify the manager (its direction engine keeps the detections)"""
+        if self.on_detection:
+            self.on_detection(self.location, timestamp)
+        logger.debug("[MOCK] Human detected by %s sensor", self.location)
     
-    def get_latest_detection(self) -> float:
-        """Get timestamp of latest detection"""
-        return max(self.recent_detections) if self.recent_detections else 0
-    
-    def trigger_detection(self):
-        """Manually trigger a detection (for testing)"""
-        self.simulate_detection = True
-        time.sleep(0.2)
-        self.detect_human()
-        self.simulate_detection = False
+    def trigger_detection(self, timestamp: Optional[float] = None):
+        """Manually trigger a detection (for testing), without waiting for a poll"""
+        self._record_detection(time.time() if timestamp is None else timestamp)
     
     def monitor_loop(self):
         """Continuous monitoring loop"""
         self.running = True
+        loop_timer = loop_duration.labels(threading.current_thread().name)
         while self.running:
             try:
+                started = time.perf_counter()
                 self.detect_human()
+                loop_timer.observe(time.perf_counter() - started)
                 time.sleep(0.1)  # 10Hz polling
             except Exception as e:
-                print(f"[MOCK] Sensor ({self.location}) monitor error: {e}")
+                logger.error("[MOCK] Sensor (%s) monitor error: %s", self.location, e)
                 time.sleep(1)
     
     def stop(self):
         """Stop monitoring"""
         self.running = False
-        print(f"[MOCK] Sensor ({self.location}) stopped")
+        logger.info("[MOCK] Sensor (%s) stopped", self.location)
 
 
 class SensorManagerMock:
     """Mock manager for both mmWave sensors"""
     
-    def __init__(self):
-        self.sensor_inside = MMWaveSensorMock('inside')
-        self.sensor_outside = MMWaveSensorMock('outside')
+    def __init__(self, inside_port: Optional[str] = None, outside_port: Optional[str] = None,
+                 portal_id: Optional[str] = None):
+        self.sensor_inside = MMWaveSensorMock('inside', inside_port, portal_id)
+        self.sensor_outside = MMWaveSensorMock('outside', outside_port, portal_id)
+        self.engine = DirectionEngine()  # the single record of detections
+        self.listeners: List[Callable[[str, float], None]] = []
+        self.sensor_inside.on_detection = self._on_detection
+        self.sensor_outside.on_detection = self._on_detection
     
     def initialize(self):
         """Initialize both sensors"""
-        print("[MOCK] Initializing sensors (simulated)...")
-        
-        if self.sensor_inside.connect():
-            threading.Thread(target=self.sensor_inside.monitor_loop, daemon=True).start()
-        
-        if self.sensor_outside.connect():
-            threading.Thread(target=self.sensor_outside.monitor_loop, daemon=True).start()
-    
-    def check_human_detection(self):
-        """Check both sensors for recent human detection"""
-        timeout = current_app.config['HUMAN_DETECTION_TIMEOUT']
-        
-        inside_detected = self.sensor_inside.is_recently_detected(timeout)
-        outside_detected = self.sensor_outside.is_recently_detected(timeout)
-        
-        return inside_detected, outside_detected
-    
-    def determine_direction(self) -> str:
-        """Determine movement direction"""
-        inside_detected, outside_detected = self.check_human_detection()
+        # Captured here: detection checks run on portal worker threads without an app context
+        config = current_app.config
+        self.engine.window = config['HUMAN_DETECTION_TIMEOUT']
+        self.engine.sigma = config['DIRECTION_SIGMA']
+        self.engine.min_confidence = config['DIRECTION_MIN_CONFIDENCE']
         
-        if inside_detected and not outside_detected:
-            return "OUT"
-        elif outside_detected and not inside_detected:
-            return "IN"
-        elif inside_detected and outside_detected:
-            inside_time = self.sensor_inside.get_latest_detection()
-            outside_time = self.sensor_outside.get_latest_detection()
-            return "OUT" if inside_time > outside_time else "IN"
+        logger.info("[MOCK] Initializing sensors (simulated)...")
         
-        return None
-    
-    def configure_range(self, distance: int):
-        """Configure range for both sensors"""
-        self.sensor_inside.configure_range(distance)
-        self.sensor_outside.configure_range(distance)
-    
-    def trigger_inside_detection(self):
+        for sensor in (self.sensor_inside, self.sensor_outside):
+            if sensor.connect():
+                threading.Thread(target=sensor.monitor_loop, name=sensor.thread_name(), daemon=True).start()
+    
+    def add_listener(self, callback: Callable[[str, float], None]):
+        """Register a callback for detections from either sensor"""
+        self.listeners.append(callback)
+    
+    def _on_detection(self, location: str, timestamp: float):
+        """Feed a sensor detection into the direction engine and listeners"""
+        self.engine.add_detection(location, timestamp)
+        for callback in self.listeners:
+            callback(location, timestamp)
+    
+    def infer_direction(self, read_time: Optional[float] = None) -> Tuple[Optional[str], float]:
+        """Infer movement direction and confidence for a tag read"""
+        if read_time is None:
+            read_time = time.time()
+        direction, confidence = self.engine.infer(read_time)
+        if direction and confidence < self.engine.min_confidence:
+            return None, confidence
+        return direction, confidence
+    
+    def configure_range(self, distance: int) -> List[Future]:
+        """Configure range for both sensors (one future per sensor)"""
+        return [self.sensor_inside.configure_range(distance), self.sensor_outside.configure_range(distance)]
+    
+    def trigger_inside_detection(self, timestamp: Optional[float] = None):
         """Manually trigger inside sensor (for testing)"""
-        self.sensor_inside.trigger_detection()
+        self.sensor_inside.trigger_detection(timestamp)
     
-    def trigger_outside_detection(self):
+    def trigger_outside_detection(self, timestamp: Optional[float] = None):
         """Manually trigger outside sensor (for testing)"""
-        self.sensor_outside.trigger_detection()
+        self.sensor_outside.trigger_detection(timestamp)
     
     def shutdown(self):
         """Shutdown both sensors"""
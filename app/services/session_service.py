@@ -0,0 +1,145 @@
+"""
+Visit sessions: OUT/IN pairs per tag and dwell aggregates, kept up to date as records are added
+"""
+import threading
+import time
+from array import array
+from bisect import insort
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.services.tracking_service import tracking_service
+
+RECENT_SESSIONS = 20  # sessions kept per tag for /api/dwell/<tag_id>
+
+
+def read_date_to_time(read_date: str) -> float:
+    """YYYY-MM-DD-HH-MM-SS-mmm (local time) as a Unix timestamp"""
+    y, mo, d, h, mi, s, ms = map(int, read_date.split('-'))
+    return datetime(y, mo, d, h, mi, s, ms * 1000).timestamp()
+
+
+class TagDwell:
+    """Sessions of one tag: time spent out of the room between an OUT and the next IN"""
+    
+    __slots__ = ('out_since', 'out_date', 'durations', 'total', 'unmatched', 'recent')
+    
+    def __init__(self):
+        self.out_since: Optional[float] = None  # time of the OUT that opened the current session
+        self.out_date: Optional[str] = None
+        self.durations = array('d')  # closed session lengths, sorted
+        self.total = 0.0
+        self.unmatched = 0  # IN without an OUT, or an OUT superseded by another OUT (missed read)
+        self.recent = deque(maxlen=RECENT_SESSIONS)
+    
+    def apply(self, record: dict):
+        """Advance the session state with the tag's next record"""
+        t = read_date_to_time(record['read_date'])
+        if record['direction'] == 'OUT':
+            if self.out_since is not None:
+                self.unmatched += 1
+            self.out_since, self.out_date = t, record['read_date']
+        elif self.out_since is None or t < self.out_since:
+            self.unmatched += 1
+        else:
+            duration = t - self.out_since
+            insort(self.durations, duration)
+            self.total += duration
+            self.recent.append({'out': self.out_date, 'in': record['read_date'],
+                                'seconds': round(duration, 3), 'portal_id': record.get('portal_id')})
+            self.out_since = self.out_date = None
+    
+    def snapshot(self) -> tuple:
+        """The figures `summary` reports, read in O(1) so they can be formatted after releasing the lock"""
+        count = len(self.durations)
+        p95 = self.durations[max(0, -(-95 * count // 100) - 1)] if count else None
+        longest = self.durations[-1] if count else None
+        return count, self.total, p95, longest, self.out_since, self.out_date, self.unmatched
+
+
+def summary(snapshot: tuple, now: float) -> dict:
+    """Dwell aggregates (seconds) from a TagDwell snapshot"""
+    count, total, p95, longest, out_since, out_date, unmatched = snapshot
+    return {
+        'sessions': count,
+        'total_seconds': round(total, 3),
+        'average_seconds': round(total / count, 3) if count else None,
+        'p95_seconds': round(p95, 3) if count else None,
+        'max_seconds': round(longest, 3) if count else None,
+        'currently_out': out_since is not None,
+        'out_since': out_date,
+        'current_out_seconds': round(now - out_since, 3) if out_since is not None else None,
+        'unmatched': unmatched
+    }
+
+
+class SessionService:
+    """Per-tag dwell state, advanced record by record (never rescans history after startup)
+
+    Records are paired when a query asks, never on the thread adding them: the listener only marks the
+    state stale, and `lock` is held by readers only.
+    """
+    
+    def __init__(self, store=None):
+        self.store = store if store is not None else tracking_service
+        self.tags: Dict[str, TagDwell] = {}
+        self.log = None  # the RecordLog the state was built from
+        self.applied = 0  # records of that log already applied
+        self.lock = threading.Lock()  # guards the state, never taken on the write path
+        self.stale = threading.Event()  # records were added since the last catch_up
+    
+    def initialize(self):
+        """Build state from the loaded records and follow new ones"""
+        self.store.add_listener(self.on_record)
+        self.catch_up()
+    
+    def on_record(self, record: dict):
+        """Tracking store listener: runs on the writer's thread, so it only marks the state stale"""
+        self.stale.set()
+    
+    def catch_up(self):
+        """Apply records added since the last call, starting over if the store was cleared or replaced"""
+        if not self.stale.is_set() and self.store.log is self.log:
+            return
+        with self.lock:
+            self.stale.clear()  # before reading the length, so a record added meanwhile marks it again
+            log = self.store.log
+            if log is not self.log:
+                self.tags, self.log, self.applied = {}, log, 0
+            records = log.records
+            end = len(records)
+            # Records are applied in log order even if listeners fire out of order
+            for position in range(self.applied, end):
+                record = records[position]
+                dwell = self.tags.get(record['rfid_tag'])
+                if dwell is None:
+                    dwell = self.tags[record['rfid_tag']] = TagDwell()
+                dwell.apply(record)
+            self.applied = end
+    
+    def get_tag(self, tag_id: str) -> Optional[dict]:
+        """Dwell aggregates and recent sessions for one tag"""
+        self.catch_up()
+        with self.lock:
+            dwell = self.tags.get(tag_id)
+            if dwell is None:
+                return None
+            state, recent = dwell.snapshot(), list(dwell.recent)
+        return dict(summary(state, time.time()), rfid_tag=tag_id, recent_sessions=recent)
+    
+    def get_all(self, sort: str = 'total_seconds', out_only: bool = False, limit: Optional[int] = None) -> List[dict]:
+        """Dwell aggregates for every tag, largest first by `sort`"""
+        self.catch_up()
+        with self.lock:
+            states = [(tag, dwell.snapshot()) for tag, dwell in self.tags.items()
+                      if not out_only or dwell.out_since is not None]
+        now = time.time()
+        summaries = [dict(summary(state, now), rfid_tag=tag) for tag, state in states]
+        summaries.sort(key=lambda s: s[sort] or 0, reverse=True)
+        return summaries[:limit] if limit else summaries
+
+
+SORT_KEYS = ('total_seconds', 'average_seconds', 'p95_seconds', 'max_seconds', 'sessions', 'current_out_seconds')
+
+# Global session service instance
+session_service = SessionService()
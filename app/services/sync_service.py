@@ -0,0 +1,215 @@
+"""
+Upstream sync: tail the tracking store and post new records in gzip batches to a central server
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+from app.services.tracking_service import tracking_service
+from app.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+sync_records = registry.counter('sync_records_sent', 'Records acknowledged by the sync server')
+sync_errors = registry.counter('sync_errors', 'Failed sync uploads')
+
+
+class SyncError(Exception):
+    """Upload rejected or not acknowledged"""
+
+
+def record_fingerprint(record: dict) -> str:
+    """Identifies a record well enough to tell whether the store was replaced"""
+    return f"{record['rfid_tag']}|{record['read_date']}|{record.get('portal_id')}"
+
+
+class SyncService:
+    """Batched, resumable uploads of new tracking records"""
+    
+    def __init__(self, store=None):
+        self.store = store if store is not None else tracking_service
+        self.url = ''
+        self.token = ''
+        self.device_id = socket.gethostname()
+        self.batch_size = 500
+        self.interval = 5.0  # seconds between polls once caught up
+        self.timeout = 10.0
+        self.backoff_min = 1.0
+        self.backoff_max = 300.0
+        self.state_file = None
+        
+        self.offset = 0  # records of the current store acknowledged by the server
+        self.last_fingerprint = None  # fingerprint of record offset - 1
+        self.log = None  # the RecordLog the offset refers to
+        self.failures = 0
+        self.last_error = None
+        self.last_success = None
+        self.session: Optional[requests.Session] = None
+        self.thread = None
+        self._stop = threading.Event()
+    
+    def initialize(self):
+        """Load the acknowledged offset and start syncing if SYNC_URL is set"""
+        # Captured here: the sync thread has no app context
+        config = current_app.config
+        self.url = config['SYNC_URL']
+        self.token = config['SYNC_TOKEN']
+        self.device_id = config['DEVICE_ID'] or socket.gethostname()
+        self.batch_size = config['SYNC_BATCH_SIZE']
+        self.interval = config['SYNC_INTERVAL']
+        self.timeout = config['SYNC_TIMEOUT']
+        self.backoff_max = config['SYNC_BACKOFF_MAX']
+        self.state_file = config['SYNC_STATE_FILE']
+        if self.url:
+            self.start()
+    
+    def start(self):
+        """Start the sync thread (once)"""
+        if self.thread is not None:
+            return
+        self._load_state()
+        self._stop.clear()
+        self.thread = threading.Thread(target=self.run, name='sync', daemon=True)
+        self.thread.start()
+        logger.info("Syncing to %s from offset %d", self.url, self.offset)
+    
+    def stop(self):
+        """Stop the sync thread"""
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join(timeout=self.timeout + 1)
+            self.thread = None
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+    
+    def run(self):
+        """Upload until stopped, backing off while the server is unreachable"""
+        while not self._stop.is_set():
+            try:
+                sent = self.sync_once()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                sync_errors.inc()
+                delay = self.backoff_delay()
+                logger.warning("Sync failed (%s), retrying in %.1fs", e, delay)
+            else:
+                self.failures = 0
+                delay = 0 if sent else self.interval  # keep going while catching up
+            self._stop.wait(delay)
+    
+    def backoff_delay(self) -> float:
+        """Exponential backoff with jitter after consecutive failures"""
+        delay = min(self.backoff_max, self.backoff_min * 2 ** (self.failures - 1))
+        return delay * random.uniform(0.5, 1.0)
+    
+    def sync_once(self) -> int:
+        """Upload the next batch; returns records acknowledged (0 when caught up)"""
+        log = self.store.log
+        if log is not self.log:
+            self._resume(log)
+        
+        batch = log.records[self.offset:self.offset + self.batch_size]
+        if not batch:
+            return 0
+        
+        first = record_fingerprint(batch[0])
+        batch_id = hashlib.sha1(f"{self.device_id}|{first}|{len(batch)}".encode()).hexdigest()[:16]
+        body = gzip.compress(json.dumps({
+            'device_id': self.device_id,
+            'batch_id': batch_id,
+            'offset': self.offset,
+            'records': batch
+        }, separators=(',', ':')).encode('utf-8'))
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip',
+            'Idempotency-Key': batch_id  # retried batches can be deduplicated server side
+        }
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        
+        if self.session is None:
+            self.session = requests.Session()
+            # One pooled keep-alive connection to the server
+            self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+            self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+        if not 200 <= response.status_code < 300:
+            raise SyncError(f"HTTP {response.status_code}")
+        
+        self.offset += len(batch)
+        self.last_fingerprint = record_fingerprint(batch[-1])
+        self.last_success = time.time()
+        self._save_state()
+        sync_records.inc(len(batch))
+        return len(batch)
+    
+    def get_status(self) -> dict:
+        """Sync progress"""
+        return {
+            'enabled': bool(self.url),
+            'url': self.url,
+            'device_id': self.device_id,
+            'offset': self.offset,
+            'pending': self.pending(),
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'last_success': self.last_success
+        }
+    
+    def pending(self) -> int:
+        """Records not yet acknowledged"""
+        return max(0, len(self.store.records) - self.offset) if self.url else 0
+    
+    def _resume(self, log):
+        """Keep the offset only if it still points at the record that was acknowledged"""
+        records = log.records
+        valid = self.offset == 0 or (
+            self.offset <= len(records) and record_fingerprint(records[self.offset - 1]) == self.last_fingerprint)
+        if not valid:
+            logger.warning("Tracking store changed since offset %d, syncing from the start", self.offset)
+            self.offset, self.last_fingerprint = 0, None
+        self.log = log
+    
+    def _load_state(self):
+        """Read the acknowledged offset (per server URL)"""
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (OSError, ValueError, TypeError):
+            return
+        if state.get('url') == self.url:
+            self.offset = state.get('offset', 0)
+            self.last_fingerprint = state.get('last_fingerprint')
+    
+    def _save_state(self):
+        """Persist the acknowledged offset atomically"""
+        if not self.state_file:
+            return
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp = self.state_file + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump({'url': self.url, 'offset': self.offset, 'last_fingerprint': self.last_fingerprint}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.state_file)
+
+
+# Global sync service instance
+sync_service = SyncService()
+
+registry.gauge('sync_pending_records', 'Records waiting to be uploaded', function=sync_service.pending)
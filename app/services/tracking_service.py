@@ -1,42 +1,180 @@
+import atexit
+import logging
 import threading
-from typing import List, Dict, Optional
+import time
+from bisect import bisect_left
+from itertools import chain
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Callable, List, Dict, Optional
 from flask import current_app
 from app.models import TrackingRecord, SystemStatus
-from app.utils.helpers import load_json_file, save_json_file
+from app.utils.helpers import (save_json_file, get_default_portal_id, is_ndjson, load_records,
+                               append_ndjson_file, save_ndjson_file)
+from app.utils.metrics import registry, lock_wait, save_duration
+from app.utils.profiling import add_phase, phase
+
+logger = logging.getLogger(__name__)
+
+class RecordLog:
+    """Append-only records plus per-portal and per-tag positions; readers snapshot by length, no lock"""
+    
+    def __init__(self, records: Optional[List[dict]] = None, default_portal_id: str = 'main'):
+        self.records: List[dict] = records if records is not None else []
+        self.portal_index: Dict[str, List[int]] = {}  # portal_id -> record positions (ascending)
+        self.tag_index: Dict[str, List[int]] = {}  # rfid_tag -> record positions (ascending)
+        self.tag_state: Dict[str, tuple] = {}  # rfid_tag -> (first read_date, latest record, IN count, OUT count)
+        for position, record in enumerate(self.records):
+            # Records from before portals belong to the default portal
+            portal_id = record.setdefault('portal_id', default_portal_id)
+            self.portal_index.setdefault(portal_id, []).append(position)
+            self.tag_index.setdefault(record['rfid_tag'], []).append(position)
+            self._track(record)
+        self.sorted_tags: List[str] = sorted(self.tag_index)  # replaced, never edited in place (prefix queries)
+    
+    def append(self, record: dict):
+        """Add a record (single writer, under the service's write lock)"""
+        self.records.append(record)
+        position = len(self.records) - 1
+        self.portal_index.setdefault(record['portal_id'], []).append(position)
+        tag = record['rfid_tag']
+        positions = self.tag_index.get(tag)
+        if positions is None:
+            self.tag_index[tag] = [position]
+            tags = self.sorted_tags
+            i = bisect_left(tags, tag)
+            self.sorted_tags = tags[:i] + [tag] + tags[i:]
+        else:
+            positions.append(position)
+        self._track(record)
+    
+    def _track(self, record: dict):
+        """Update the tag's state (a new tuple each time, so readers never see it half-written)"""
+        tag = record['rfid_tag']
+        inbound = record['direction'] == 'IN'
+        state = self.tag_state.get(tag)
+        if state is None:
+            self.tag_state[tag] = (record['read_date'], record, int(inbound), int(not inbound))
+            return
+        first, latest, ins, outs = state
+        # Files written before records were appended in order may hold older reads later on
+        self.tag_state[tag] = (min(first, record['read_date']),
+                               record if record['read_date'] >= latest['read_date'] else latest,
+                               ins + inbound, outs + (not inbound))
+    
+    def snapshot(self, portal_id: Optional[str] = None) -> List[dict]:
+        """Records present now (optionally for one portal); later appends are not included"""
+        records = self.records
+        end = len(records)
+        if portal_id is None:
+            return records[:end]
+        positions = self.portal_index.get(portal_id, [])
+        # Positions may already include a record appended after `end` was read
+        return [records[i] for i in positions[:bisect_left(positions, end)]]
+    
+    def matching_tags(self, prefix: str) -> List[str]:
+        """Tags starting with prefix, found by bisecting the sorted tag list"""
+        tags = self.sorted_tags
+        matches = []
+        for i in range(bisect_left(tags, prefix), len(tags)):
+            if not tags[i].startswith(prefix):
+                break
+            matches.append(tags[i])
+        return matches
+    
+    def snapshot_tags(self, prefix: str, exact: bool = False) -> List[dict]:
+        """Records present now for one tag (exact) or every tag with a prefix, in log order"""
+        records = self.records
+        end = len(records)
+        tags = ([prefix] if prefix in self.tag_index else []) if exact else self.matching_tags(prefix)
+        runs = [positions[:bisect_left(positions, end)] for positions in (self.tag_index[tag] for tag in tags)]
+        # Each run is ascending; sorting the concatenation merges them
+        positions = runs[0] if len(runs) == 1 else sorted(chain.from_iterable(runs))
+        return [records[i] for i in positions]
+
 
 class TrackingService:
     """Service for managing tracking records"""
     
     def __init__(self):
-        self.records: List[dict] = []
-        self.status = SystemStatus()
-        self.lock = threading.Lock()
+        self.log = RecordLog()  # replaced, never emptied, so readers holding the old one stay consistent
+        self.status = SystemStatus()  # replaced on every change, never mutated
+        self.lock = threading.Lock()  # serializes writers only
+        self.version = 0  # Bumped on every change, validates cached responses
+        self.data_file = None
+        self.default_portal_id = 'main'
+        self.save_interval = 0.0  # seconds between background saves, 0 = save on every write
+        self._dirty = threading.Event()
+        self._stop = threading.Event()
+        self._save_lock = threading.Lock()
+        self._saved = (None, 0)  # (RecordLog, count) already in an NDJSON data file
+        self._flusher: Optional[threading.Thread] = None
+        self.listeners: List[Callable[[dict], None]] = []
+    
+    @property
+    def records(self) -> List[dict]:
+        """Current records (live list: use get_all_records for a stable copy)"""
+        return self.log.records
     
     def initialize(self):
         """Initialize tracking service and load existing data"""
-        data_file = current_app.config['DATA_FILE']
-        self.records = load_json_file(data_file, default=[])
-        self.status.total_records = len(self.records)
-        print(f"Loaded {len(self.records)} existing records")
+        self.flush()  # pending changes belong to the previous data file
+        
+        # Captured here: add_record runs on portal worker threads without an app context
+        self.data_file = current_app.config['DATA_FILE']
+        self.default_portal_id = get_default_portal_id(current_app.config)
+        
+        self.replace_records(load_records(self.data_file))
+        self._saved = (self.log, len(self.log.records))
+        self.start_flusher(current_app.config['SAVE_INTERVAL'])
+        logger.info("Loaded %d existing records", len(self.records))
     
-    def add_record(self, rfid_tag: str, direction: str) -> dict:
+    def replace_records(self, records: List[dict]):
+        """Swap in a new set of records (not saved)"""
+        log = RecordLog(records, self.default_portal_id)
+        with self._locked('load'):
+            self.log = log
+            self.status = replace(self.status, total_records=len(records))
+            self.version += 1
+    
+    def add_record(self, rfid_tag: str, direction: str, portal_id: Optional[str] = None,
+                   read_time: Optional[float] = None, confidence: Optional[float] = None) -> dict:
         """Add new tracking record"""
-        record = TrackingRecord.create(rfid_tag, direction.upper())
+        portal_id = portal_id or self.default_portal_id
+        record = TrackingRecord.create(rfid_tag, direction.upper(), portal_id, read_time, confidence)
         record_dict = record.to_dict()
         
-        with self.lock:
-            self.records.append(record_dict)
-            self.status.last_tag_read = record_dict
-            self.status.total_records = len(self.records)
-            self._save()
+        with self._locked('add'):
+            self.log.append(record_dict)
+            self.status = replace(self.status, last_tag_read=record_dict, total_records=len(self.log.records))
+            self.version += 1
+        self._mark_dirty()
+        for callback in self.listeners:
+            try:
+                callback(record_dict)
+            except Exception:
+                logger.exception("Record listener %r failed", callback)  # the record is already stored
         
-        print(f"Recorded: {rfid_tag} - {direction} at {record.read_date}")
+        logger.info("Recorded: %s - %s at %s (%s)", rfid_tag, direction, record.read_date, portal_id)
         return record_dict
     
+    def add_listener(self, callback: Callable[[dict], None]):
+        """Register a callback for every added record (called outside the write lock)"""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+    
     def get_all_records(self, filters: Optional[Dict] = None) -> List[dict]:
         """Get all records with optional filters"""
-        with self.lock:
-            filtered = self.records.copy()
+        if filters and ('rfid_tag' in filters or filters.get('tag_prefix')):
+            # Only the matching tags' records are touched
+            exact = 'rfid_tag' in filters
+            filtered = self.log.snapshot_tags(filters['rfid_tag'] if exact else filters['tag_prefix'], exact)
+            if exact and filters.get('tag_prefix'):
+                filtered = [r for r in filtered if r['rfid_tag'].startswith(filters['tag_prefix'])]
+            if filters.get('portal_id'):
+                filtered = [r for r in filtered if r['portal_id'] == filters['portal_id']]
+        else:
+            filtered = self.log.snapshot(filters.get('portal_id') if filters else None)
         
         if filters:
             if 'direction' in filters:
@@ -47,12 +185,10 @@ class TrackingService:
             
             if 'end_date' in filters:
                 filtered = [r for r in filtered if r['read_date'] <= filters['end_date']]
-            
-            if 'rfid_tag' in filters:
-                filtered = [r for r in filtered if r['rfid_tag'] == filters['rfid_tag']]
         
         # Sort by date (newest first)
-        filtered.sort(key=lambda x: x['read_date'], reverse=True)
+        with phase('sort'):
+            filtered.sort(key=lambda x: x['read_date'], reverse=True)
         
         # Apply limit
         if filters and 'limit' in filters:
@@ -64,31 +200,58 @@ class TrackingService:
         """Get all records for specific tag"""
         return self.get_all_records({'rfid_tag': tag_id})
     
+    def get_tag_states(self, tag_ids: List[str]) -> Dict[str, Optional[dict]]:
+        """Latest movement and counts per tag (None for tags never seen), without scanning records"""
+        tag_state = self.log.tag_state
+        states = {}
+        for tag_id in tag_ids:
+            state = tag_state.get(tag_id)
+            if state is None:
+                states[tag_id] = None
+                continue
+            first, latest, ins, outs = state
+            states[tag_id] = {
+                'last_seen': latest['read_date'],
+                'last_direction': latest['direction'],
+                'last_portal': latest['portal_id'],
+                'first_seen': first,
+                'in_count': ins,
+                'out_count': outs,
+                'total': ins + outs
+            }
+        return states
+    
     def clear_all_records(self):
         """Clear all tracking records"""
-        with self.lock:
-            self.records.clear()
-            self.status.total_records = 0
-            self.status.last_tag_read = None
-            self._save()
+        with self._locked('clear'):
+            self.log = RecordLog()
+            self.status = replace(self.status, total_records=0, last_tag_read=None)
+            self.version += 1
+        self._mark_dirty()
     
-    def get_statistics(self) -> dict:
-        """Calculate tracking statistics"""
-        with self.lock:
-            total = len(self.records)
-            in_count = sum(1 for r in self.records if r['direction'] == 'IN')
-            out_count = sum(1 for r in self.records if r['direction'] == 'OUT')
-            
-            # Count unique tags
-            unique_tags = len(set(r['rfid_tag'] for r in self.records))
-            
-            # Get most active tags
-            tag_counts = {}
-            for record in self.records:
-                tag = record['rfid_tag']
-                tag_counts[tag] = tag_counts.get(tag, 0) + 1
-            
-            top_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    def get_statistics(self, portal_id: Optional[str] = None, tag_prefix: Optional[str] = None) -> dict:
+        """Calculate tracking statistics (optionally for one portal and/or tags with an EPC prefix)"""
+        if tag_prefix:
+            records = self.log.snapshot_tags(tag_prefix)
+            if portal_id:
+                records = [r for r in records if r['portal_id'] == portal_id]
+        else:
+            records = self.log.snapshot(portal_id)
+        
+        total = len(records)
+        in_count = sum(1 for r in records if r['direction'] == 'IN')
+        out_count = sum(1 for r in records if r['direction'] == 'OUT')
+        
+        # Count unique tags
+        unique_tags = len(set(r['rfid_tag'] for r in records))
+        
+        # Get most active tags
+        tag_counts = {}
+        for record in records:
+            tag = record['rfid_tag']
+            tag_counts[tag] = tag_counts.get(tag, 0) + 1
+        
+        top_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10]
         
         return {
             'total_records': total,
@@ -105,15 +268,87 @@ class TrackingService:
     
     def update_status(self, **kwargs):
         """Update system status"""
-        for key, value in kwargs.items():
-            if hasattr(self.status, key):
-                setattr(self.status, key, value)
-    
-    def _save(self):
-        """Save records to file"""
-        data_file = current_app.config['DATA_FILE']
-        save_json_file(data_file, self.records)
+        with self._locked('status'):
+            changes = {key: value for key, value in kwargs.items() if hasattr(self.status, key)}
+            self.status = replace(self.status, **changes)
+    
+    def start_flusher(self, interval: float):
+        """Save in the background at most every `interval` seconds (0 = save on every write)"""
+        self.save_interval = interval
+        if interval > 0 and self._flusher is None:
+            self._stop.clear()
+            self._flusher = threading.Thread(target=self._flush_loop, name='tracking-flush', daemon=True)
+            self._flusher.start()
+            atexit.register(self.stop_flusher)
+    
+    def stop_flusher(self):
+        """Stop background saves, writing anything pending"""
+        if self._flusher is not None:
+            self._stop.set()
+            self._dirty.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+    
+    def flush(self):
+        """Write the current records to the data file if they changed"""
+        with self._save_lock:
+            if not self._dirty.is_set():
+                return
+            self._dirty.clear()
+            log = self.log
+            records = log.snapshot()
+            saved_log, saved_count = self._saved
+            if is_ndjson(self.data_file) and log is saved_log:
+                saved = self._save(records[saved_count:], append=True)  # journal: only the new records
+            else:
+                saved = self._save(records)
+            if saved:
+                self._saved = (log, len(records))
+            else:
+                self._dirty.set()  # retried on the next flush
+    
+    def _flush_loop(self):
+        """Background saves: writers only mark the store dirty"""
+        while not self._stop.is_set():
+            self._dirty.wait()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Tracking flush error: %s", e)
+            self._stop.wait(self.save_interval)
+    
+    def _mark_dirty(self):
+        """Schedule a save (or save now without a flusher)"""
+        self._dirty.set()
+        if self._flusher is None:
+            self.flush()
+    
+    @contextmanager
+    def _locked(self, operation: str):
+        """Hold the write lock, recording how long it took to get it"""
+        started = time.perf_counter()
+        with self.lock:
+            waited = time.perf_counter() - started
+            lock_wait.labels(operation).observe(waited)
+            add_phase('lock', waited)
+            yield
+    
+    def _save(self, records: List[dict], append: bool = False) -> bool:
+        """Save records to file (NDJSON files can be appended to)"""
+        started = time.perf_counter()
+        if append:
+            saved = append_ndjson_file(self.data_file, records)
+        elif is_ndjson(self.data_file):
+            saved = save_ndjson_file(self.data_file, records)
+        else:
+            saved = save_json_file(self.data_file, records)
+        save_duration.observe(time.perf_counter() - started)
+        return saved
 
 
 # Global tracking service instance
-tracking_service = TrackingService()
\ No newline at end of file
+tracking_service = TrackingService()
+
+registry.gauge('tracking_records', 'Records in the tracking store',
+               function=lambda: len(tracking_service.records))
@@ -0,0 +1,236 @@
+"""
+HTTP response compression with Accept-Encoding negotiation
+"""
+import threading
+import zlib
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Iterable, Iterator, Optional
+from flask import Response, current_app, g, request
+from app.utils.profiling import phase
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/csv', 'text/plain')
+
+
+def supported_encodings() -> list:
+    """Encodings this server can produce, in order of preference"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    
+    weights = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token] = quality
+    
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = weights.get(encoding, weights.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli compressor"""
+    
+    def __init__(self, encoding: str, level: int = 6):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client receives it now"""
+        if self.encoding == 'br':
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self) -> bytes:
+        """Terminate the compressed stream"""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_bytes(data: bytes, encoding: str, level: int = 6) -> bytes:
+    """Compress a complete body in one pass"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks: Iterable, encoding: str, level: int = 6,
+                    on_complete: Optional[Callable[[bytes], None]] = None,
+                    max_cached_bytes: int = 0) -> Iterator[bytes]:
+    """Compress a chunked body, optionally handing the full result to on_complete"""
+    compressor = StreamCompressor(encoding, level)
+    collected = [] if on_complete else None
+    collected_size = 0
+    
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if not chunk:
+            continue
+        out = compressor.compress(chunk)
+        if collected is not None:
+            collected.append(out)
+            collected_size += len(out)
+            if collected_size > max_cached_bytes:
+                collected = None
+        if out:
+            yield out
+    
+    tail = compressor.finish()
+    if collected is not None:
+        collected.append(tail)
+        on_complete(b''.join(collected))
+    yield tail
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies tagged with the data version they were built from"""
+    
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key: str, encoding: str, version: int):
+        """Get cached (body, mimetype) if it matches the current data version"""
+        with self.lock:
+            entry = self.entries.get((key, encoding))
+            if entry is None or entry[0] != version:
+                return None
+            self.entries.move_to_end((key, encoding))
+            return entry[1], entry[2]
+    
+    def put(self, key: str, encoding: str, version: int, body: bytes, mimetype: str):
+        """Store a compressed body"""
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[(key, encoding)] = (version, body, mimetype)
+            self.entries.move_to_end((key, encoding))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached bodies"""
+        with self.lock:
+            self.entries.clear()
+
+
+# Global compressed body cache
+compressed_cache = CompressedBodyCache()
+
+
+def _compression_level(encoding: str) -> int:
+    if encoding == 'br':
+        return current_app.config['BROTLI_QUALITY']
+    return current_app.config['COMPRESSION_LEVEL']
+
+
+def cached_compressed(version_getter: Callable[[], int]):
+    """Serve a view from the compressed body cache while the data version is unchanged"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config['COMPRESSION_ENABLED']:
+                return view(*args, **kwargs)
+            
+            encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+            if encoding is None:
+                return view(*args, **kwargs)
+            
+            # Read the version before the data so a concurrent write can only make the entry stale
+            version = version_getter()
+            key = request.full_path
+            cached = compressed_cache.get(key, encoding, version)
+            if cached is not None:
+                body, mimetype = cached
+                response = Response(body, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                response.headers['Vary'] = 'Accept-Encoding'
+                return response
+            
+            g.compression_cache_entry = (key, version)
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook compressing eligible responses"""
+    config = current_app.config
+    if not config['COMPRESSION_ENABLED']:
+        return response
+    if response.status_code != 200 or response.direct_passthrough:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+    
+    level = _compression_level(encoding)
+    cache_entry = g.pop('compression_cache_entry', None)
+    mimetype = response.mimetype
+    
+    if response.is_streamed:
+        # Size is unknown up front: streamed bodies are large by construction
+        on_complete = None
+        if cache_entry:
+            key, version = cache_entry
+            on_complete = lambda body: compressed_cache.put(key, encoding, version, body, mimetype)
+        response.response = compress_stream(
+            response.response, encoding, level,
+            on_complete=on_complete,
+            max_cached_bytes=config['COMPRESSION_CACHE_MAX_BYTES']
+        )
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        with phase('compress'):
+            body = compress_bytes(data, encoding, level)
+        response.set_data(body)
+        if cache_entry and len(body) <= config['COMPRESSION_CACHE_MAX_BYTES']:
+            key, version = cache_entry
+            compressed_cache.put(key, encoding, version, body, mimetype)
+    
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_compression(app):
+    """Register response compression on the app"""
+    compressed_cache.max_entries = app.config['COMPRESSION_CACHE_SIZE']
+    app.after_request(compress_response)
@@ -1,8 +1,12 @@
+import codecs
+import logging
 import json
 import os
-from typing import List
+from typing import BinaryIO, Iterable, Iterator, List, Tuple
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 def ensure_directory(filepath: str):
     """Ensure directory exists for file"""
     directory = os.path.dirname(filepath)
@@ -20,7 +24,7 @@ def load_json_file(filepath: str, default=None):
             with open(filepath, 'r') as f:
                 return json.load(f)
         except Exception as e:
-            print(f"Error loading {filepath}: {e}")
+            logger.error("Error loading %s: %s", filepath, e)
     
     return default
 
@@ -33,10 +37,135 @@ def save_json_file(filepath: str, data):
             json.dump(data, f, indent=2)
         return True
     except Exception as e:
-        print(f"Error saving {filepath}: {e}")
+        logger.error("Error saving %s: %s", filepath, e)
         return False
 
 
+def is_ndjson(filepath: str) -> bool:
+    """Records files ending in .ndjson are append-only journals (one record per line)"""
+    return filepath.endswith('.ndjson')
+
+
+def iter_ndjson_file(filepath: str) -> Iterator[dict]:
+    """Records from an NDJSON file, skipping lines that do not parse (e.g. a torn last write)"""
+    if not os.path.exists(filepath):
+        return
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning("Skipping unreadable line %d of %s", number, filepath)
+
+
+def append_ndjson_file(filepath: str, records: Iterable[dict]) -> bool:
+    """Append records to an NDJSON file"""
+    try:
+        ensure_directory(filepath)
+        with open(filepath, 'a+b') as f:
+            size = f.seek(0, os.SEEK_END)
+            try:
+                if size:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')  # end a torn last write so it cannot swallow the first new record
+                f.writelines((json.dumps(r, separators=(',', ':')) + '\n').encode('utf-8') for r in records)
+                f.flush()
+            except Exception:
+                f.truncate(size)  # all or nothing, so a retry does not duplicate records
+                raise
+        return True
+    except Exception as e:
+        logger.error("Error saving %s: %s", filepath, e)
+        return False
+
+
+def save_ndjson_file(filepath: str, records: Iterable[dict]) -> bool:
+    """Rewrite an NDJSON file (atomically: readers see the old or the new file)"""
+    temp = filepath + '.tmp'
+    try:
+        if os.path.exists(temp):
+            os.remove(temp)
+        if not append_ndjson_file(temp, records):
+            return False
+        os.replace(temp, filepath)
+        return True
+    except OSError as e:
+        logger.error("Error saving %s: %s", filepath, e)
+        return False
+
+
+def load_records(filepath: str) -> List[dict]:
+    """Load a records file in either storage format"""
+    if is_ndjson(filepath):
+        return list(iter_ndjson_file(filepath))
+    return load_json_file(filepath, default=[])
+
+
+def iter_records_file(filepath: str) -> Iterator[dict]:
+    """Records from a file in either storage format, one at a time (memory does not grow with the file)"""
+    if is_ndjson(filepath):
+        yield from iter_ndjson_file(filepath)
+    elif os.path.exists(filepath):
+        with open(filepath, 'rb') as f:
+            for value, _ in iter_json_array(f):
+                yield value
+
+
+def iter_json_array(f: BinaryIO, start: int = 0, chunk_size: int = 1 << 20,
+                    max_element: int = 16 << 20) -> Iterator[Tuple[object, int]]:
+    """Elements of a top-level JSON array, parsed incrementally: (value, byte offset just after it)"""
+    # start > 0 resumes at an offset yielded earlier (inside the array)
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    f.seek(start)
+    buffer, pos, offset = '', 0, start
+    eof = False
+    in_array = start > 0
+    
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+            offset += 1
+        if pos >= len(buffer):
+            if eof:
+                raise ValueError(f"Unexpected end of JSON array at byte {offset}")
+            data = f.read(chunk_size)
+            eof = not data
+            buffer, pos = utf8.decode(data, final=eof), 0
+            continue
+        
+        if not in_array:
+            if buffer[pos] != '[':
+                raise ValueError("Expected a JSON array")
+            pos += 1
+            offset += 1
+            in_array = True
+            continue
+        if buffer[pos] == ']':
+            return
+        
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            if not eof and (end == len(buffer) or buffer[end] not in ' \t\r\n,]'):
+                raise ValueError("Element may continue in the next chunk")  # e.g. a number cut short
+        except ValueError:
+            if eof:
+                raise ValueError(f"Invalid JSON at byte {offset}")
+            if len(buffer) - pos > max_element:
+                raise ValueError(f"Element at byte {offset} is larger than {max_element} bytes")
+            data = f.read(chunk_size)
+            eof = not data
+            buffer, pos = buffer[pos:] + utf8.decode(data, final=eof), 0
+            continue
+        
+        offset += len(buffer[pos:end].encode('utf-8'))
+        pos = end
+        yield value, offset
+
+
 def validate_direction(direction: str) -> bool:
     """Validate direction value"""
     return direction.upper() in ['IN', 'OUT']
@@ -49,4 +178,32 @@ def parse_date_filter(date_str: str) -> str:
         datetime.strptime(date_str, "%Y-%m-%d-%H-%M-%S-%f")
         return date_str
     except ValueError:
-        return None
\ No newline at end of file
+        return None
+
+
+def parse_portal_spec(spec: str) -> List[dict]:
+    """Parse PORTALS config: "id:rfid_port,inside_port,outside_port;..." """
+    portals = []
+    for entry in (spec or '').split(';'):
+        entry = entry.strip()
+        if not entry:
+            continue
+        
+        portal_id, sep, ports = entry.partition(':')
+        ports = [p.strip() for p in ports.split(',')] if sep else []
+        if not portal_id.strip() or len(ports) != 3 or not all(ports):
+            raise ValueError(f"Invalid portal definition: '{entry}'")
+        
+        portals.append({
+            'portal_id': portal_id.strip(),
+            'rfid_port': ports[0],
+            'inside_port': ports[1],
+            'outside_port': ports[2]
+        })
+    return portals
+
+
+def get_default_portal_id(config) -> str:
+    """Portal used for manual and legacy records (first configured portal)"""
+    portals = parse_portal_spec(config.get('PORTALS', ''))
+    return portals[0]['portal_id'] if portals else config.get('DEFAULT_PORTAL_ID', 'main')
@@ -0,0 +1,150 @@
+"""
+Asynchronous logging: device threads enqueue records, one listener thread does the I/O
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from app.utils.metrics import registry
+
+LOGGER_NAME = 'app'  # every module logs under app.* via logging.getLogger(__name__)
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# Attributes every LogRecord has; anything else came from extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking or raising"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through `burst` records per message template per `window` seconds, count the rest"""
+    
+    def __init__(self, window: float = 10.0, burst: int = 5):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.buckets: Dict[Tuple[str, int, str], list] = {}  # key -> [window_start, emitted, suppressed]
+        self.lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None or now - bucket[0] >= self.window:
+                suppressed = bucket[2] if bucket else 0
+                self.buckets[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                if len(self.buckets) > 1000:
+                    self._prune(now)
+                return True
+            if bucket[1] < self.burst:
+                bucket[1] += 1
+                return True
+            bucket[2] += 1
+            return False
+    
+    def _prune(self, now: float):
+        """Forget idle templates"""
+        for key, bucket in list(self.buckets.items()):
+            if now - bucket[0] >= self.window and not bucket[2]:
+                del self.buckets[key]
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text, with structured fields appended as key=value"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f"{k}={v}" for k, v in fields.items())
+        if getattr(record, 'suppressed', 0):
+            line += f" ({record.suppressed} similar suppressed)"
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    """Fields passed with extra={...}"""
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_FIELDS and k != 'suppressed'}
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def init_logging(config) -> logging.Logger:
+    """Route app.* logging through a queue drained by a background listener (idempotent)"""
+    global _listener, _handler
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(getattr(logging, str(config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO))
+    
+    if _listener is None:
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if config.get('LOG_FORMAT') == 'json' else TextFormatter(TEXT_FORMAT))
+        
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=config.get('LOG_QUEUE_SIZE', 10000)))
+        _handler.addFilter(RateLimitFilter(config.get('LOG_RATE_LIMIT_WINDOW', 10.0),
+                                           config.get('LOG_RATE_LIMIT_BURST', 5)))
+        logger.addHandler(_handler)
+        logger.propagate = False
+        
+        _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    return logger
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+        _listener = _handler = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _handler.dropped if _handler else 0
+
+
+registry.gauge('log_records_dropped', 'Log records dropped because the log queue was full',
+               function=dropped_records)
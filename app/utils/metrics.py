@@ -0,0 +1,242 @@
+"""
+Lightweight Prometheus-style metrics (text exposition format 0.0.4)
+"""
+import logging
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers lock waits (microseconds) up to slow file saves
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Tag read -> record includes the correlation settle time
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Render {a="1",b="2"}"""
+    if not labels:
+        return ''
+    escaped = (f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for k, v in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value"""
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    """One labelled counter series"""
+    
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    """One labelled gauge series"""
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _HistogramChild:
+    """One labelled histogram series"""
+    
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+    
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric:
+    """A metric family with optional labels"""
+    kind = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[tuple, object] = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values):
+        """Series for these label values (cache the result on hot paths)"""
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+    
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonic count"""
+    kind = 'counter'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if not name.endswith('_total'):
+            name += '_total'
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self):
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+    
+    def samples(self):
+        for key, child in list(self.children.items()):
+            yield '', dict(zip(self.labelnames, key)), child.value
+
+
+class Gauge(Metric):
+    """Value that goes up and down, or is computed at scrape time"""
+    kind = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+    
+    def _new_child(self):
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        self._default.set(value)
+    
+    def samples(self):
+        if self.function is not None:
+            yield '', {}, self.function()
+            return
+        for key, child in list(self.children.items()):
+            yield '', dict(zip(self.labelnames, key)), child.value
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets"""
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+    
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default.observe(value)
+    
+    def samples(self):
+        for key, child in list(self.children.items()):
+            labels = dict(zip(self.labelnames, key))
+            with child.lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield '_bucket', dict(labels, le=_format_value(bound)), cumulative
+            yield '_count', labels, cumulative
+            yield '_sum', labels, total
+
+
+class MetricsRegistry:
+    """All metric families plus scrape-time collectors"""
+    
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], Iterable[Tuple[Metric, Iterable[Sample]]]]] = []
+    
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric family (names are unique)"""
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+    
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+    
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[Metric, Iterable[Sample]]]]):
+        """Register a function yielding (family, samples) at scrape time (existing state, no hot-path cost)"""
+        self.collectors.append(collector)
+    
+    def render(self) -> str:
+        """Text exposition of every metric"""
+        families = [(metric, metric.samples()) for metric in self.metrics.values()]
+        for collector in self.collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                logger.error("Metrics collector error: %s", e)
+        
+        lines = []
+        for metric, samples in families:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+# Global metrics registry and the application's metrics
+registry = MetricsRegistry()
+
+tag_record_latency = registry.histogram(
+    'rfid_tag_record_latency_seconds', 'Tag read to persisted record', ['portal'], LATENCY_BUCKETS)
+save_duration = registry.histogram(
+    'tracking_save_duration_seconds', 'Time to write the records file')
+lock_wait = registry.histogram(
+    'tracking_lock_wait_seconds', 'Time waiting for the tracking store lock', ['operation'])
+serial_bytes = registry.counter(
+    'serial_bytes_read', 'Bytes read from serial ports', ['port'])
+serial_errors = registry.counter(
+    'serial_errors', 'Serial connect/read/write errors and dropped frames', ['port'])
+loop_duration = registry.histogram(
+    'monitor_loop_iteration_seconds', 'Work per monitor/worker loop iteration (excluding sleep)', ['thread'])
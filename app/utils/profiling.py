@@ -0,0 +1,108 @@
+"""
+Opt-in profiling: Server-Timing phases per request and a sampling profiler over all threads
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+from flask import Response, g, has_request_context
+
+
+def _timings() -> Optional[dict]:
+    """Phase totals of the current request, None when not timing"""
+    if not has_request_context():
+        return None
+    return g.get('server_timing')
+
+
+def add_phase(name: str, seconds: float):
+    """Add time measured elsewhere (e.g. lock wait) to a phase of the current request"""
+    timings = _timings()
+    if timings is None:
+        return
+    timings[name] = timings.get(name, 0.0) + seconds
+    if g.server_timing_stack:
+        g.server_timing_stack[-1][1] += seconds  # not part of the enclosing phase
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as one Server-Timing phase; nested phases are subtracted from it"""
+    timings = _timings()
+    if timings is None:
+        yield
+        return
+    stack = g.server_timing_stack
+    entry = [time.perf_counter(), 0.0]  # [started, time spent in nested phases]
+    stack.append(entry)
+    try:
+        yield
+    finally:
+        stack.pop()
+        elapsed = time.perf_counter() - entry[0]
+        timings[name] = timings.get(name, 0.0) + elapsed - entry[1]
+        if stack:
+            stack[-1][1] += elapsed
+
+
+def start_request_timing():
+    """before_request hook"""
+    g.server_timing = {}
+    g.server_timing_stack = []
+    g.server_timing_started = time.perf_counter()
+
+
+def add_server_timing(response: Response) -> Response:
+    """after_request hook writing the Server-Timing header (durations in ms)"""
+    timings = g.pop('server_timing', None)
+    if timings is None:
+        return response
+    timings['total'] = time.perf_counter() - g.server_timing_started
+    response.headers['Server-Timing'] = ', '.join(
+        f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+    return response
+
+
+def init_profiling(app):
+    """Register request timing (before compression, so 'total' includes it)"""
+    app.before_request(start_request_timing)
+    app.after_request(add_server_timing)
+
+
+def _frame_label(frame) -> str:
+    """function name qualified by its file"""
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def sample_stacks(duration: float, interval: float = 0.01) -> Dict[str, int]:
+    """Sample every thread's stack for `duration` seconds: collapsed stack -> sample count"""
+    stacks = Counter()
+    own = threading.get_ident()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f'thread-{ident}'))
+            stacks[';'.join(reversed(labels))] += 1
+        time.sleep(interval)
+    return dict(stacks)
+
+
+def collapsed(stacks: Dict[str, int]) -> str:
+    """Collapsed-stack text (flamegraph.pl / speedscope input), heaviest first"""
+    lines = [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda x: x[1], reverse=True)]
+    return '\n'.join(lines) + '\n'
+
+
+# Only one profile at a time: concurrent samplers would just profile each other
+profile_lock = threading.Lock()
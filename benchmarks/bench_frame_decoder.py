@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Per-frame CPU cost of the S3KM1110 binary decoder vs the legacy text-line path
+
+    python -m benchmarks.bench_frame_decoder --frames 100000
+    python -m benchmarks.bench_frame_decoder --capture captures/sensor_inside.bin
+"""
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from app.services.mmwave_protocol import GATE_COUNT, S3KM1110Decoder, encode_report_frame
+
+
+def synthetic_capture(frames: int, seed: int = 1, garbage_prob: float = 0.01) -> bytes:
+    """Report frames with realistic presence runs and occasional line noise"""
+    rng = random.Random(seed)
+    out = bytearray()
+    present = False
+    for _ in range(frames):
+        if rng.random() < 0.05:
+            present = not present
+        energies = [rng.randint(0, 60) + (rng.randint(20, 80) if present and 2 <= g <= 6 else 0)
+                    for g in range(GATE_COUNT)]
+        out += encode_report_frame(present, rng.randint(50, 500) if present else 0, energies)
+        if rng.random() < garbage_prob:
+            out += bytes(rng.randint(0, 255) for _ in range(rng.randint(1, 8)))
+    return bytes(out)
+
+
+def text_capture(frames: int, seed: int = 1) -> bytes:
+    """Equivalent line-oriented output as parsed by the original detect_human"""
+    rng = random.Random(seed)
+    lines = []
+    present = False
+    for _ in range(frames):
+        if rng.random() < 0.05:
+            present = not present
+        lines.append('presence detected' if present else 'no target')
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class SerialStream(io.RawIOBase):
+    """In-memory port: like pyserial, readline() falls back to one read(1) per byte"""
+    
+    def __init__(self, data: bytes):
+        self.data = io.BytesIO(data)
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        chunk = self.data.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def bench_text(capture: bytes) -> dict:
+    """Original path: one readline per frame, lowercased twice"""
+    stream = SerialStream(capture)
+    detections = frames = 0
+    start = time.process_time_ns()
+    while True:
+        raw = stream.readline()
+        if not raw:
+            break
+        data = raw.decode('utf-8', errors='ignore').strip()
+        frames += 1
+        if data and ('presence' in data.lower() or 'occupied' in data.lower()):
+            detections += 1
+    elapsed = time.process_time_ns() - start
+    return {'frames': frames, 'presence': detections,
+            'cpu_us_per_frame': round(elapsed / 1000 / max(frames, 1), 3)}
+
+
+def bench_binary(capture: bytes, chunk_size: int, threshold: int) -> dict:
+    """Decoder path: whole buffered chunks parsed at once"""
+    stream = SerialStream(capture)
+    decoder = S3KM1110Decoder()
+    detections = 0
+    start = time.process_time_ns()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        for frame in decoder.feed(chunk):
+            if frame.is_presence(threshold):
+                detections += 1
+    elapsed = time.process_time_ns() - start
+    return {'frames': decoder.frames, 'presence': detections, 'errors': decoder.errors,
+            'cpu_us_per_frame': round(elapsed / 1000 / max(decoder.frames, 1), 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capture', help='Raw binary capture from a sensor port')
+    parser.add_argument('--frames', type=int, default=50000, help='Frames in a synthetic capture')
+    parser.add_argument('--chunk', type=int, default=1024, help='Bytes per serial read')
+    parser.add_argument('--threshold', type=int, default=0, help='SENSOR_PRESENCE_THRESHOLD')
+    parser.add_argument('--write-capture', help='Save the synthetic capture to this file')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+    
+    if args.capture:
+        with open(args.capture, 'rb') as f:
+            capture = f.read()
+    else:
+        capture = synthetic_capture(args.frames)
+        if args.write_capture:
+            with open(args.write_capture, 'wb') as f:
+                f.write(capture)
+    
+    binary = bench_binary(capture, args.chunk, args.threshold)
+    results = {
+        'capture': args.capture or f'synthetic:{args.frames}',
+        'bytes': len(capture),
+        'chunk': args.chunk,
+        'binary': binary,
+        'text': bench_text(text_capture(binary['frames']))
+    }
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput and latency benchmarks for the tracking pipeline
+
+Suites:
+    store    add_record throughput and get_all_records/get_statistics/analytics latency per store size
+    latency  tag read -> persisted record through the real reader/sensor threads (emulated ports)
+    http     dashboard polling p50/p99 with concurrent clients against a real HTTP server
+
+    python -m benchmarks.bench_pipeline --output results/HEAD.json
+    python -m benchmarks.bench_pipeline --suite store --sizes 1000,1000000 --budget 5
+    python -m benchmarks.compare results/base.json results/HEAD.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+SUITES = ('store', 'latency', 'http')
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_s: List[float]) -> dict:
+    """Latency summary in milliseconds"""
+    ms = [s * 1000 for s in samples_s]
+    return {
+        'n': len(ms),
+        'mean_ms': round(sum(ms) / len(ms), 3) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3) if ms else 0.0
+    }
+
+
+def timed(operation: Callable[[], object], budget: float, max_ops: int = 1000) -> List[float]:
+    """Run operation repeatedly until budget seconds or max_ops, at least once"""
+    samples = []
+    deadline = time.perf_counter() + budget
+    while len(samples) < max_ops and (not samples or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def synthetic_records(count: int, tags: int = 500, portals=('main',), seed: int = 1) -> List[dict]:
+    """Records shaped like TrackingRecord.to_dict(), oldest first"""
+    rng = random.Random(seed)
+    tag_ids = [f"E200001234567890{i:08X}" for i in range(tags)]
+    start = datetime(2024, 1, 1)
+    step = timedelta(seconds=30)
+    records = []
+    for i in range(count):
+        moment = start + step * i
+        records.append({
+            'rfid_tag': rng.choice(tag_ids),
+            'direction': 'IN' if rng.random() < 0.5 else 'OUT',
+            'read_date': moment.strftime("%Y-%m-%d-%H-%M-%S-%f")[:-3],
+            'portal_id': portals[i % len(portals)],
+            'confidence': round(rng.uniform(0.5, 1.0), 3)
+        })
+    return records
+
+
+def git_commit() -> str:
+    """Commit under test, for comparing result files"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def log(message: str):
+    """Progress on stderr so stdout stays machine-readable"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def bench_store(sizes: List[int], budget: float, workdir: str, save_interval: float = 1.0) -> List[dict]:
+    """add_record throughput and query latency against stores of each size (saves in the background)"""
+    from app.services.analytics_service import AnalyticsService
+    from app.services.tracking_service import TrackingService
+    
+    results = []
+    for size in sizes:
+        log(f"store: {size} records")
+        service = TrackingService()
+        service.data_file = os.path.join(workdir, f'store_{size}.json')
+        service.replace_records(synthetic_records(size, portals=('main', 'dock')))
+        service.start_flusher(save_interval)
+        
+        analytics = AnalyticsService(service)
+        build = timed(analytics.catch_up, 0, max_ops=1)  # columns for the whole store, once
+        counter = iter(range(10 ** 9))
+        adds = timed(lambda: service.add_record(f"E2000012345678FF{next(counter):08X}", 'IN'), budget)
+        results.append({
+            'size': size,
+            'add_record': dict(summarize(adds), ops_per_s=round(len(adds) / sum(adds), 2)),
+            'get_all_records_limit_100': summarize(timed(lambda: service.get_all_records({'limit': 100}), budget)),
+            'get_all_records_portal': summarize(
+                timed(lambda: service.get_all_records({'portal_id': 'dock', 'limit': 100}), budget)),
+            'get_statistics': summarize(timed(service.get_statistics, budget)),
+            'analytics_columns': summarize(build),
+            'analytics_tag_hour_top_100': summarize(
+                timed(lambda: analytics.aggregate(['tag', 'hour'], limit=100), budget))
+        })
+        service.stop_flusher()
+        os.remove(service.data_file)
+    return results
+
+
+def start_app(workdir: str):
+    """Real (non-mock) app whose devices are pty emulators"""
+    from app.services.device_emulator import PortalEmulator
+    from config import ProductionConfig, config
+    from app import create_app
+    
+    emulator = PortalEmulator()
+    overrides = dict(emulator.ports(), MOCK_MODE=False, PORTALS='', LOG_LEVEL='WARNING',
+                     DATA_FILE=os.path.join(workdir, 'pipeline.json'))
+    config['benchmark'] = type('BenchmarkConfig', (ProductionConfig,), overrides)
+    log("starting app on emulated devices")
+    return create_app('benchmark'), emulator
+
+
+def bench_latency(emulator, samples: int) -> dict:
+    """Tag read written to the port -> record persisted, one crossing at a time"""
+    from app.services.tracking_service import tracking_service
+    
+    inside, rfid, outside = (emulator.devices[name] for name in ('inside', 'rfid', 'outside'))
+    latencies = []
+    missed = 0
+    for i in range(samples):
+        expected = tracking_service.status.total_records + 1
+        inside.write(b'presence detected\r\n')
+        time.sleep(0.05)
+        written = time.perf_counter()
+        rfid.write(f"E2000012345678EE{i:08X}\r\n".encode())
+        time.sleep(0.05)
+        outside.write(b'presence detected\r\n')
+        
+        deadline = written + 10
+        while tracking_service.status.total_records < expected and time.perf_counter() < deadline:
+            time.sleep(0.001)
+        if tracking_service.status.total_records >= expected:
+            latencies.append(time.perf_counter() - written)
+        else:
+            missed += 1
+        time.sleep(0.2)
+    return dict(summarize(latencies), missed=missed)
+
+
+def bench_http(app, size: int, clients: int, duration: float) -> dict:
+    """Concurrent clients polling the dashboard endpoints over real HTTP"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    from app.services.tracking_service import tracking_service
+    
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+    
+    tracking_service.replace_records(synthetic_records(size))
+    
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    paths = ['/api/status', '/api/records?limit=50', '/api/statistics']
+    latencies: Dict[str, List[float]] = {path: [] for path in paths}
+    errors = [0]
+    stop = time.perf_counter() + duration
+    
+    def client(offset: int):
+        n = offset
+        while time.perf_counter() < stop:
+            path = paths[n % len(paths)]
+            n += 1
+            request = urllib.request.Request(base + path, headers={'Accept-Encoding': 'gzip'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    response.read()
+                latencies[path].append(time.perf_counter() - start)
+            except Exception:
+                errors[0] += 1
+    
+    log(f"http: {clients} clients, {size} records, {duration}s")
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    
+    everything = [s for samples in latencies.values() for s in samples]
+    return {
+        'size': size,
+        'clients': clients,
+        'requests_per_s': round(len(everything) / duration, 2),
+        'errors': errors[0],
+        'all': summarize(everything),
+        'endpoints': {path: summarize(samples) for path, samples in latencies.items()}
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', action='append', choices=SUITES, help='Suites to run (default all)')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='Store sizes')
+    parser.add_argument('--budget', type=float, default=2.0, help='Seconds per store measurement')
+    parser.add_argument('--save-interval', type=float, default=1.0, help='Store suite SAVE_INTERVAL (0 = save on every add)')
+    parser.add_argument('--latency-samples', type=int, default=20)
+    parser.add_argument('--http-size', type=int, default=10000, help='Records in the store while polling')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of HTTP polling')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+    suites = args.suite or list(SUITES)
+    
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': importlib.util.find_spec('numpy') is not None,  # analytics backend
+            'suites': suites,
+            'save_interval': args.save_interval
+        }
+    }
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        # Keep stdout for the results (the app logs every record at INFO)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if 'store' in suites:
+                results['store'] = bench_store([int(s) for s in args.sizes.split(',')], args.budget, workdir,
+                                               args.save_interval)
+            
+            if 'latency' in suites or 'http' in suites:
+                app, emulator = start_app(workdir)
+                if 'latency' in suites:
+                    log(f"latency: {args.latency_samples} crossings")
+                    results['latency'] = bench_latency(emulator, args.latency_samples)
+                    results['latency']['settle_time_s'] = app.config['DIRECTION_SETTLE_TIME']
+                if 'http' in suites:
+                    results['http'] = bench_http(app, args.http_size, args.clients, args.duration)
+                from app.services.portal_service import portal_registry
+                portal_registry.shutdown()
+                emulator.close()
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
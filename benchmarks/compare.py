@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Compare two bench_pipeline result files and flag regressions
+
+    python -m benchmarks.compare results/base.json results/HEAD.json --threshold 10
+
+Exits 1 when any metric moved the wrong way by more than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+from typing import Dict
+
+# Metrics where bigger is better; every other *_ms metric is a latency
+HIGHER_IS_BETTER = ('ops_per_s', 'requests_per_s')
+IGNORED = ('n', 'size', 'clients', 'errors', 'missed', 'settle_time_s')
+
+
+def flatten(results: dict, prefix: str = '') -> Dict[str, float]:
+    """Numeric metrics keyed by path; store entries are keyed by size"""
+    metrics = {}
+    for key, value in results.items():
+        if key == 'meta':
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, path + '.'))
+        elif isinstance(value, list):
+            for position, item in enumerate(value):
+                label = item.get('size', position)
+                metrics.update(flatten({k: v for k, v in item.items() if k != 'size'}, f"{path}[{label}]."))
+        elif isinstance(value, (int, float)) and key not in IGNORED:
+            metrics[path] = float(value)
+    return metrics
+
+
+def change(metric: str, base: float, head: float) -> float:
+    """Percent change, positive meaning worse"""
+    if base == 0:
+        return 0.0
+    delta = (head - base) / base * 100
+    return -delta if metric.endswith(HIGHER_IS_BETTER) else delta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Percent change treated as a regression')
+    parser.add_argument('--json', action='store_true', help='Print the comparison as JSON')
+    args = parser.parse_args(argv)
+    
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    
+    base_metrics, head_metrics = flatten(base), flatten(head)
+    rows = []
+    for metric in sorted(set(base_metrics) & set(head_metrics)):
+        worse = change(metric, base_metrics[metric], head_metrics[metric])
+        rows.append({'metric': metric, 'base': base_metrics[metric], 'head': head_metrics[metric],
+                     'worse_pct': round(worse, 1), 'regression': worse > args.threshold})
+    regressions = [row for row in rows if row['regression']]
+    
+    if args.json:
+        print(json.dumps({'base': base.get('meta', {}).get('commit'), 'head': head.get('meta', {}).get('commit'),
+                          'threshold': args.threshold, 'metrics': rows}, indent=2))
+    else:
+        print(f"{base.get('meta', {}).get('commit', args.base)} -> {head.get('meta', {}).get('commit', args.head)}")
+        print(f"{'metric':<60} {'base':>12} {'head':>12} {'worse':>9}")
+        for row in rows:
+            flag = '  REGRESSION' if row['regression'] else ''
+            print(f"{row['metric']:<60} {row['base']:>12.3f} {row['head']:>12.3f} {row['worse_pct']:>+8.1f}%{flag}")
+        print(f"{len(regressions)} regression(s) over {args.threshold}%")
+    
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
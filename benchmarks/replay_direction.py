@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Replay harness for direction inference: accuracy and per-event CPU cost
+
+'pipeline' runs the per-portal correlator, so early reads are buffered
+until a sensor fires and repeat reads of one crossing are deduplicated.
+
+    python -m benchmarks.replay_direction --generate 1000
+    python -m benchmarks.replay_direction --trace captures/door1.ndjson --settle 1.0
+"""
+import argparse
+import heapq
+import json
+import sys
+import time
+from collections import deque
+from app.services.correlation import TagCorrelator
+from app.services.direction_engine import DirectionEngine
+from app.services.traces import generate_trace, load_trace
+
+
+class LegacyDirection:
+    """The original rule: deque(maxlen=10) per sensor, latest-detection comparison"""
+    
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self.detections = {'inside': deque(maxlen=10), 'outside': deque(maxlen=10)}
+    
+    def add_detection(self, location: str, timestamp: float):
+        self.detections[location].append(timestamp)
+    
+    def infer(self, now: float):
+        inside = any(now - t < self.timeout for t in self.detections['inside'])
+        outside = any(now - t < self.timeout for t in self.detections['outside'])
+        if inside and not outside:
+            return 'OUT', 1.0
+        if outside and not inside:
+            return 'IN', 1.0
+        if inside and outside:
+            inside_time = max(self.detections['inside'])
+            outside_time = max(self.detections['outside'])
+            return ('OUT' if inside_time > outside_time else 'IN'), 1.0
+        return None, 0.0
+
+
+def replay(events, model, settle: float = 0.0) -> dict:
+    """Replay a trace through a model, evaluating each tag read settle seconds after it"""
+    pending = []  # heap of (eval_time, seq, event)
+    results = {'reads': 0, 'correct': 0, 'wrong': 0, 'undecided': 0, 'confidence_sum': 0.0}
+    cpu_ns = 0
+    
+    def evaluate(event):
+        nonlocal cpu_ns
+        start = time.process_time_ns()
+        direction, confidence = model.infer(event['t'])
+        cpu_ns += time.process_time_ns() - start
+        
+        results['reads'] += 1
+        if direction is None:
+            results['undecided'] += 1
+        elif direction == event['truth']:
+            results['correct'] += 1
+            results['confidence_sum'] += confidence
+        else:
+            results['wrong'] += 1
+            results['confidence_sum'] += confidence
+    
+    for seq, event in enumerate(events):
+        while pending and pending[0][0] <= event['t']:
+            evaluate(heapq.heappop(pending)[2])
+        
+        if event['type'] == 'tag':
+            heapq.heappush(pending, (event['t'] + settle, seq, event))
+        else:
+            start = time.process_time_ns()
+            model.add_detection(event['type'], event['t'])
+            cpu_ns += time.process_time_ns() - start
+    
+    while pending:
+        evaluate(heapq.heappop(pending)[2])
+    
+    decided = results['correct'] + results['wrong']
+    return {
+        'reads': results['reads'],
+        'accuracy': round(results['correct'] / results['reads'], 4) if results['reads'] else None,
+        'precision': round(results['correct'] / decided, 4) if decided else None,
+        'undecided': results['undecided'],
+        'mean_confidence': round(results['confidence_sum'] / decided, 4) if decided else None,
+        'cpu_us_per_event': round(cpu_ns / 1000 / max(len(events), 1), 3)
+    }
+
+
+def replay_pipeline(events, settle: float = 1.0, timeout: float = 5.0, sigma: float = 1.0,
+                    pending_expiry: float = 2.0, dedup_window: float = 3.0) -> dict:
+    """Replay a trace through the full per-portal correlator (pending buffer + dedup)"""
+    engine = DirectionEngine(window=timeout, sigma=sigma)
+    truth = {}  # (tag, read_time) -> direction
+    outcome = {'correct': 0, 'wrong': 0}
+    
+    def on_record(tag_id, direction, read_time, confidence):
+        outcome['correct' if truth[(tag_id, read_time)] == direction else 'wrong'] += 1
+    
+    correlator = TagCorrelator(engine, on_record, timeout, settle, pending_expiry, dedup_window)
+    cpu_start = time.process_time_ns()
+    for event in events:
+        correlator.poll(event['t'])
+        if event['type'] == 'tag':
+            truth[(event['tag'], event['t'])] = event['truth']
+            correlator.on_tag(event['tag'], event['t'])
+        else:
+            engine.add_detection(event['type'], event['t'])
+            correlator.on_detection(event['type'], event['t'])
+    correlator.flush()
+    cpu_ns = time.process_time_ns() - cpu_start
+    
+    recorded = outcome['correct'] + outcome['wrong']
+    return {
+        **correlator.stats,
+        'precision': round(outcome['correct'] / recorded, 4) if recorded else None,
+        'cpu_us_per_event': round(cpu_ns / 1000 / max(len(events), 1), 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trace', help='NDJSON trace file to replay')
+    parser.add_argument('--generate', type=int, default=500, help='Crossings in a synthetic trace')
+    parser.add_argument('--crossing-prob', type=float, default=0.1, help='Chance of two people crossing paths')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--settle', type=float, default=0.0, help='Seconds after a read before deciding')
+    parser.add_argument('--timeout', type=float, default=5.0, help='HUMAN_DETECTION_TIMEOUT')
+    parser.add_argument('--sigma', type=float, default=1.0, help='DIRECTION_SIGMA')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+    
+    if args.trace:
+        events = load_trace(args.trace)
+    else:
+        events = generate_trace(args.generate, seed=args.seed, crossing_prob=args.crossing_prob)
+    
+    results = {
+        'trace': args.trace or f'synthetic:{args.generate}:{args.seed}',
+        'events': len(events),
+        'settle': args.settle,
+        'legacy': replay(events, LegacyDirection(args.timeout), args.settle),
+        'engine': replay(events, DirectionEngine(window=args.timeout, sigma=args.sigma), args.settle),
+        'pipeline': replay_pipeline(events, args.settle, args.timeout, args.sigma)
+    }
+    
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Closed-loop replay of read power: fixed dBm settings against the adaptive power tuner
+
+Crossings and sensor detections are generated once per seed. Tag reads are
+generated per segment from a simple RF model at whatever power is in effect,
+so the tuner's decisions change what the correlator sees next:
+    field depth   0.3 m at 10 dBm, x10 per +20 dBm (free-space range)
+    carried tags  read at READ_RATE while within the field (walkers and faster carts)
+    parked tags   read at PARKED_READ_RATE whenever the field reaches them, person or not
+
+    python -m benchmarks.replay_power --crossings 1000
+    python -m benchmarks.replay_power --powers 12,20,30 --start-power 30 --output results/power.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Dict, List, Sequence
+from app.services.correlation import TagCorrelator
+from app.services.direction_engine import DirectionEngine
+from app.services.power_tuner import PowerTuner
+from app.services.traces import SAMPLE_TAG_PREFIX, _zone_detections
+
+READ_RATE = 4.0  # reads/s of a carried tag inside the field
+PARKED_READ_RATE = 1.0  # reads/s of a parked tag inside the field
+WALK_SPEED = (1.0, 1.5)  # m/s
+CART_SPEED = (2.0, 3.0)  # m/s
+
+
+def field_depth(power: float) -> float:
+    """Read range in metres"""
+    return 0.3 * 10 ** ((power - 10) / 20)
+
+
+def poisson_times(rng: random.Random, start: float, end: float, rate: float) -> List[float]:
+    """Event times of a Poisson process on [start, end)"""
+    times = []
+    t = start + rng.expovariate(rate)
+    while t < end:
+        times.append(t)
+        t += rng.expovariate(rate)
+    return times
+
+
+def plan_crossings(count: int, seed: int, gap: float, cart_share: float, tags: int,
+                   noise_rate: float = 0.02) -> Dict[str, list]:
+    """Power-independent part of the scenario: who crosses when, and what the sensors see"""
+    rng = random.Random(seed)
+    tag_ids = [f"{SAMPLE_TAG_PREFIX}{i:08X}" for i in range(tags)]
+    crossings, detections = [], []
+    t = 10.0
+    for _ in range(count):
+        direction = rng.choice(['IN', 'OUT'])
+        before, after = ('inside', 'outside') if direction == 'OUT' else ('outside', 'inside')
+        cart = rng.random() < cart_share
+        crossings.append({'t': t, 'direction': direction, 'tag': rng.choice(tag_ids),
+                          'speed': rng.uniform(*(CART_SPEED if cart else WALK_SPEED))})
+        detections += _zone_detections(before, t - rng.uniform(0.8, 2.0), t, rng, 10.0, 0.85)
+        detections += _zone_detections(after, t, t + rng.uniform(0.8, 2.0), rng, 10.0, 0.85)
+        t += rng.uniform(gap * 0.5, gap * 1.5)
+    for _ in range(int((t - 10.0) * noise_rate)):
+        detections.append({'t': round(rng.uniform(10.0, t), 4), 'type': rng.choice(['inside', 'outside'])})
+    detections.sort(key=lambda e: e['t'])
+    return {'crossings': crossings, 'detections': detections, 'end': t}
+
+
+class SimulatedReader:
+    """Just enough of RFIDReader for the tuner"""
+    
+    def __init__(self, power: int):
+        self.portal_id = 'replay'
+        self.read_power = power
+        self.changes = 0
+    
+    def configure_power(self, power_dbm: int):
+        self.read_power = power_dbm
+        self.changes += 1
+
+
+def simulate(plan: dict, power: int, adaptive: bool = False, parked: Sequence[float] = (1.2, 2.0, 3.0),
+             seed: int = 1, settle: float = 1.0, **tuner_settings) -> dict:
+    """Run the plan through the correlator at a fixed power, or with the tuner in the loop"""
+    rng = random.Random(seed + 1)
+    reader = SimulatedReader(power)
+    tuner = PowerTuner(reader, **tuner_settings) if adaptive else None
+    engine = DirectionEngine()
+    crossings, detections = plan['crossings'], plan['detections']
+    truth = {}  # (tag, read_time) -> crossing index
+    outcome = {'captured': set(), 'correct': 0, 'wrong': 0, 'false_records': 0}
+    
+    def on_record(tag_id, direction, read_time, confidence):
+        index = truth.get((tag_id, read_time))
+        if index is None:
+            outcome['false_records'] += 1
+            return
+        outcome['captured'].add(index)
+        outcome['correct' if crossings[index]['direction'] == direction else 'wrong'] += 1
+    
+    correlator = TagCorrelator(engine, on_record, settle_time=settle)
+    parked_tags = [(f'PARKED{i}', distance) for i, distance in enumerate(parked)]
+    carried_reads = 0
+    power_time = mw_time = 0.0
+    cpu_ns = 0
+    d = 0
+    start = 0.0
+    for i, crossing in enumerate(crossings):
+        end = (crossing['t'] + crossings[i + 1]['t']) / 2 if i + 1 < len(crossings) else plan['end']
+        if i == 0:
+            start = crossing['t'] - 5.0
+        depth = field_depth(reader.read_power)
+        events = []
+        half = depth / crossing['speed']
+        for t in poisson_times(rng, max(crossing['t'] - half, start), min(crossing['t'] + half, end), READ_RATE):
+            truth[(crossing['tag'], t)] = i
+            events.append({'t': t, 'type': 'tag', 'tag': crossing['tag']})
+        carried_reads += len(events)
+        for tag_id, distance in parked_tags:
+            if depth >= distance:
+                events += [{'t': t, 'type': 'tag', 'tag': tag_id}
+                           for t in poisson_times(rng, start, end, PARKED_READ_RATE)]
+        while d < len(detections) and detections[d]['t'] < end:
+            events.append(detections[d])
+            d += 1
+        events.sort(key=lambda e: e['t'])
+        
+        cpu_start = time.process_time_ns()
+        for event in events:
+            correlator.poll(event['t'])
+            if event['type'] == 'tag':
+                correlator.on_tag(event['tag'], event['t'])
+            else:
+                engine.add_detection(event['type'], event['t'])
+                correlator.on_detection(event['type'], event['t'])
+        correlator.poll(end)
+        if tuner:
+            tuner.observe(correlator.stats, end)
+        cpu_ns += time.process_time_ns() - cpu_start
+        
+        power_time += reader.read_power * (end - start)  # power in effect for the segment just replayed
+        mw_time += 10 ** (reader.read_power / 10) * (end - start)
+        start = end
+    correlator.flush()
+    
+    duration = plan['end'] - (crossings[0]['t'] - 5.0)
+    decided = outcome['correct'] + outcome['wrong']
+    return {
+        'power': 'adaptive' if adaptive else power,
+        'final_power': reader.read_power,
+        'power_changes': reader.changes,
+        'mean_power_dbm': round(power_time / duration, 2),
+        'mean_rf_mw': round(mw_time / duration, 1),
+        'crossings': len(crossings),
+        'capture_rate': round(len(outcome['captured']) / len(crossings), 4),
+        'missed': len(crossings) - len(outcome['captured']),
+        'false_records': outcome['false_records'],
+        'precision': round(outcome['correct'] / decided, 4) if decided else None,
+        'reads': correlator.stats['reads'],
+        'reads_per_crossing': round(carried_reads / len(crossings), 2),
+        'stray_reads': correlator.stats['ignored'],
+        'cpu_us_per_crossing': round(cpu_ns / 1000 / len(crossings), 2)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--crossings', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--gap', type=float, default=10.0, help='Mean seconds between crossings')
+    parser.add_argument('--cart-share', type=float, default=0.3, help='Share of fast crossings (carts)')
+    parser.add_argument('--tags', type=int, default=50)
+    parser.add_argument('--parked', default='1.2,2.0,3.0', help='Distances (m) of tags parked near the door')
+    parser.add_argument('--powers', default='10,16,20,26,30', help='Fixed dBm settings to compare')
+    parser.add_argument('--start-power', type=int, default=26, help='RFID_READ_POWER the tuner starts from')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+    
+    plan = plan_crossings(args.crossings, args.seed, args.gap, args.cart_share, args.tags)
+    parked = [float(d) for d in args.parked.split(',') if d]
+    runs = [simulate(plan, int(p), parked=parked, seed=args.seed) for p in args.powers.split(',')]
+    runs.append(simulate(plan, args.start_power, adaptive=True, parked=parked, seed=args.seed))
+    
+    results = {
+        'scenario': f'synthetic:{args.crossings}:{args.seed}',
+        'cart_share': args.cart_share,
+        'parked': parked,
+        'runs': runs
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,8 +19,24 @@ class Config:
     SENSOR_INSIDE_PORT = os.getenv('SENSOR_INSIDE_PORT', '/dev/ttyUSB1')
     SENSOR_OUTSIDE_PORT = os.getenv('SENSOR_OUTSIDE_PORT', '/dev/ttyUSB2')
     
+    # Portal Topology (one RFID reader + inside/outside sensor pair per door)
+    # Format: "door1:/dev/ttyUSB0,/dev/ttyUSB1,/dev/ttyUSB2;door2:/dev/ttyUSB3,/dev/ttyUSB4,/dev/ttyUSB5"
+    # Empty means a single portal on the ports above
+    PORTALS = os.getenv('PORTALS', '')
+    DEFAULT_PORTAL_ID = os.getenv('DEFAULT_PORTAL_ID', 'main')
+    
+    # Device Acquisition
+    # 'thread': device threads run in the web process; 'process': a separate process owns the devices
+    ACQUISITION_MODE = os.getenv('ACQUISITION_MODE', 'thread')
+    ACQUISITION_RING_SLOTS = int(os.getenv('ACQUISITION_RING_SLOTS', '8192'))  # events buffered for the web process
+    ACQUISITION_POLL_INTERVAL = float(os.getenv('ACQUISITION_POLL_INTERVAL', '0.02'))  # seconds, ring drain interval
+    ACQUISITION_CPUS = os.getenv('ACQUISITION_CPUS', '')  # e.g. "2,3" pins the acquisition process, empty = any
+    
     # Serial Configuration
     BAUD_RATE = int(os.getenv('BAUD_RATE', '115200'))
+    # Power/range commands are queued per device and written by its monitor thread
+    DEVICE_ACK_TIMEOUT = float(os.getenv('DEVICE_ACK_TIMEOUT', '0'))  # seconds to wait for OK/ERROR, 0 = firmware does not answer
+    DEVICE_COMMAND_TIMEOUT = float(os.getenv('DEVICE_COMMAND_TIMEOUT', '3.0'))  # seconds the config routes wait for a setting
     
     # RFID Configuration
     RFID_READ_POWER = int(os.getenv('RFID_READ_POWER', '26'))
@@ -32,9 +48,74 @@ class Config:
     SENSOR_RANGE_MIN = int(os.getenv('SENSOR_RANGE_MIN', '1'))
     SENSOR_RANGE_MAX = int(os.getenv('SENSOR_RANGE_MAX', '10'))
     HUMAN_DETECTION_TIMEOUT = int(os.getenv('HUMAN_DETECTION_TIMEOUT', '5'))
+    SENSOR_PROTOCOL = os.getenv('SENSOR_PROTOCOL', 'text')  # 'text' lines or 'binary' report frames
+    SENSOR_PRESENCE_THRESHOLD = int(os.getenv('SENSOR_PRESENCE_THRESHOLD', '0'))  # min gate energy, 0 = sensor flag
+    
+    # Direction Inference
+    DIRECTION_SIGMA = float(os.getenv('DIRECTION_SIGMA', '1.0'))  # seconds, kernel width around a tag read
+    DIRECTION_MIN_CONFIDENCE = float(os.getenv('DIRECTION_MIN_CONFIDENCE', '0.5'))  # 0.5-1.0
+    DIRECTION_SETTLE_TIME = float(os.getenv('DIRECTION_SETTLE_TIME', '1.0'))  # seconds to wait after a read
+    PENDING_READ_EXPIRY = float(os.getenv('PENDING_READ_EXPIRY', '2.0'))  # seconds a read waits for a sensor
+    TAG_DEDUP_WINDOW = float(os.getenv('TAG_DEDUP_WINDOW', '3.0'))  # seconds, repeat reads of one crossing
+    
+    # Inventory Scheduling (reader polls slowly at low power until a sensor fires)
+    INVENTORY_SCHEDULING = os.getenv('INVENTORY_SCHEDULING', 'True') == 'True'  # False = fixed 10Hz polling
+    INVENTORY_ACTIVE_WINDOW = float(os.getenv('INVENTORY_ACTIVE_WINDOW', '3.0'))  # seconds after the last detection
+    INVENTORY_ACTIVE_INTERVAL = float(os.getenv('INVENTORY_ACTIVE_INTERVAL', '0.02'))  # seconds between polls (50Hz)
+    INVENTORY_IDLE_INTERVAL = float(os.getenv('INVENTORY_IDLE_INTERVAL', '0.5'))  # seconds between polls (2Hz)
+    INVENTORY_IDLE_POWER = int(os.getenv('INVENTORY_IDLE_POWER', '10'))  # dBm while idle, 0 = keep RFID_READ_POWER
+    
+    # Adaptive Power (tunes read power within RFID_POWER_MIN/MAX from observed reads)
+    POWER_TUNING = os.getenv('POWER_TUNING', 'False') == 'True'
+    POWER_TUNING_STEP = int(os.getenv('POWER_TUNING_STEP', '2'))  # dBm per adjustment
+    POWER_TUNING_READS_MIN = float(os.getenv('POWER_TUNING_READS_MIN', '3'))  # reads per crossing, below = power up
+    POWER_TUNING_READS_MAX = float(os.getenv('POWER_TUNING_READS_MAX', '6'))  # reads per crossing, above = power down
+    POWER_TUNING_MAX_STRAY = float(os.getenv('POWER_TUNING_MAX_STRAY', '0.2'))  # share of reads with nobody at the door
+    POWER_TUNING_CROSSINGS = int(os.getenv('POWER_TUNING_CROSSINGS', '10'))  # crossings per evaluation
     
     # Data Storage
     DATA_FILE = os.getenv('DATA_FILE', 'data/tag_tracking.json')
+    SAVE_INTERVAL = float(os.getenv('SAVE_INTERVAL', '1.0'))  # seconds between background saves, 0 = every write
+    TAG_BATCH_MAX = int(os.getenv('TAG_BATCH_MAX', '5000'))  # tags per /api/tags/state request
+    PRESENCE_CHECKPOINT_RECORDS = int(os.getenv('PRESENCE_CHECKPOINT_RECORDS', '20000'))  # records between /api/presence checkpoints
+    
+    # Asset Registry
+    ASSETS_FILE = os.getenv('ASSETS_FILE', 'data/assets.json')  # EPC -> name, category, owner
+    ASSET_ALLOWLIST = os.getenv('ASSET_ALLOWLIST', 'False') == 'True'  # drop reads of unregistered tags
+    
+    # Upstream Sync (empty SYNC_URL disables)
+    SYNC_URL = os.getenv('SYNC_URL', '')  # e.g. https://fleet.example.com/api/ingest
+    SYNC_TOKEN = os.getenv('SYNC_TOKEN', '')  # sent as a bearer token
+    DEVICE_ID = os.getenv('DEVICE_ID', '')  # empty = hostname
+    SYNC_BATCH_SIZE = int(os.getenv('SYNC_BATCH_SIZE', '500'))  # records per upload
+    SYNC_INTERVAL = float(os.getenv('SYNC_INTERVAL', '5.0'))  # seconds between polls once caught up
+    SYNC_TIMEOUT = float(os.getenv('SYNC_TIMEOUT', '10.0'))  # seconds per upload
+    SYNC_BACKOFF_MAX = float(os.getenv('SYNC_BACKOFF_MAX', '300.0'))  # seconds, retry delay cap
+    SYNC_STATE_FILE = os.getenv('SYNC_STATE_FILE', 'data/sync_state.json')  # acknowledged offset
+    
+    # Response Compression
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))  # bytes
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', '6'))  # gzip 1-9
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '4'))  # brotli 0-11
+    COMPRESSION_CACHE_SIZE = int(os.getenv('COMPRESSION_CACHE_SIZE', '16'))  # entries
+    COMPRESSION_CACHE_MAX_BYTES = int(os.getenv('COMPRESSION_CACHE_MAX_BYTES', '4194304'))
+    RECORDS_STREAM_THRESHOLD = int(os.getenv('RECORDS_STREAM_THRESHOLD', '1000'))  # records
+    
+    # Monitoring
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'  # GET /metrics
+    
+    # Logging
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # DEBUG shows every simulated detection
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # 'text' or 'json' (one object per line)
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # records; dropped beyond this, never blocks
+    LOG_RATE_LIMIT_WINDOW = float(os.getenv('LOG_RATE_LIMIT_WINDOW', '10.0'))  # seconds
+    LOG_RATE_LIMIT_BURST = int(os.getenv('LOG_RATE_LIMIT_BURST', '5'))  # repeats of one message per window, 0 = off
+    
+    # Profiling (opt-in)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'  # Server-Timing headers
+    PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')  # required by /api/debug/profile, empty = disabled
+    PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '60'))
 
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,34 @@
+"""
+Shared fixtures for tests that run the Flask app
+"""
+import os
+import tempfile
+import unittest
+from app import create_app
+from app.services.tracking_service import tracking_service
+from config import config, ProductionConfig
+
+
+class AppTestCase(unittest.TestCase):
+    """Mock-mode app with its records file in a temporary directory"""
+    
+    def settings(self) -> dict:
+        """Config overrides for this test case"""
+        return {}
+    
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.config_name = f'test-{type(self).__name__}'
+        config[self.config_name] = type(f'{type(self).__name__}Config', (ProductionConfig,), {
+            'MOCK_MODE': True, 'LOG_LEVEL': 'WARNING', 'DATA_FILE': self.path('records.json'), **self.settings()
+        })
+        self.client = create_app(self.config_name).test_client()
+    
+    def tearDown(self):
+        tracking_service.stop_flusher()
+        del config[self.config_name]
+        self.workdir.cleanup()
+    
+    def path(self, name: str) -> str:
+        """A file in the temporary directory"""
+        return os.path.join(self.workdir.name, name)
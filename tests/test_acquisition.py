@@ -0,0 +1,103 @@
+import os
+import subprocess
+import sys
+import time
+import unittest
+from multiprocessing import shared_memory
+from app import create_app
+from app.services.acquisition import EventRing, KIND_RECORD, KIND_STATUS, acquisition
+from app.services.tracking_service import tracking_service
+from config import config, ProductionConfig
+
+PRODUCER = """
+import sys
+from app.services.acquisition import EventRing
+ring = EventRing.attach(sys.argv[1])
+for i in range(int(sys.argv[2])):
+    ring.publish_record(f'TAG{i}', 'OUT' if i % 2 else 'IN', 'dock', 1000.0 + i, 0.9 if i % 3 else None)
+ring.close()
+"""
+
+
+def wait_until(check, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if check():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestEventRing(unittest.TestCase):
+    """Test cases for the shared-memory event ring"""
+    
+    def setUp(self):
+        self.ring = EventRing.create(8)
+    
+    def tearDown(self):
+        self.ring.close()
+    
+    def test_wraps_and_drops_when_full(self):
+        """Test events survive wrap-around and a full ring drops instead of blocking"""
+        reader = EventRing(shared_memory.SharedMemory(name=self.ring.name), owner=False)
+        for i in range(6):
+            self.ring.publish_record(f'TAG{i}', 'IN', 'main', float(i), 0.75)
+        self.assertEqual([e[1] for e in reader.consume()], [f'TAG{i}' for i in range(6)])
+        
+        for i in range(6, 16):
+            self.ring.publish(KIND_STATUS, f'rfid_reader=state{i}')
+        self.assertEqual(self.ring.dropped(), 2)
+        events = reader.consume()
+        self.assertEqual(len(events), 8)
+        self.assertEqual(events[0], (KIND_STATUS, 'rfid_reader=state6', '', 0.0, None, None))
+        self.assertFalse(self.ring.publish(KIND_RECORD, 'E' * 65))
+        reader.memory.close()
+    
+    def test_other_process_publishes(self):
+        """Test records written by another process arrive in order with their fields"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, '-c', PRODUCER, self.ring.name, '5'], cwd=root, check=True)
+        
+        events = self.ring.consume()
+        self.assertEqual([e[1] for e in events], ['TAG0', 'TAG1', 'TAG2', 'TAG3', 'TAG4'])
+        self.assertEqual(events[1], (KIND_RECORD, 'TAG1', 'dock', 1001.0, 0.9, 'OUT'))
+        self.assertIsNone(events[0][4])
+        self.assertEqual(self.ring.depth(), 0)
+
+
+class TestAcquisitionProcess(unittest.TestCase):
+    """Test cases for running the devices in a separate process"""
+    
+    def setUp(self):
+        """Mock devices in an acquisition process"""
+        config['acquisition'] = type('AcquisitionConfig', (ProductionConfig,), {
+            'ACQUISITION_MODE': 'process', 'MOCK_MODE': True, 'LOG_LEVEL': 'WARNING'
+        })
+        self.client = create_app('acquisition').test_client()
+    
+    def tearDown(self):
+        acquisition.stop()
+        del config['acquisition']
+    
+    def test_devices_run_in_other_process(self):
+        """Test portal status, configuration and device states come from the acquisition process"""
+        self.assertTrue(acquisition.running)
+        self.assertTrue(wait_until(lambda: self.client.get('/api/portals').status_code == 200))
+        portals = self.client.get('/api/portals').get_json()
+        self.assertEqual(portals['default_portal'], 'main')
+        
+        response = self.client.post('/api/config/sensor-range', json={'range': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/status').get_json()['config']['sensor_range'], 3)
+        response = self.client.post('/api/config/sensor-range', json={'range': 3, 'portal': 'nope'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.post('/api/config/rfid-power', json={'power': 20, 'portal': 'nope'}).status_code, 404)
+        self.assertTrue(wait_until(lambda: tracking_service.status.rfid_reader == 'connected (mock)'))
+        
+        process = acquisition.process
+        acquisition.stop()
+        self.assertIsNotNone(process.poll())
+
+
+if __name__ == '__main__':
+    unittest.main()
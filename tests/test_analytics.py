@@ -0,0 +1,142 @@
+import os
+import tempfile
+import unittest
+from app.services import analytics_service as analytics
+from app.services.analytics_service import AnalyticsError, AnalyticsService
+from app.services.tracking_service import TrackingService, tracking_service
+from tests.helpers import AppTestCase
+
+def sample_records():
+    """Three tags over two days, both portals"""
+    records = []
+    for i in range(60):
+        records.append({
+            'rfid_tag': f'TAG{i % 3}',
+            'direction': 'IN' if i % 4 else 'OUT',
+            'read_date': f'2024-06-0{1 + i // 40}-{8 + i // 10 % 4:02d}-{i % 60:02d}-00-{i:03d}',
+            'portal_id': 'main' if i % 2 else 'dock'
+        })
+    return records
+
+
+class TestAnalyticsService(unittest.TestCase):
+    """Test cases for group-by aggregates (NumPy and pure Python give the same answers)"""
+    
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.store = TrackingService()
+        self.store.data_file = os.path.join(self.workdir.name, 'records.json')
+        self.store.replace_records(sample_records())
+        self.numpy = analytics.np
+    
+    def tearDown(self):
+        analytics.np = self.numpy
+        self.workdir.cleanup()
+    
+    def backends(self):
+        """A fresh service per available backend (switches the module's NumPy on the way)"""
+        for np in ([self.numpy] if self.numpy is not None else []) + [None]:
+            analytics.np = np
+            yield AnalyticsService(self.store)
+    
+    def expected(self, key):
+        groups = {}
+        for record in self.store.records:
+            group = groups.setdefault(key(record), [0, 0])
+            group[0] += 1
+            group[1] += record['direction'] == 'IN'
+        return groups
+    
+    def test_group_by_tag_and_hour(self):
+        """Test counts and IN/OUT split per tag and hour match a plain loop"""
+        expected = self.expected(lambda r: (r['rfid_tag'], r['read_date'][:13]))
+        for service in self.backends():
+            rows = service.aggregate(['tag', 'hour'], sort='key')
+            self.assertEqual({(r['tag'], r['hour']): [r['count'], r['in']] for r in rows}, expected)
+            self.assertEqual(rows[0]['tag'], 'TAG0')
+            self.assertEqual(rows[0]['out'], rows[0]['count'] - rows[0]['in'])
+    
+    def test_time_keys_and_filters(self):
+        """Test calendar keys, windows and filters"""
+        for service in self.backends():
+            days = service.aggregate(['day', 'weekday'], sort='key')
+            self.assertEqual([(r['day'], r['weekday'], r['count']) for r in days],
+                             [('2024-06-01', 5, 40), ('2024-06-02', 6, 20)])
+            
+            busiest = service.aggregate(['window'], window=600, portal_id='main', direction='IN', limit=1)
+            self.assertEqual(busiest[0]['window'], '2024-06-01-08-00-00')
+            self.assertEqual(busiest[0]['in_ratio'], 1.0)
+            
+            rows = service.aggregate(['hour_of_day'], start_date='2024-06-01-10-00-00-000', tag='TAG1')
+            self.assertEqual(sum(r['count'] for r in rows), 13)
+            self.assertEqual(rows[0]['hour_of_day'], 8)
+            self.assertEqual(service.aggregate(['tag'], tag='NOPE'), [])
+    
+    def test_follows_store(self):
+        """Test new records are added to the columns and a cleared store starts over"""
+        for service in self.backends():
+            self.assertEqual(sum(r['count'] for r in service.aggregate(['portal'])), 60)
+            self.store.add_record('TAG9', 'IN', 'main', read_time=1717228800.0)
+            self.assertEqual(service.aggregate(['tag'], tag='TAG9')[0]['count'], 1)
+            self.store.replace_records(sample_records())
+        
+        self.store.clear_all_records()
+        self.assertEqual(service.aggregate(['direction']), [])
+        with self.assertRaises(AnalyticsError):
+            service.aggregate(['colour'])
+    
+    def test_wide_keys_agree(self):
+        """Test key sets too wide for one int64 and limits give the same answers on both backends"""
+        records = [{'rfid_tag': f'TAG{i % 5}', 'direction': 'IN' if i % 3 else 'OUT', 'portal_id': 'main',
+                    'read_date': f'{1990 + i % 30}-0{1 + i % 9}-{1 + i % 28:02d}-{i % 24:02d}-{i % 60:02d}-{i * 7 % 60:02d}-000'}
+                   for i in range(300)]
+        self.store.replace_records(records)
+        group_by = ['window', 'hour', 'day', 'weekday']  # ~9.5e8 * 2.6e5 * 1.1e4 * 7 combinations
+        answers = []
+        for service in self.backends():
+            answers.append((service.aggregate(group_by, window=1, sort='key'),
+                            service.aggregate(['tag', 'window'], window=1, limit=0),
+                            service.aggregate(['tag'], limit=2)))
+        self.assertEqual(answers[0], answers[-1])
+        rows, unlimited, top = answers[0]
+        self.assertEqual(rows[0]['window'], '1990-01-01-00-00-00')
+        self.assertEqual((len(rows), len(unlimited), len(top)), (300, 300, 2))
+        
+        with self.assertRaises(AnalyticsError):
+            service.aggregate(['window', 'window'])
+    
+    def test_dates_without_zero_padding(self):
+        """Test dates the validator accepts without zero padding land in the same buckets as padded ones"""
+        self.store.replace_records([
+            {'rfid_tag': 'TAG1', 'direction': 'IN', 'portal_id': 'main', 'read_date': '2024-6-1-8-5-3-250'},
+            {'rfid_tag': 'TAG1', 'direction': 'OUT', 'portal_id': 'main', 'read_date': '2024-06-01-08-05-03-250'}
+        ])
+        for service in self.backends():
+            self.assertEqual(service.columns.to_ms('2024-6-1-8-5-3-25'), service.columns.to_ms('2024-06-01-08-05-03-250'))
+            rows = service.aggregate(['window'], window=1, start_date='2024-6-1-8-5-3-0')
+            self.assertEqual([(r['window'], r['count']) for r in rows], [('2024-06-01-08-05-03', 2)])
+
+
+class TestAnalyticsEndpoint(AppTestCase):
+    """Test cases for /api/analytics"""
+    
+    def setUp(self):
+        super().setUp()
+        tracking_service.replace_records(sample_records())
+    
+    def test_analytics_endpoint(self):
+        """Test grouping, sorting and argument errors"""
+        data = self.client.get('/api/analytics?group_by=portal,direction&sort=count').get_json()
+        self.assertEqual(data['backend'], analytics.analytics_service.backend)
+        self.assertEqual(data['count'], 3)  # every OUT is on the dock portal
+        self.assertEqual(sum(row['count'] for row in data['data']), 60)
+        self.assertGreaterEqual(data['data'][0]['count'], data['data'][-1]['count'])
+        
+        self.assertEqual(self.client.get('/api/analytics?group_by=colour').status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics?start_date=today').status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics?window=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics?limit=x').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
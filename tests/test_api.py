@@ -1,6 +1,8 @@
 import unittest
 import json
+import gzip
 from app import create_app
+from tests.helpers import AppTestCase
 
 class TestAPI(unittest.TestCase):
     """Test cases for API endpoints"""
@@ -114,6 +116,109 @@ class TestAPI(unittest.TestCase):
         self.assertEqual(data['status'], 'success')
         self.assertEqual(data['tag_id'], 'TEST001')
 
+    def test_records_gzip_compression(self):
+        """Test records are gzip-compressed when the client accepts it"""
+        self.app.config['COMPRESSION_MIN_SIZE'] = 0
+        response = self.client.get('/api/records', headers={'Accept-Encoding': 'gzip'})
+        data = json.loads(gzip.decompress(response.data))
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(data['status'], 'success')
+    
+    def test_streamed_records_compression(self):
+        """Test chunked records output is compressed as a stream"""
+        self.app.config['RECORDS_STREAM_THRESHOLD'] = 0
+        self.client.post(
+            '/api/records',
+            data=json.dumps({'rfid_tag': 'TEST001', 'direction': 'IN'}),
+            content_type='application/json'
+        )
+        response = self.client.get('/api/records?limit=5', headers={'Accept-Encoding': 'gzip'})
+        data = json.loads(gzip.decompress(response.data))
+        
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(data['count'], len(data['data']))
+        
+        # Same data version: served from the compressed body cache
+        cached = self.client.get('/api/records?limit=5', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(cached.data, response.data)
+    
+    def test_no_compression_without_accept_encoding(self):
+        """Test identity response when the client does not accept compression"""
+        self.app.config['COMPRESSION_MIN_SIZE'] = 0
+        response = self.client.get('/api/records')
+        
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(json.loads(response.data)['status'], 'success')
+
+    def test_get_portals(self):
+        """Test portal registry endpoint"""
+        response = self.client.get('/api/portals')
+        data = json.loads(response.data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['count'], len(data['data']))
+        self.assertIn(data['default_portal'], [p['portal_id'] for p in data['data']])
+    
+    def test_metrics(self):
+        """Test Prometheus metrics endpoint"""
+        self.client.get('/api/statistics')
+        response = self.client.get('/metrics')
+        text = response.get_data(as_text=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        self.assertIn('tracking_records ', text)
+        self.assertIn('tracking_lock_wait_seconds_count{operation="load"}', text)
+        self.assertIn('# TYPE rfid_correlation_events_total counter', text)
+
+
+class TestRecordQueries(AppTestCase):
+    """Test cases for record queries, against a temporary records file"""
+    
+    def test_records_tagged_with_portal(self):
+        """Test records carry a portal ID and can be filtered by it"""
+        payload = {'rfid_tag': 'TEST001', 'direction': 'OUT'}
+        response = self.client.post(
+            '/api/records',
+            data=json.dumps(payload),
+            content_type='application/json'
+        )
+        portal_id = json.loads(response.data)['data']['portal_id']
+        
+        response = self.client.get(f'/api/records?portal={portal_id}&limit=1')
+        data = json.loads(response.data)
+        self.assertEqual(data['data'][0]['portal_id'], portal_id)
+        
+        response = self.client.get('/api/records?portal=no-such-portal')
+        self.assertEqual(json.loads(response.data)['count'], 0)
+    
+    def test_tag_states_batch(self):
+        """Test latest movement for many tags in one request"""
+        for tag, direction in (('BATCH001', 'OUT'), ('BATCH002', 'IN'), ('BATCH001', 'IN')):
+            self.client.post('/api/records', json={'rfid_tag': tag, 'direction': direction})
+        
+        response = self.client.post('/api/tags/state', json={'tags': ['BATCH001', 'BATCH002', 'NEVERSEEN']})
+        data = json.loads(response.data)
+        self.assertEqual(data['count'], 2)
+        self.assertEqual(data['data']['BATCH001']['last_direction'], 'IN')
+        self.assertEqual(data['data']['BATCH001']['out_count'], 1)
+        self.assertIsNone(data['data']['NEVERSEEN'])
+        
+        response = self.client.get('/api/tags/state?tags=BATCH002')
+        self.assertEqual(json.loads(response.data)['data']['BATCH002']['last_direction'], 'IN')
+        self.assertEqual(self.client.post('/api/tags/state', json={'tags': 'BATCH001'}).status_code, 400)
+    
+    def test_prefix_filter(self):
+        """Test records and statistics for an EPC prefix"""
+        for tag in ('PFXTEST0001', 'PFXTEST0002', 'PFXOTHER001'):
+            self.client.post('/api/records', json={'rfid_tag': tag, 'direction': 'IN'})
+        
+        data = json.loads(self.client.get('/api/records?prefix=PFXTEST').data)
+        self.assertEqual({r['rfid_tag'] for r in data['data']}, {'PFXTEST0001', 'PFXTEST0002'})
+        stats = json.loads(self.client.get('/api/statistics?prefix=PFXTEST').data)['data']
+        self.assertEqual(stats['unique_tags'], 2)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import unittest
+from app.cli import main as cli
+from app.services.asset_registry import AssetRegistry
+from app.services.portal_service import Portal
+from app.services.rfid_service_mock import RFIDReaderMock
+from app.services.sensor_service_mock import SensorManagerMock
+from app.services.tracking_service import tracking_service
+from tests.helpers import AppTestCase
+
+ASSETS_CSV = """epc,name,category,owner
+e2000000000000000000aa01,Drill,tools,Maintenance
+E2000000000000000000AA02,Laptop 7,it,
+xyz,Too short,,
+"""
+
+
+class TestAssetRegistry(unittest.TestCase):
+    """Test cases for the asset registry"""
+    
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.registry = AssetRegistry()
+        self.registry.assets_file = os.path.join(self.workdir.name, 'assets.json')
+    
+    def tearDown(self):
+        self.workdir.cleanup()
+    
+    def test_import_update_and_reload(self):
+        """Test CSV import, case-insensitive lookup, updates, replace and persistence"""
+        summary = self.registry.import_csv(ASSETS_CSV)
+        self.assertEqual((summary['added'], summary['updated'], summary['total']), (2, 0, 2))
+        self.assertEqual(summary['rejected'], [{'row': 2, 'message': 'epc must be at least 4 characters'}])
+        self.assertEqual(self.registry.get('E2000000000000000000AA01')['name'], 'Drill')
+        self.assertIsNone(self.registry.get('E2000000000000000000AA02')['owner'])
+        self.assertTrue(self.registry.is_known('e2000000000000000000aa02'))
+        
+        summary = self.registry.import_assets([{'epc': 'E2000000000000000000AA02', 'name': 'Laptop 8'}])
+        self.assertEqual((summary['added'], summary['updated']), (0, 1))
+        
+        reloaded = AssetRegistry()
+        reloaded.assets_file = self.registry.assets_file
+        reloaded.load()
+        self.assertEqual(reloaded.get('E2000000000000000000AA02')['name'], 'Laptop 8')
+        
+        summary = self.registry.import_assets([{'epc': 'E2000000000000000000AA03'}], replace=True)
+        self.assertEqual((summary['added'], summary['removed'], summary['total']), (1, 2, 1))
+        self.assertFalse(self.registry.remove('E2000000000000000000AA01'))
+    
+    def test_replace_is_all_or_nothing(self):
+        """Test a replace with a bad row keeps the registry, and CSV headers match in any case"""
+        self.registry.import_csv(ASSETS_CSV)
+        summary = self.registry.import_csv(ASSETS_CSV, replace=True)
+        self.assertFalse(summary['applied'])
+        self.assertEqual(summary['total'], 2)
+        self.assertFalse(self.registry.import_assets([], replace=True)['applied'])
+        
+        summary = self.registry.import_csv('EPC,Name\nE2000000000000000000AA09,Pallet\n', replace=True)
+        self.assertEqual((summary['applied'], summary['removed'], summary['total']), (True, 2, 1))
+        self.assertEqual(self.registry.get('E2000000000000000000AA09')['name'], 'Pallet')
+    
+    def test_enrich_does_not_touch_records(self):
+        """Test enrichment returns copies and marks unknown tags"""
+        self.registry.import_csv(ASSETS_CSV)
+        records = [{'rfid_tag': 'E2000000000000000000AA01'}, {'rfid_tag': 'STRAY'}]
+        enriched = self.registry.enrich(records)
+        self.assertEqual(enriched[0]['asset']['category'], 'tools')
+        self.assertIsNone(enriched[1]['asset'])
+        self.assertNotIn('asset', records[0])
+    
+    def test_cli_import(self):
+        """Test the offline import command"""
+        source = os.path.join(self.workdir.name, 'assets.csv')
+        with open(source, 'w') as f:
+            f.write(ASSETS_CSV)
+        self.assertEqual(cli(['import-assets', source, '--assets-file', self.registry.assets_file]), 1)
+        with open(self.registry.assets_file) as f:
+            self.assertEqual([a['name'] for a in json.load(f)], ['Drill', 'Laptop 7'])
+
+
+class TestAllowlist(unittest.TestCase):
+    """Test cases for dropping unregistered tags in the read path"""
+    
+    def test_unknown_tags_are_dropped(self):
+        """Test only registered tags reach the correlation queue"""
+        from app.services.asset_registry import asset_registry
+        portal = Portal('allow', RFIDReaderMock(None, 'allow'), SensorManagerMock(None, None, 'allow'))
+        saved = asset_registry.assets
+        asset_registry.assets = {'E2000000000000000000AA01': {'epc': 'E2000000000000000000AA01'}}
+        try:
+            portal.submit_tag('E2000000000000000000AA01', 1.0)
+            portal.submit_tag('GARBAGE', 1.0)
+            self.assertEqual(portal.events.qsize(), 2)
+            
+            portal.allowlist = True
+            portal.submit_tag('E2000000000000000000AA01', 2.0)
+            portal.submit_tag('GARBAGE', 2.0)
+            self.assertEqual(portal.events.qsize(), 3)
+            self.assertEqual(portal.get_status()['unknown_reads'], 1)
+        finally:
+            asset_registry.assets = saved
+
+
+class TestAssetEndpoints(AppTestCase):
+    """Test cases for the asset API and enriched responses"""
+    
+    def settings(self):
+        return {'ASSETS_FILE': self.path('assets.json')}
+    
+    def setUp(self):
+        super().setUp()
+        tracking_service.clear_all_records()
+    
+    def test_import_and_enrich(self):
+        """Test bulk import, lookup, enriched records/statistics and removal"""
+        response = self.client.post('/api/assets', data=ASSETS_CSV, content_type='text/csv')
+        self.assertEqual(response.get_json()['data']['added'], 2)
+        self.assertEqual(self.client.get('/api/assets').get_json()['count'], 2)
+        self.assertEqual(self.client.get('/api/assets/e2000000000000000000aa01').get_json()['data']['name'], 'Drill')
+        
+        tracking_service.add_record('E2000000000000000000AA01', 'OUT')
+        tracking_service.add_record('STRAYREAD', 'IN')
+        plain = self.client.get('/api/records').get_json()['data']
+        self.assertNotIn('asset', plain[0])
+        
+        records = self.client.get('/api/records?enrich=true', headers={'Accept-Encoding': 'gzip'}).get_json()['data']
+        assets = {r['rfid_tag']: r['asset'] for r in records}
+        self.assertEqual(assets['E2000000000000000000AA01']['owner'], 'Maintenance')
+        self.assertIsNone(assets['STRAYREAD'])
+        
+        top = self.client.get('/api/statistics?enrich=true').get_json()['data']['top_tags']
+        self.assertEqual({t['tag']: t['asset'] and t['asset']['name'] for t in top},
+                         {'E2000000000000000000AA01': 'Drill', 'STRAYREAD': None})
+        
+        self.client.post('/api/assets', json={'epc': 'STRAYREAD', 'name': 'Found it'})
+        records = self.client.get('/api/records?enrich=true', headers={'Accept-Encoding': 'gzip'}).get_json()['data']
+        self.assertIn('Found it', [r['asset'] and r['asset']['name'] for r in records])  # cache follows the registry
+        
+        self.assertEqual(self.client.delete('/api/assets/STRAYREAD').status_code, 200)
+        self.assertEqual(self.client.get('/api/assets/STRAYREAD').status_code, 404)
+        self.assertEqual(self.client.post('/api/assets', data='nope').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from app.services.correlation import TagCorrelator, PendingReadBuffer
+from app.services.direction_engine import DirectionEngine
+
+class TestCorrelation(unittest.TestCase):
+    """Test cases for the per-portal correlation pipeline"""
+    
+    def setUp(self):
+        """Create correlator with explicit clock"""
+        self.engine = DirectionEngine()
+        self.recorded = []
+        self.ignored = []
+        self.correlator = TagCorrelator(
+            self.engine,
+            lambda tag, direction, t, confidence: self.recorded.append((tag, direction, t)),
+            settle_time=1.0, pending_expiry=2.0, dedup_window=3.0,
+            on_ignored=lambda tag, t, reason: self.ignored.append((tag, reason))
+        )
+    
+    def detect(self, location: str, t: float):
+        """Feed a detection like the sensor manager does"""
+        self.engine.add_detection(location, t)
+        self.correlator.on_detection(location, t)
+    
+    def test_read_before_sensor_is_matched(self):
+        """Test a read buffered before any detection is recorded once sensors fire"""
+        self.correlator.on_tag('TAG1', 100.0)
+        self.assertEqual(len(self.correlator.pending), 1)
+        
+        self.detect('outside', 100.5)
+        self.detect('inside', 101.0)
+        self.correlator.poll(102.0)
+        
+        self.assertEqual(self.recorded, [('TAG1', 'IN', 100.0)])
+        self.assertEqual(self.correlator.stats['matched_late'], 1)
+    
+    def test_unmatched_read_expires(self):
+        """Test a read with no detection inside the expiry window is ignored"""
+        self.correlator.on_tag('TAG1', 100.0)
+        self.correlator.poll(102.5)
+        
+        self.assertEqual(self.recorded, [])
+        self.assertEqual(self.ignored, [('TAG1', 'no human detection')])
+    
+    def test_repeat_reads_deduplicated(self):
+        """Test repeat reads of one crossing produce a single record"""
+        self.detect('inside', 99.5)
+        for t in (100.0, 100.2, 100.4):
+            self.correlator.on_tag('TAG1', t)
+        self.detect('outside', 100.6)
+        self.correlator.poll(102.0)
+        
+        self.assertEqual(len(self.recorded), 1)
+        self.assertEqual(self.recorded[0][1], 'OUT')
+        self.assertEqual(self.correlator.stats['deduplicated'], 2)
+    
+    def test_pending_buffer_match_pops_expired(self):
+        """Test matching claims recent reads and expires old ones in one pass"""
+        buffer = PendingReadBuffer(expiry=2.0)
+        buffer.add('OLD', 95.0)
+        buffer.add('NEW', 99.5)
+        matched, expired = buffer.match(100.0)
+        
+        self.assertEqual(matched, [(99.5, 'NEW')])
+        self.assertEqual(expired, [(95.0, 'OLD')])
+        self.assertEqual(len(buffer), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import threading
+import time
+import unittest
+import serial
+from app.services.device_commands import DeviceCommandError, DeviceCommandQueue, DeviceCommandTimeout, wait_for
+from app.services.device_emulator import PortalEmulator, tag_burst
+from app.services.rfid_service import RFIDReader
+from tests.helpers import AppTestCase
+
+class TestDeviceCommandQueue(unittest.TestCase):
+    """Test cases for the per-device command queue"""
+    
+    def setUp(self):
+        self.queue = DeviceCommandQueue('test', ack_timeout=1.0)
+        self.written = []
+    
+    def write(self, key, value):
+        self.written.append((key, value))
+    
+    def test_coalesces_and_waits_for_ack(self):
+        """Test repeated settings become one write and every caller gets the final value"""
+        futures = [self.queue.submit('power', power) for power in (20, 22, 24)]
+        self.queue.process(self.write, now=0.0)
+        self.assertEqual(self.written, [('power', 24)])
+        self.assertFalse(futures[0].done())
+        
+        joined = self.queue.submit('power', 24)  # same value already in flight
+        later = self.queue.submit('power', 18)
+        self.queue.process(self.write, now=0.5)
+        self.assertEqual(len(self.written), 1)  # one command at a time
+        
+        self.assertFalse(self.queue.handle_reply('E200001234567890ABCD1234'))
+        self.assertTrue(self.queue.handle_reply('OK'))
+        self.assertEqual([f.result() for f in futures + [joined]], [24, 24, 24, 24])
+        
+        self.queue.process(self.write, now=0.6)
+        self.assertTrue(self.queue.handle_reply('ERROR 3'))
+        with self.assertRaises(DeviceCommandError):
+            later.result()
+    
+    def test_timeout_and_close(self):
+        """Test an unanswered command fails after ack_timeout and the next one is written"""
+        first = self.queue.submit('power', 20)
+        self.queue.process(self.write, now=0.0)
+        second = self.queue.submit('range', 3)
+        self.queue.process(self.write, now=1.5)
+        self.assertIsInstance(first.exception(), DeviceCommandTimeout)
+        self.assertEqual(self.written, [('power', 20), ('range', 3)])
+        
+        self.queue.close()
+        with self.assertRaises(DeviceCommandError):
+            wait_for([second], 0.1)
+
+
+class TestReaderCommands(unittest.TestCase):
+    """Test cases for power changes on a running reader"""
+    
+    def setUp(self):
+        """Real reader on an emulated port, waiting up to 1 s for acknowledgements"""
+        self.emulator = PortalEmulator(['rfid'])
+        self.device = self.emulator.devices['rfid']
+        self.reader = RFIDReader(portal_id='test')
+        self.reader.serial = serial.Serial(self.device.port, timeout=1)
+        self.reader.commands.ack_timeout = 1.0
+        self.tags = []
+        self.reader.on_tag = lambda tag_id, t: self.tags.append(tag_id)
+        self.thread = threading.Thread(target=self.reader.monitor_loop, daemon=True)
+    
+    def tearDown(self):
+        self.reader.stop()
+        self.thread.join(timeout=1)
+        self.emulator.close()
+    
+    def test_power_change_during_reads(self):
+        """Test a power change from another thread is written once, acknowledged, and no tag line is lost"""
+        chunks = tag_burst(200, rate=2000.0, tags=20)
+        self.emulator.play(chunks, speed=1.0)
+        futures = [self.reader.configure_power(power) for power in (20, 22)]
+        self.thread.start()
+        
+        deadline = time.time() + 2
+        while not self.device.commands and time.time() < deadline:
+            self.device.drain()
+            time.sleep(0.01)
+        self.assertEqual(b''.join(self.device.commands), b'AT+POWER=22\r\n')
+        self.device.write(b'OK\r\n')
+        
+        self.assertEqual(wait_for(futures, 2.0), [22, 22])
+        self.assertEqual(self.reader.read_power, 22)
+        deadline = time.time() + 2
+        while len(self.tags) < 200 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.tags), 200)
+    
+    def test_unanswered_command_times_out(self):
+        """Test the caller gets a timeout and the configured power is unchanged"""
+        self.reader.read_power = 26
+        self.thread.start()
+        future = self.reader.configure_power(12)
+        self.assertIsInstance(future.exception(timeout=3), DeviceCommandTimeout)
+        self.assertEqual(self.reader.read_power, 26)
+        self.assertIsNone(self.reader.output_power)
+
+
+class TestConfigEndpoints(AppTestCase):
+    """Test cases for the power/range configuration routes"""
+    
+    def test_power_and_range(self):
+        """Test settings are applied to the default portal and validated"""
+        self.assertEqual(self.client.post('/api/config/rfid-power', json={'power': 18}).status_code, 200)
+        self.assertEqual(self.client.post('/api/config/sensor-range', json={'range': 4}).status_code, 200)
+        status = self.client.get('/api/portals').get_json()['data'][0]
+        self.assertEqual((status['rfid_power'], status['sensor_range']), (18, 4))
+        
+        self.assertEqual(self.client.post('/api/config/rfid-power', json={'power': 99}).status_code, 400)
+        self.assertEqual(self.client.post('/api/config/rfid-power', json={'power': 20, 'portal': 'nope'}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from app.services.direction_engine import DetectionSeries, DirectionEngine
+
+class TestDirectionEngine(unittest.TestCase):
+    """Test cases for direction inference"""
+    
+    def setUp(self):
+        """Create engine"""
+        self.engine = DirectionEngine(window=5.0, sigma=1.0)
+    
+    def walk(self, first: str, second: str, start: float, door: float, end: float):
+        """Feed 10Hz detections for a person crossing from one zone to the other"""
+        t = start
+        while t < end:
+            self.engine.add_detection(first if t < door else second, t)
+            t += 0.1
+    
+    def test_no_detections(self):
+        """Test undecided without sensor activity"""
+        self.assertEqual(self.engine.infer(100.0), (None, 0.0))
+    
+    def test_inside_then_outside_is_out(self):
+        """Test inside->outside ordering infers OUT"""
+        self.walk('inside', 'outside', 99.0, 100.0, 101.0)
+        direction, confidence = self.engine.infer(100.0)
+        
+        self.assertEqual(direction, 'OUT')
+        self.assertGreater(confidence, 0.7)
+    
+    def test_outside_then_inside_is_in(self):
+        """Test outside->inside ordering infers IN"""
+        self.walk('outside', 'inside', 99.0, 100.0, 101.0)
+        self.assertEqual(self.engine.infer(100.0)[0], 'IN')
+    
+    def test_early_read_uses_ordering(self):
+        """Test a read before either sensor fired still follows sensor ordering"""
+        self.walk('outside', 'inside', 100.5, 101.5, 102.5)
+        self.assertEqual(self.engine.infer(100.0)[0], 'IN')
+    
+    def test_single_sensor_marks_origin(self):
+        """Test only the inside sensor firing infers OUT"""
+        self.engine.add_detection('inside', 99.8)
+        self.assertEqual(self.engine.infer(100.0)[0], 'OUT')
+        self.assertEqual(self.engine.has_activity(100.0, 5.0), (True, False))
+    
+    def test_backdated_detection_keeps_series_sorted(self):
+        """Test a detection older than the latest one is inserted in order"""
+        series = DetectionSeries()
+        for t in (100.0, 100.5, 100.3, 99.0):
+            series.add(t)
+        self.assertEqual(list(series.times), [99.0, 100.0, 100.3, 100.5])
+        self.assertEqual(series.window(100.2, 100.4), (2, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
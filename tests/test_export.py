@@ -0,0 +1,102 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.cli import main as cli
+from app.services.export_service import export, iter_records, read_columnar
+from app.services.tracking_service import RecordLog
+from config import Config
+from tests.helpers import AppTestCase
+
+def sample_records(count):
+    return [{
+        'rfid_tag': f'E200{i % 7:04d}',
+        'direction': 'IN' if i % 2 else 'OUT',
+        'read_date': f'2025-03-{1 + i // 100:02d}-08-{i % 60:02d}-{(i * 7) % 60:02d}-{i % 1000:03d}',
+        'portal_id': 'dock' if i % 3 == 0 else 'main',
+        'confidence': None if i % 5 == 0 else 0.75
+    } for i in range(count)]
+
+
+class TestExport(unittest.TestCase):
+    """Test cases for streaming exports"""
+    
+    def setUp(self):
+        """Build a record log"""
+        self.records = sample_records(300)
+        self.log = RecordLog(self.records)
+    
+    def test_columnar_round_trip(self):
+        """Test the columnar format decodes to the original records"""
+        body = b''.join(export(iter_records(self.log), 'columnar'))
+        self.assertEqual(list(read_columnar(io.BytesIO(body))), self.records)
+        
+        with self.assertRaises(ValueError):
+            list(read_columnar(io.BytesIO(body[:-10])))
+    
+    def test_filters(self):
+        """Test date, tag, portal and direction filters"""
+        selected = list(iter_records(self.log, start_date='2025-03-02', end_date='2025-03-03',
+                                     tag='E2000003', portal_id='main', direction='in'))
+        expected = [r for r in self.records if '2025-03-02' <= r['read_date'] <= '2025-03-03'
+                    and r['rfid_tag'] == 'E2000003' and r['portal_id'] == 'main' and r['direction'] == 'IN']
+        
+        self.assertTrue(expected)
+        self.assertEqual(selected, expected)
+    
+    def test_csv_and_ndjson(self):
+        """Test text formats contain every record once"""
+        rows = list(csv.DictReader(io.StringIO(''.join(export(iter_records(self.log), 'csv')))))
+        lines = ''.join(export(iter_records(self.log), 'ndjson')).splitlines()
+        
+        self.assertEqual(len(rows), 300)
+        self.assertEqual(rows[1]['rfid_tag'], self.records[1]['rfid_tag'])
+        self.assertEqual(json.loads(lines[-1]), self.records[-1])
+    
+    def test_cli_export_streams_both_formats(self):
+        """Test the offline export reads legacy arrays and journals without loading them into a store"""
+        with tempfile.TemporaryDirectory() as workdir:
+            legacy, journal, output = (os.path.join(workdir, name) for name in ('r.json', 'r.ndjson', 'out.ndjson'))
+            with open(legacy, 'w') as f:
+                json.dump(self.records, f)
+            with open(journal, 'w') as f:
+                f.writelines(json.dumps(r) + '\n' for r in self.records)
+            expected = [r for r in self.records if r['portal_id'] == 'dock' and r['direction'] == 'IN']
+            for source in (legacy, journal):
+                self.assertEqual(cli(['export', '--data-file', source, '--format', 'ndjson', '--output', output,
+                                      '--portal', 'dock', '--direction', 'IN']), 0)
+                with open(output) as f:
+                    self.assertEqual([json.loads(line) for line in f], expected)
+            
+            # Legacy records without portal_id belong to the first configured portal, as in the service
+            with open(legacy, 'w') as f:
+                json.dump([{k: v for k, v in r.items() if k != 'portal_id'} for r in self.records], f)
+            with mock.patch.object(Config, 'PORTALS', 'dock:/dev/a,/dev/b,/dev/c;main:/dev/d,/dev/e,/dev/f'):
+                self.assertEqual(cli(['export', '--data-file', legacy, '--format', 'ndjson', '--output', output,
+                                      '--portal', 'dock']), 0)
+            with open(output) as f:
+                self.assertEqual(sum(1 for _ in f), len(self.records))
+
+
+class TestExportEndpoint(AppTestCase):
+    """Test cases for /api/export"""
+    
+    def test_export_endpoint(self):
+        """Test /api/export streams a download and validates parameters"""
+        self.client.post('/api/records', json={'rfid_tag': 'EXPORTTEST01', 'direction': 'IN'})
+        
+        response = self.client.get('/api/export?format=ndjson&tag=EXPORTTEST01')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('.ndjson', response.headers['Content-Disposition'])
+        self.assertEqual(json.loads(lines[-1])['rfid_tag'], 'EXPORTTEST01')
+        
+        self.assertEqual(self.client.get('/api/export?format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/export?start_date=yesterday').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import threading
+import time
+import unittest
+import serial
+from app.services.device_emulator import PortalEmulator
+from app.services.inventory_scheduler import InventoryScheduler
+from app.services.rfid_service import RFIDReader
+
+class TestInventoryScheduler(unittest.TestCase):
+    """Test cases for sensor-gated inventory scheduling"""
+    
+    def setUp(self):
+        """Real reader on an emulated port, 26 dBm read power, 10 dBm while idle"""
+        self.emulator = PortalEmulator(['rfid'])
+        self.reader = RFIDReader(portal_id='test')
+        self.reader.serial = serial.Serial(self.emulator.devices['rfid'].port, timeout=1)
+        self.reader.read_power = 26
+        self.scheduler = InventoryScheduler(self.reader, active_window=1.0, active_interval=0.01,
+                                            idle_interval=0.5, idle_power=10)
+    
+    def tearDown(self):
+        self.reader.stop()
+        self.emulator.close()
+    
+    def commands(self):
+        time.sleep(0.05)
+        device = self.emulator.devices['rfid']
+        device.drain()
+        sent = b''.join(device.commands)
+        device.commands.clear()
+        return sent
+    
+    def test_power_follows_sensor_activity(self):
+        """Test the radio drops to idle power and returns to read power on a detection"""
+        now = time.time()
+        self.scheduler.update(now)
+        self.assertEqual(self.commands(), b'AT+POWER=10\r\n')
+        self.scheduler.update(now + 0.1)
+        self.assertEqual(self.commands(), b'')
+        
+        self.scheduler.on_detection('inside', now + 0.2)
+        self.scheduler.update(now + 0.3)
+        self.assertTrue(self.scheduler.active)
+        self.assertEqual(self.commands(), b'AT+POWER=26\r\n')
+        self.assertEqual(self.reader.read_power, 26)
+        
+        self.scheduler.update(now + 1.3)
+        self.assertFalse(self.scheduler.active)
+        self.assertEqual(self.commands(), b'AT+POWER=10\r\n')
+        self.assertEqual(self.scheduler.activations, 1)
+    
+    def test_detection_wakes_idle_poll(self):
+        """Test an idle wait ends as soon as a sensor fires and polling speeds up"""
+        self.scheduler.update(time.time())
+        timer = threading.Timer(0.05, lambda: self.scheduler.on_detection('outside', time.time()))
+        timer.start()
+        
+        started = time.perf_counter()
+        self.scheduler.wait()
+        self.assertLess(time.perf_counter() - started, 0.3)
+        
+        started = time.perf_counter()
+        for _ in range(5):
+            self.scheduler.wait()
+        self.assertTrue(self.scheduler.active)
+        self.assertLess(time.perf_counter() - started, 0.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
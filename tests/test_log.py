@@ -0,0 +1,54 @@
+import json
+import logging
+import queue
+import unittest
+from app.utils.log import DroppingQueueHandler, RateLimitFilter, JsonFormatter, TextFormatter
+
+class TestLog(unittest.TestCase):
+    """Test cases for queued, rate-limited logging"""
+    
+    def make_record(self, msg, *args, level=logging.INFO, **extra):
+        """Build a record as logger.info(msg, *args, extra=extra) would"""
+        record = logging.LogRecord('app.test', level, __file__, 1, msg, args, None)
+        record.__dict__.update(extra)
+        return record
+    
+    def test_rate_limit_per_template(self):
+        """Test repeats of one message template are capped and counted"""
+        limiter = RateLimitFilter(window=60.0, burst=3)
+        passed = [limiter.filter(self.make_record("Tag %s ignored", f"TAG{i}")) for i in range(10)]
+        self.assertEqual(passed, [True] * 3 + [False] * 7)
+        
+        # Other messages have their own budget
+        self.assertTrue(limiter.filter(self.make_record("Recorded: %s", "TAG1")))
+        
+        # The next window reports what was suppressed
+        for bucket in limiter.buckets.values():
+            bucket[0] -= 60.0
+        record = self.make_record("Tag %s ignored", "TAG99")
+        self.assertTrue(limiter.filter(record))
+        self.assertEqual(record.suppressed, 7)
+        self.assertTrue(TextFormatter('%(message)s').format(record).endswith('(7 similar suppressed)'))
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test the queue handler never blocks the logging thread"""
+        handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+        for i in range(5):
+            handler.handle(self.make_record("Reading %d", i))
+        
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+    
+    def test_json_format(self):
+        """Test JSON lines carry the message and structured fields"""
+        record = self.make_record("Tag %s ignored at %s", "E200", "main", portal='main')
+        entry = json.loads(JsonFormatter().format(record))
+        
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'app.test')
+        self.assertEqual(entry['msg'], 'Tag E200 ignored at main')
+        self.assertEqual(entry['portal'], 'main')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from app.utils.metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the metrics registry"""
+    
+    def setUp(self):
+        """Create an empty registry"""
+        self.registry = MetricsRegistry()
+    
+    def test_counter_with_labels(self):
+        """Test labelled counters render one series per label set"""
+        counter = self.registry.counter('serial_bytes_read', 'Bytes', ['port'])
+        counter.labels('/dev/ttyUSB0').inc(10)
+        counter.labels('/dev/ttyUSB0').inc(5)
+        counter.labels('/dev/ttyUSB1').inc()
+        
+        text = self.registry.render()
+        self.assertIn('# TYPE serial_bytes_read_total counter', text)
+        self.assertIn('serial_bytes_read_total{port="/dev/ttyUSB0"} 15', text)
+        self.assertIn('serial_bytes_read_total{port="/dev/ttyUSB1"} 1', text)
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, count and sum"""
+        histogram = self.registry.histogram('save_seconds', 'Save time', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 2.0):
+            histogram.observe(value)
+        
+        text = self.registry.render()
+        self.assertIn('save_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('save_seconds_bucket{le="1"} 3', text)
+        self.assertIn('save_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('save_seconds_count 4', text)
+        self.assertIn('save_seconds_sum 3.05', text)
+    
+    def test_gauge_function_and_collector(self):
+        """Test scrape-time gauges and collectors"""
+        self.registry.gauge('records', 'Records', function=lambda: 42)
+        family = self.registry.counter('events', 'Events', ['outcome'])
+        self.registry.metrics.pop(family.name)
+        self.registry.add_collector(lambda: [(family, [('', {'outcome': 'recorded'}, 7)])])
+        
+        text = self.registry.render()
+        self.assertIn('records 42', text)
+        self.assertIn('events_total{outcome="recorded"} 7', text)
+    
+    def test_label_count_checked(self):
+        """Test wrong label values are rejected"""
+        counter = self.registry.counter('errors', 'Errors', ['port'])
+        with self.assertRaises(ValueError):
+            counter.labels('a', 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()
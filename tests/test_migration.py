@@ -0,0 +1,132 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.cli import main as cli
+from app.services.migration_service import migrate
+from app.services.tracking_service import TrackingService
+from app.utils.helpers import append_ndjson_file, iter_json_array, load_records
+from config import Config
+
+def legacy_records(count):
+    return [{
+        'rfid_tag': f'E200{i:04d}',
+        'direction': 'IN' if i % 2 else 'out',
+        'read_date': f'2024-06-01-10-{i // 60 % 60:02d}-{i % 60:02d}-{i % 1000:03d}',
+        'confidence': 0.5 + (i % 5) / 10
+    } for i in range(count)]
+
+
+class Interrupted(Exception):
+    pass
+
+
+class TestMigration(unittest.TestCase):
+    """Test cases for streaming migration of legacy records files"""
+    
+    def setUp(self):
+        """Write a legacy JSON array file with a few invalid records"""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.records = legacy_records(250)
+        self.records[10]['read_date'] = 'yesterday'
+        self.records[20] = ['not', 'a', 'record']
+        self.source = self.path('tag_tracking.json')
+        with open(self.source, 'w', encoding='utf-8') as f:
+            json.dump(self.records, f, indent=2)
+    
+    def tearDown(self):
+        self.workdir.cleanup()
+    
+    def path(self, name):
+        return os.path.join(self.workdir.name, name)
+    
+    def test_iter_json_array_chunks_and_resume(self):
+        """Test elements split across small chunks parse, and parsing resumes at a yielded offset"""
+        data = json.dumps([{'tag': 'Ä' * 5, 'n': 3.14159}, 12345, 'x', None, [1, 2]]).encode('utf-8')
+        parsed = list(iter_json_array(io.BytesIO(data), chunk_size=3))
+        
+        self.assertEqual([value for value, _ in parsed], json.loads(data))
+        resumed = list(iter_json_array(io.BytesIO(data), start=parsed[1][1], chunk_size=3))
+        self.assertEqual(resumed, parsed[2:])
+        
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.BytesIO(b'{"not": "an array"}')))
+    
+    def test_migrate_normalizes_and_rejects(self):
+        """Test valid records are converted and invalid ones are set aside"""
+        destination = self.path('tag_tracking.ndjson')
+        summary = migrate(self.source, destination, default_portal_id='dock')
+        migrated = load_records(destination)
+        
+        self.assertEqual(summary['records'], 248)
+        self.assertEqual(summary['rejected'], 2)
+        self.assertEqual(migrated[0]['direction'], 'OUT')
+        self.assertEqual(migrated[0]['portal_id'], 'dock')
+        with open(summary['rejects_file'], encoding='utf-8') as f:
+            reasons = [json.loads(line)['reason'] for line in f]
+        self.assertEqual(reasons, ['read_date must be YYYY-MM-DD-HH-MM-SS-mmm', 'not an object'])
+        
+        with self.assertRaises(FileExistsError):
+            migrate(self.source, destination)
+    
+    def test_cli_uses_service_default_portal(self):
+        """Test legacy records get the first configured portal, as the running service gives them"""
+        destination = self.path('tag_tracking.ndjson')
+        with mock.patch.object(Config, 'PORTALS', 'dock:/dev/a,/dev/b,/dev/c;main:/dev/d,/dev/e,/dev/f'):
+            self.assertEqual(cli(['migrate', self.source, destination, '--quiet']), 0)
+        self.assertEqual({record['portal_id'] for record in load_records(destination)}, {'dock'})
+    
+    def test_interrupted_migration_resumes(self):
+        """Test a migration stopped after a checkpoint finishes with the same output"""
+        expected_path = self.path('expected.ndjson')
+        migrate(self.source, expected_path, checkpoint_every=40)
+        
+        def interrupt(state):
+            raise Interrupted()
+        destination = self.path('resumed.ndjson')
+        with self.assertRaises(Interrupted):
+            migrate(self.source, destination, checkpoint_every=40, progress=interrupt)
+        self.assertTrue(os.path.exists(destination + '.checkpoint'))
+        
+        summary = migrate(self.source, destination, checkpoint_every=40)
+        self.assertEqual(summary['resumed_from'], 38)  # 40 elements, 2 of them rejected
+        self.assertFalse(os.path.exists(destination + '.checkpoint'))
+        with open(destination, 'rb') as resumed, open(expected_path, 'rb') as expected:
+            self.assertEqual(resumed.read(), expected.read())
+    
+    def test_ndjson_store_appends(self):
+        """Test an NDJSON data file is appended to and reloads completely"""
+        store = TrackingService()
+        store.data_file = self.path('journal.ndjson')
+        store.add_record('TAG1', 'IN')
+        size = os.path.getsize(store.data_file)
+        store.add_record('TAG2', 'OUT')
+        
+        with open(store.data_file, 'rb') as f:
+            self.assertEqual(len(f.read()[size:].splitlines()), 1)
+        self.assertEqual([r['rfid_tag'] for r in load_records(store.data_file)], ['TAG1', 'TAG2'])
+    
+    def test_failed_append_is_retried(self):
+        """Test a failed journal save is written by the next flush"""
+        store = TrackingService()
+        store.data_file = self.path('journal.ndjson')
+        store.add_record('TAG1', 'IN')
+        with mock.patch('app.services.tracking_service.append_ndjson_file', return_value=False):
+            store.add_record('TAG2', 'OUT')
+        store.add_record('TAG3', 'IN')
+        self.assertEqual([r['rfid_tag'] for r in load_records(store.data_file)], ['TAG1', 'TAG2', 'TAG3'])
+    
+    def test_torn_last_line_does_not_swallow_appends(self):
+        """Test records appended after a power cut mid-write are readable"""
+        path = self.path('journal.ndjson')
+        append_ndjson_file(path, [{'rfid_tag': 'TAG1'}])
+        with open(path, 'a') as f:
+            f.write('{"rfid_tag": "TA')  # torn write
+        append_ndjson_file(path, [{'rfid_tag': 'TAG3'}])
+        self.assertEqual([r['rfid_tag'] for r in load_records(path)], ['TAG1', 'TAG3'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from app.services.mmwave_protocol import S3KM1110Decoder, encode_report_frame, GATE_COUNT
+
+class TestMMWaveProtocol(unittest.TestCase):
+    """Test cases for the S3KM1110 report frame decoder"""
+    
+    def setUp(self):
+        """Create decoder and sample frames"""
+        self.decoder = S3KM1110Decoder()
+        self.present = encode_report_frame(True, 120, [10] * 8 + [90] + [5] * 7)
+        self.absent = encode_report_frame(False, 0, [3] * GATE_COUNT)
+    
+    def test_decode_buffered_chunk(self):
+        """Test several frames in one chunk decode at once"""
+        frames = self.decoder.feed(self.present + self.absent + self.present)
+        
+        self.assertEqual([f.target for f in frames], [True, False, True])
+        self.assertEqual(frames[0].distance_cm, 120)
+        self.assertEqual(frames[0].max_energy, 90)
+        self.assertEqual(len(self.decoder.buffer), 0)
+    
+    def test_frame_split_across_reads(self):
+        """Test a frame split between serial reads is decoded once complete"""
+        data = self.present + self.absent
+        self.assertEqual(self.decoder.feed(data[:7]), [])
+        self.assertEqual(len(self.decoder.feed(data[7:50])), 1)
+        self.assertEqual(len(self.decoder.feed(data[50:])), 1)
+        self.assertEqual(self.decoder.frames, 2)
+    
+    def test_resync_after_garbage(self):
+        """Test line noise and corrupted frames are skipped"""
+        corrupted = self.present[:-1] + b'\x00'
+        frames = self.decoder.feed(b'\x01\xf4\xf3' + corrupted + b'noise' + self.absent)
+        
+        self.assertEqual(len(frames), 1)
+        self.assertFalse(frames[0].target)
+        self.assertEqual(self.decoder.errors, 1)
+    
+    def test_presence_threshold(self):
+        """Test presence requires the strongest gate to reach the threshold"""
+        frame = self.decoder.feed(self.present)[0]
+        
+        self.assertTrue(frame.is_presence())
+        self.assertTrue(frame.is_presence(90))
+        self.assertFalse(frame.is_presence(91))
+
+
+if __name__ == '__main__':
+    unittest.main()
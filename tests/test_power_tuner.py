@@ -0,0 +1,68 @@
+import unittest
+from app.services.inventory_scheduler import InventoryScheduler
+from app.services.power_tuner import PowerTuner
+
+class Reader:
+    """Records power changes"""
+    
+    def __init__(self, power):
+        self.portal_id = 'test'
+        self.read_power = power
+        self.output_power = power
+    
+    def configure_power(self, power_dbm):
+        self.read_power = power_dbm
+
+
+class TestPowerTuner(unittest.TestCase):
+    """Test cases for closed-loop power tuning"""
+    
+    def setUp(self):
+        """Tuner between 10 and 30 dBm aiming for 3-6 reads per crossing"""
+        self.reader = Reader(20)
+        self.scheduler = InventoryScheduler(self.reader, active_interval=0.02)
+        self.tuner = PowerTuner(self.reader, self.scheduler, power_min=10, power_max=30, step=2,
+                                reads_min=3, reads_max=6, max_stray=0.2, sample_size=10)
+        self.stats = {'reads': 0, 'recorded': 0, 'deduplicated': 0, 'ignored': 0}
+    
+    def crossings(self, count, reads_each, stray=0):
+        """Advance the correlator counters"""
+        self.stats['recorded'] += count
+        self.stats['deduplicated'] += count * (reads_each - 1)
+        self.stats['ignored'] += stray
+        self.stats['reads'] += count * reads_each + stray
+        return self.tuner.observe(dict(self.stats), 0.0)
+    
+    def test_waits_for_enough_crossings(self):
+        """Test nothing changes until a full sample is seen"""
+        self.assertIsNone(self.crossings(5, 1))
+        self.assertEqual(self.crossings(5, 1)['reason'], 'too few reads')
+        self.assertEqual(self.reader.read_power, 22)
+    
+    def test_power_moves_toward_target(self):
+        """Test over-reading and stray reads lower power, in-band reads leave it alone"""
+        self.crossings(10, 12)
+        self.assertEqual(self.reader.read_power, 18)
+        self.crossings(10, 4, stray=20)
+        self.assertEqual(self.reader.read_power, 16)
+        self.assertIsNone(self.crossings(10, 4)['reason'])
+        self.assertEqual(self.reader.read_power, 16)
+    
+    def test_limits_and_poll_interval(self):
+        """Test power stays within limits and polling slows only at minimum power"""
+        self.reader.read_power = 10
+        self.crossings(10, 10)
+        self.assertEqual(self.reader.read_power, 10)
+        self.assertEqual(self.scheduler.active_interval, 0.04)
+        
+        self.crossings(10, 2)
+        self.assertEqual(self.reader.read_power, 12)
+        self.assertEqual(self.scheduler.active_interval, 0.02)
+        
+        self.reader.read_power = 30
+        self.assertIsNone(self.crossings(10, 1)['reason'])
+        self.assertEqual(self.reader.read_power, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
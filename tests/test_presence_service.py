@@ -0,0 +1,113 @@
+import os
+import random
+import tempfile
+import threading
+import unittest
+from app.services.presence_service import PresenceHistory
+from app.services.tracking_service import TrackingService, tracking_service
+from tests.helpers import AppTestCase
+
+def read_date(minute):
+    return f'2024-06-01-{8 + minute // 60:02d}-{minute % 60:02d}-00-000'
+
+
+def movements(count, seed=1):
+    """Random IN/OUT records, roughly in time order with some late ones"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        minute = max(0, i - (rng.randint(1, 5) if rng.random() < 0.1 else 0))
+        records.append({'rfid_tag': f'TAG{rng.randint(0, 9)}', 'direction': rng.choice(['IN', 'OUT']),
+                        'read_date': read_date(minute), 'portal_id': rng.choice(['main', 'dock'])})
+    return records
+
+
+def replay(records, at):
+    """Reference answer: every record up to `at`, latest read_date wins, log order breaks ties"""
+    state = {}
+    for record in sorted(records, key=lambda r: r['read_date']):
+        if record['read_date'] <= at:
+            state[record['rfid_tag']] = record
+    return state
+
+
+class TestPresenceHistory(unittest.TestCase):
+    """Test cases for point-in-time presence"""
+    
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.store = TrackingService()
+        self.store.data_file = os.path.join(self.workdir.name, 'records.json')
+        self.history = PresenceHistory(self.store, interval=16)
+        self.store.add_listener(self.history.on_record)
+    
+    def tearDown(self):
+        self.workdir.cleanup()
+    
+    def test_matches_full_replay(self):
+        """Test answers from checkpoints equal a replay from the start, for loaded and added records"""
+        loaded = movements(200)
+        self.store.replace_records(list(loaded))
+        for record in movements(100, seed=2):
+            record['read_date'] = read_date(150 + int(record['read_date'][14:16]) % 40)
+            self.store.log.append(record)  # unsorted tail, like late records from another portal
+            self.history.catch_up()
+        self.assertGreater(len(self.history.checkpoints), 10)
+        
+        records = self.store.records
+        for minute in range(0, 200, 7):
+            at = read_date(minute)
+            self.assertEqual(self.history.at(at), replay(records, at), at)
+        self.assertEqual(self.history.at(), replay(records, '9999'))
+    
+    def test_inventory_and_reset(self):
+        """Test inside/outside lists, the portal filter and a cleared store"""
+        self.store.replace_records([
+            {'rfid_tag': 'TAG1', 'direction': 'OUT', 'read_date': read_date(0), 'portal_id': 'main'},
+            {'rfid_tag': 'TAG2', 'direction': 'IN', 'read_date': read_date(1), 'portal_id': 'dock'},
+            {'rfid_tag': 'TAG1', 'direction': 'IN', 'read_date': read_date(5), 'portal_id': 'main'}
+        ])
+        inventory = self.history.inventory(read_date(2))
+        self.assertEqual([e['rfid_tag'] for e in inventory['outside']], ['TAG1'])
+        self.assertEqual(inventory['inside'], [{'rfid_tag': 'TAG2', 'since': read_date(1), 'portal_id': 'dock'}])
+        self.assertEqual(self.history.inventory(read_date(9), 'main')['inside_count'], 1)
+        self.assertEqual(self.history.inventory('2024-01-01-00-00-00-000')['inside'], [])
+        
+        self.store.clear_all_records()
+        self.assertEqual(self.history.at(), {})
+    
+    def test_adding_records_never_waits_for_queries(self):
+        """Test the listener only marks the index stale and the next query indexes the record"""
+        writer = threading.Thread(target=self.store.add_record, args=('TAG1', 'IN', 'main'))
+        with self.history.lock:  # a long query in progress
+            writer.start()
+            writer.join(timeout=2)
+            self.assertFalse(writer.is_alive())
+        self.assertEqual(self.history.applied, 0)
+        self.assertEqual(self.history.at()['TAG1']['direction'], 'IN')
+        self.assertFalse(self.history.stale.is_set())
+
+
+class TestPresenceEndpoint(AppTestCase):
+    """Test cases for /api/presence"""
+    
+    def settings(self):
+        return {'PRESENCE_CHECKPOINT_RECORDS': 8}
+    
+    def setUp(self):
+        super().setUp()
+        tracking_service.replace_records(movements(50))
+    
+    def test_presence_endpoint(self):
+        """Test the inventory at a past instant"""
+        at = read_date(30)
+        data = self.client.get(f'/api/presence?at={at}').get_json()['data']
+        expected = replay(tracking_service.records, at)
+        self.assertEqual(data['inside_count'] + data['outside_count'], len(expected))
+        self.assertEqual({e['rfid_tag'] for e in data['inside']},
+                         {tag for tag, record in expected.items() if record['direction'] == 'IN'})
+        self.assertEqual(self.client.get('/api/presence?at=yesterday').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
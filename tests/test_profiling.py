@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+from flask import g
+from app import create_app
+from app.utils.profiling import phase, add_phase, start_request_timing
+from config import config, ProductionConfig
+
+config['profiling'] = type('ProfilingConfig', (ProductionConfig,), {
+    'PROFILING_ENABLED': True,
+    'PROFILING_TOKEN': 'secret'
+})
+
+class TestProfiling(unittest.TestCase):
+    """Test cases for Server-Timing and the sampling profiler"""
+    
+    def setUp(self):
+        """Set up a test client with profiling enabled"""
+        self.app = create_app('profiling')
+        self.client = self.app.test_client()
+    
+    def test_nested_phases_do_not_overlap(self):
+        """Test time in a nested phase is not counted in the enclosing one"""
+        with self.app.test_request_context('/'):
+            start_request_timing()
+            with phase('query'):
+                add_phase('lock', 0.05)
+                with phase('sort'):
+                    time.sleep(0.02)
+            
+            self.assertEqual(g.server_timing['lock'], 0.05)
+            self.assertGreaterEqual(g.server_timing['sort'], 0.02)
+            self.assertLess(g.server_timing['query'], 0.01)
+    
+    def test_server_timing_header(self):
+        """Test /api/records reports its phases"""
+        response = self.client.get('/api/records')
+        timing = response.headers.get('Server-Timing', '')
+        
+        self.assertEqual(response.status_code, 200)
+        for name in ('sort', 'query', 'serialize', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+    
+    def test_profile_requires_token(self):
+        """Test the profiler rejects missing or wrong tokens"""
+        self.assertEqual(self.client.get('/api/debug/profile?seconds=0.1').status_code, 403)
+        response = self.client.get('/api/debug/profile?seconds=0.1', headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 403)
+    
+    def test_profile_samples_other_threads(self):
+        """Test collapsed stacks include background threads by name"""
+        stop = threading.Event()
+        thread = threading.Thread(target=stop.wait, name='probe-thread', daemon=True)
+        thread.start()
+        try:
+            response = self.client.get('/api/debug/profile?seconds=0.2&interval_ms=5',
+                                       headers={'Authorization': 'Bearer secret'})
+        finally:
+            stop.set()
+        text = response.get_data(as_text=True)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+        probe = [line for line in text.splitlines() if line.startswith('probe-thread;')]
+        self.assertTrue(probe)
+        self.assertIn('threading.py:wait', probe[0])
+        self.assertGreater(int(probe[0].rsplit(' ', 1)[1]), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import time
+import unittest
+from unittest import mock
+from app.services.scenario_service import ScenarioJobs, generate_movements, run_scenario
+from app.services.rfid_service_mock import RFIDReaderMock
+
+class TestScenarios(unittest.TestCase):
+    """Test cases for scripted movement scenarios"""
+    
+    def test_single_file_movements_are_correct(self):
+        """Test people passing one at a time are all recorded correctly"""
+        movements = generate_movements(200, gap=2.0)
+        result = run_scenario(movements, {})
+        
+        self.assertEqual(result['movements'], 200)
+        self.assertEqual(result['correct'], 200)
+        self.assertEqual(result['mismatches'], [])
+    
+    def test_generator_adds_companions(self):
+        """Test simultaneous and crossing people add movements at the same door time"""
+        movements = generate_movements(100, simultaneous_prob=1.0, crossing_prob=1.0)
+        
+        self.assertEqual(len(movements), 100)
+        self.assertEqual(len({m['tag_id'] for m in movements}), 100)
+        first, second, third = movements[:3]
+        self.assertEqual(first['direction'], second['direction'])
+        self.assertNotEqual(first['direction'], third['direction'])
+    
+    def test_job_runs_in_background(self):
+        """Test a submitted job finishes with results"""
+        jobs = ScenarioJobs()
+        job = jobs.submit(generate_movements(50), {})
+        
+        deadline = time.time() + 5
+        while jobs.get(job['job_id'])['status'] not in ('done', 'error') and time.time() < deadline:
+            time.sleep(0.01)
+        
+        finished = jobs.get(job['job_id'])
+        self.assertEqual(finished['status'], 'done')
+        self.assertEqual(finished['result']['movements'], 50)
+        self.assertNotIn('result', jobs.all()[0])
+    
+    def test_mock_reader_keeps_every_trigger(self):
+        """Test triggers between polls are queued instead of overwritten"""
+        reader = RFIDReaderMock()
+        for tag in ('A', 'B', 'C'):
+            reader.trigger_tag_read(tag)
+        
+        with mock.patch('random.random', return_value=0.99):  # no random simulated reads
+            self.assertEqual(reader.read_tags(), ['A', 'B', 'C'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from app.services.session_service import SessionService, session_service
+from app.services.tracking_service import TrackingService, tracking_service
+from tests.helpers import AppTestCase
+
+class TestSessionService(unittest.TestCase):
+    """Test cases for incremental dwell-time sessions"""
+    
+    def setUp(self):
+        """Session service following its own tracking store"""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.store = TrackingService()
+        self.store.data_file = os.path.join(self.workdir.name, 'records.json')
+        self.sessions = SessionService(self.store)
+        self.sessions.initialize()
+        self.start = time.time() - 3600
+    
+    def tearDown(self):
+        self.workdir.cleanup()
+    
+    def crossing(self, tag, direction, offset):
+        self.store.add_record(tag, direction, 'main', read_time=self.start + offset)
+    
+    def test_sessions_and_aggregates(self):
+        """Test OUT/IN pairs give total, average, p95 and max"""
+        offset = 0
+        for minutes in range(1, 21):
+            self.crossing('TAG1', 'OUT', offset)
+            self.crossing('TAG1', 'IN', offset + minutes * 60)
+            offset += minutes * 60 + 10
+        
+        dwell = self.sessions.get_tag('TAG1')
+        self.assertEqual(dwell['sessions'], 20)
+        self.assertAlmostEqual(dwell['total_seconds'], 210 * 60, places=1)
+        self.assertAlmostEqual(dwell['average_seconds'], 630, places=1)
+        self.assertAlmostEqual(dwell['p95_seconds'], 19 * 60, places=1)
+        self.assertAlmostEqual(dwell['max_seconds'], 20 * 60, places=1)
+        self.assertFalse(dwell['currently_out'])
+        self.assertEqual(len(dwell['recent_sessions']), 20)
+        self.assertEqual(dwell['unmatched'], 0)
+    
+    def test_currently_out_and_unmatched(self):
+        """Test open sessions, repeated OUTs and INs without an OUT"""
+        self.crossing('TAG1', 'IN', 0)
+        self.crossing('TAG1', 'OUT', 10)
+        self.crossing('TAG1', 'OUT', 20)
+        self.crossing('TAG1', 'IN', 80)
+        self.crossing('TAG2', 'OUT', 100)
+        
+        tag1 = self.sessions.get_tag('TAG1')
+        self.assertEqual(tag1['unmatched'], 2)
+        self.assertAlmostEqual(tag1['total_seconds'], 60, places=1)
+        
+        tag2 = self.sessions.get_tag('TAG2')
+        self.assertTrue(tag2['currently_out'])
+        self.assertIsNone(tag2['average_seconds'])
+        self.assertAlmostEqual(tag2['current_out_seconds'], 3500, delta=5)
+        
+        self.assertEqual([d['rfid_tag'] for d in self.sessions.get_all(out_only=True)], ['TAG2'])
+        self.assertEqual([d['rfid_tag'] for d in self.sessions.get_all()], ['TAG1', 'TAG2'])
+        self.assertIsNone(self.sessions.get_tag('TAG3'))
+    
+    def test_rebuilds_after_clear(self):
+        """Test state starts over when the store is cleared"""
+        self.crossing('TAG1', 'OUT', 0)
+        self.crossing('TAG1', 'IN', 30)
+        self.store.clear_all_records()
+        self.assertEqual(self.sessions.get_all(), [])
+        
+        self.crossing('TAG1', 'OUT', 40)
+        self.assertTrue(self.sessions.get_tag('TAG1')['currently_out'])
+        self.assertEqual(self.sessions.get_tag('TAG1')['sessions'], 0)
+    
+    def test_adding_records_never_waits_for_queries(self):
+        """Test the listener only marks the state stale and the next query pairs the records"""
+        def visit():
+            self.crossing('TAG1', 'OUT', 0)
+            self.crossing('TAG1', 'IN', 60)
+        
+        writer = threading.Thread(target=visit)
+        with self.sessions.lock:  # a large /api/dwell request in progress
+            writer.start()
+            writer.join(timeout=2)
+            self.assertFalse(writer.is_alive())
+        self.assertEqual(self.sessions.applied, 0)
+        self.assertAlmostEqual(self.sessions.get_all()[0]['total_seconds'], 60, places=1)
+
+
+class TestDwellEndpoints(AppTestCase):
+    """Test cases for the dwell API"""
+    
+    def setUp(self):
+        super().setUp()
+        tracking_service.clear_all_records()
+    
+    def test_dwell_endpoints(self):
+        """Test listing, sorting and per-tag dwell"""
+        now = time.time()
+        tracking_service.add_record('TAG1', 'OUT', read_time=now - 300)
+        tracking_service.add_record('TAG1', 'IN', read_time=now - 100)
+        tracking_service.add_record('TAG2', 'OUT', read_time=now - 50)
+        
+        data = self.client.get('/api/dwell?sort=current_out_seconds').get_json()
+        self.assertEqual([d['rfid_tag'] for d in data['data']], ['TAG2', 'TAG1'])
+        self.assertEqual(self.client.get('/api/dwell?sort=name').status_code, 400)
+        self.assertEqual(self.client.get('/api/dwell?limit=two').status_code, 400)
+        self.assertEqual(self.client.get('/api/dwell?limit=-1').status_code, 400)
+        self.assertEqual(self.client.get('/api/dwell?limit=1').get_json()['count'], 1)
+        
+        tag = self.client.get('/api/dwell/TAG1').get_json()['data']
+        self.assertAlmostEqual(tag['total_seconds'], 200, places=1)
+        self.assertEqual(tag['recent_sessions'][0]['portal_id'], 'main')
+        self.assertEqual(self.client.get('/api/dwell/NOPE').status_code, 404)
+        self.assertIs(session_service.store, tracking_service)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.sync_service import SyncService, SyncError
+from app.services.tracking_service import TrackingService
+
+class StandInServer:
+    """Local ingest server recording uploaded batches"""
+    
+    def __init__(self):
+        self.batches = []
+        self.connections = set()
+        self.fail = False
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive
+            
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                server.connections.add(self.client_address)
+                if server.fail:
+                    self.send_response(503)
+                else:
+                    server.batches.append(json.loads(gzip.decompress(body)))
+                    self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/ingest"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+    
+    def received(self):
+        return [record['rfid_tag'] for batch in self.batches for record in batch['records']]
+    
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class TestSyncService(unittest.TestCase):
+    """Test cases for batched, resumable upstream sync"""
+    
+    def setUp(self):
+        """Create a store, a stand-in server and a sync client"""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.store = TrackingService()
+        self.store.data_file = os.path.join(self.workdir.name, 'records.json')
+        self.server = StandInServer()
+        self.sync = self.make_sync()
+    
+    def tearDown(self):
+        self.sync.stop()
+        self.server.close()
+        self.workdir.cleanup()
+    
+    def make_sync(self):
+        sync = SyncService(self.store)
+        sync.url = self.server.url
+        sync.batch_size = 4
+        sync.state_file = os.path.join(self.workdir.name, 'sync_state.json')
+        sync._load_state()
+        return sync
+    
+    def add(self, count, start=0):
+        for i in range(start, start + count):
+            self.store.add_record(f'TAG{i}', 'IN')
+    
+    def test_batches_until_caught_up(self):
+        """Test records are sent in order, in batches, over one connection"""
+        self.add(10)
+        sent = []
+        while True:
+            count = self.sync.sync_once()
+            if not count:
+                break
+            sent.append(count)
+        
+        self.assertEqual(sent, [4, 4, 2])
+        self.assertEqual(self.server.received(), [f'TAG{i}' for i in range(10)])
+        self.assertEqual(self.server.batches[1]['offset'], 4)
+        self.assertEqual(len(self.server.connections), 1)
+    
+    def test_outage_keeps_offset_and_resumes(self):
+        """Test failed uploads are retried and acknowledged offsets survive a restart"""
+        self.add(6)
+        self.sync.sync_once()
+        self.server.fail = True
+        with self.assertRaises(SyncError):
+            self.sync.sync_once()
+        self.assertEqual(self.sync.offset, 4)
+        
+        # Restart from the state file once the server is back
+        self.sync.stop()
+        self.server.fail = False
+        self.sync = self.make_sync()
+        self.assertEqual(self.sync.offset, 4)
+        self.sync.sync_once()
+        
+        self.assertEqual(self.server.received(), [f'TAG{i}' for i in range(6)])
+    
+    def test_cleared_store_syncs_from_start(self):
+        """Test a replaced store is not skipped because of an old offset"""
+        self.add(3)
+        self.sync.sync_once()
+        self.store.clear_all_records()
+        self.add(5, start=100)
+        self.sync.sync_once()
+        
+        self.assertEqual(self.server.received()[3:], ['TAG100', 'TAG101', 'TAG102', 'TAG103'])
+    
+    def test_background_thread_with_backoff(self):
+        """Test the sync thread backs off during an outage and catches up afterwards"""
+        self.sync.interval = 0.05
+        self.sync.backoff_min = 0.02
+        self.server.fail = True
+        self.add(5)
+        self.sync.start()
+        
+        wait = threading.Event().wait
+        for _ in range(200):
+            if self.sync.failures >= 3:
+                break
+            wait(0.01)
+        self.assertGreaterEqual(self.sync.failures, 3)
+        self.assertGreater(self.sync.backoff_delay(), 0.02 * 0.5)
+        
+        self.server.fail = False
+        for _ in range(200):
+            if self.sync.pending() == 0:
+                break
+            wait(0.02)
+        self.assertEqual(self.server.received(), [f'TAG{i}' for i in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
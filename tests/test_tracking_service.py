@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from app.services.tracking_service import TrackingService
+
+class TestTrackingService(unittest.TestCase):
+    """Test cases for lock-free reads and background saves"""
+    
+    def setUp(self):
+        """Create a service writing to a temporary file"""
+        self.workdir = tempfile.TemporaryDirectory()
+        self.service = TrackingService()
+        self.service.data_file = os.path.join(self.workdir.name, 'records.json')
+    
+    def tearDown(self):
+        self.service.stop_flusher()
+        self.workdir.cleanup()
+    
+    def test_snapshot_ignores_later_writes(self):
+        """Test readers keep a consistent view across appends and clear"""
+        self.service.add_record('TAG1', 'IN', 'main')
+        self.service.add_record('TAG2', 'OUT', 'dock')
+        log = self.service.log
+        before = log.snapshot('dock')
+        
+        self.service.add_record('TAG3', 'OUT', 'dock')
+        self.service.clear_all_records()
+        
+        self.assertEqual([r['rfid_tag'] for r in before], ['TAG2'])
+        self.assertEqual(len(log.snapshot()), 3)  # the replaced log is left intact
+        self.assertEqual(self.service.get_all_records(), [])
+        self.assertEqual(self.service.get_status()['total_records'], 0)
+    
+    def test_readers_do_not_take_the_write_lock(self):
+        """Test queries complete while a writer holds the lock"""
+        self.service.add_record('TAG1', 'IN')
+        results = {}
+        
+        def read():
+            results['records'] = self.service.get_all_records({'limit': 10})
+            results['statistics'] = self.service.get_statistics()
+            results['status'] = self.service.get_status()
+        
+        with self.service.lock:
+            reader = threading.Thread(target=read)
+            reader.start()
+            reader.join(timeout=2)
+            self.assertFalse(reader.is_alive())
+        
+        self.assertEqual(len(results['records']), 1)
+        self.assertEqual(results['statistics']['in_count'], 1)
+    
+    def test_status_is_replaced_not_mutated(self):
+        """Test a status object handed out never changes"""
+        status = self.service.status
+        self.service.update_status(rfid_reader='connected', unknown_field='ignored')
+        
+        self.assertEqual(status.rfid_reader, 'disconnected')
+        self.assertEqual(self.service.get_status()['rfid_reader'], 'connected')
+    
+    def test_background_saves_are_coalesced(self):
+        """Test writers only mark the store dirty and the flusher batches saves"""
+        with mock.patch('app.services.tracking_service.save_json_file') as save:
+            self.service.start_flusher(60)
+            self.service.add_record('TAG0', 'IN')  # wakes the flusher
+            for i in range(1, 50):
+                self.service.add_record(f'TAG{i}', 'IN')
+            self.service.stop_flusher()
+        
+        self.assertLessEqual(save.call_count, 2)
+        self.assertEqual(len(save.call_args[0][1]), 50)
+    
+    def test_failing_listener_is_isolated(self):
+        """Test a listener error neither fails add_record nor skips later listeners"""
+        seen = []
+        self.service.add_listener(lambda record: 1 / 0)
+        self.service.add_listener(seen.append)
+        with self.assertLogs('app.services.tracking_service', 'ERROR'):
+            record = self.service.add_record('TAG1', 'IN')
+        self.assertEqual(seen, [record])
+    
+    def test_saves_synchronously_without_flusher(self):
+        """Test every write is saved when no flusher is running"""
+        self.service.add_record('TAG1', 'IN')
+        
+        with open(self.service.data_file) as f:
+            self.assertEqual(json.load(f)[0]['rfid_tag'], 'TAG1')
+    
+    def test_tag_state_follows_latest_read(self):
+        """Test per-tag state tracks the latest read even when a file holds reads out of order"""
+        self.service.replace_records([
+            {'rfid_tag': 'TAG1', 'direction': 'OUT', 'read_date': '2024-06-01-10-00-00-000', 'portal_id': 'main'},
+            {'rfid_tag': 'TAG1', 'direction': 'IN', 'read_date': '2024-06-01-09-00-00-000', 'portal_id': 'dock'}
+        ])
+        self.service.add_record('TAG2', 'IN', 'dock')
+        
+        states = self.service.get_tag_states(['TAG1', 'TAG2', 'TAG3'])
+        self.assertEqual((states['TAG1']['last_direction'], states['TAG1']['last_portal']), ('OUT', 'main'))
+        self.assertEqual(states['TAG1']['first_seen'], '2024-06-01-09-00-00-000')
+        self.assertEqual((states['TAG1']['in_count'], states['TAG1']['out_count']), (1, 1))
+        self.assertEqual(states['TAG2']['total'], 1)
+        self.assertIsNone(states['TAG3'])
+        
+        self.service.clear_all_records()
+        self.assertIsNone(self.service.get_tag_states(['TAG1'])['TAG1'])
+    
+    def test_prefix_queries(self):
+        """Test EPC prefix queries use the tag index, including tags added after load"""
+        self.service.replace_records([
+            {'rfid_tag': 'E2000012345678AA', 'direction': 'IN', 'read_date': '2024-06-01-10-00-00-000'},
+            {'rfid_tag': 'E2000099999999AA', 'direction': 'OUT', 'read_date': '2024-06-01-10-01-00-000'},
+            {'rfid_tag': 'E2000012345678BB', 'direction': 'OUT', 'read_date': '2024-06-01-10-02-00-000'}
+        ])
+        self.service.add_record('E2000012345678AB', 'IN', 'dock')
+        self.service.add_record('E20000123', 'IN', 'main')
+        log = self.service.log
+        before = log.snapshot_tags('E2000012345678')
+        self.service.add_record('E2000012345678CC', 'IN', 'main')
+        
+        self.assertEqual([r['rfid_tag'] for r in before],
+                         ['E2000012345678AA', 'E2000012345678BB', 'E2000012345678AB'])
+        self.assertEqual(log.matching_tags('E2000012345678A'), ['E2000012345678AA', 'E2000012345678AB'])
+        self.assertEqual(log.sorted_tags, sorted(log.tag_index))
+        
+        records = self.service.get_all_records({'tag_prefix': 'E2000012345678', 'portal_id': 'main', 'limit': 2})
+        self.assertEqual([r['rfid_tag'] for r in records], ['E2000012345678CC', 'E2000012345678BB'])
+        stats = self.service.get_statistics(tag_prefix='E2000012345678')
+        self.assertEqual((stats['total_records'], stats['in_count'], stats['unique_tags']), (4, 3, 4))
+        self.assertEqual(self.service.get_all_records({'tag_prefix': 'F'}), [])
+        self.assertEqual(len(self.service.get_tag_records('E20000123')), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()